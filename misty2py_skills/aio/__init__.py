@@ -0,0 +1,2 @@
+"""Asyncio variants of the skills, which run on a single event loop via `misty2py_skills.aio.client.AsyncMisty` instead of blocking threads.
+"""
@@ -0,0 +1,108 @@
+"""This module implements asyncio counterparts of the basic skills of `misty2py.basic_skills` used by the skills in `misty2py_skills.aio`.
+"""
+import asyncio
+from typing import Dict, Optional, Union
+
+from misty2py.response import compose_custom_response, success_of_action_list
+from misty2py.utils.colours import get_rgb_from_unknown
+from misty2py.utils.generators import get_random_string
+
+from misty2py_skills.aio.client import AsyncMisty
+
+
+async def cancel_skills(misty: AsyncMisty) -> Dict:
+    """Cancels all skills currently running on Misty, sending the cancellations concurrently.
+
+    Args:
+        misty (AsyncMisty): The Misty on which to cancel running skills.
+
+    Returns:
+        Dict: a dictionary with the key `overall_success` specifying whether all actions were successful and a key for every action containing the dictionarised Misty2pyResponse.
+    """
+    data = (await misty.get_info("skills_running")).parse_to_dict()
+    actions = [{"get_running_skills": data}]
+
+    result = data.get("rest_response", {}).get("result", [])
+    to_cancel = [
+        dct.get("uniqueId", "")
+        for dct in (result if isinstance(result, list) else [])
+        if len(dct.get("uniqueId", "")) > 0
+    ]
+    responses = await asyncio.gather(
+        *(misty.perform_action("skill_cancel", data={"Skill": s}) for s in to_cancel)
+    )
+    for skill, response in zip(to_cancel, responses):
+        actions.append({"cancel_%s" % skill: response.parse_to_dict()})
+    return success_of_action_list(actions)
+
+
+async def speak(
+    misty: AsyncMisty, utterance: str, utterance_id: Optional[str] = None
+) -> Dict:
+    """Speaks an utterance and returns descriptive message.
+
+    Args:
+        misty (AsyncMisty): The Misty that speaks the utterance.
+        utterance (str): The utterance to speak.
+        utterance_id (Optional[str], optional): The ID of the utterance reported by the `TextToSpeechComplete` event; generated if `None`. Defaults to `None`.
+
+    Returns:
+        Dict: the enhanced dictionarised Misty2pyResponse.
+    """
+    if utterance_id is None:
+        utterance_id = "utterance_" + get_random_string(6)
+    result = (
+        await misty.perform_action(
+            "speak", data={"Text": utterance, "UtteranceId": utterance_id}
+        )
+    ).parse_to_dict()
+    return compose_custom_response(
+        result,
+        success_message="Talking successful. Utterance: `%s`." % utterance,
+        fail_message="Talking failed. Utterance: `%s`." % utterance,
+    )
+
+
+async def expression(
+    misty: AsyncMisty,
+    sound: Union[str, Dict, None] = None,
+    colour: Union[str, Dict, None] = None,
+    duration: Union[float, int] = 1.5,
+) -> Dict:
+    """Plays a sound and lights the LED at once for `duration` seconds, like `misty2py.basic_skills.expression.expression` without offsets; the loop is free to run other skills meanwhile.
+
+    Args:
+        misty (AsyncMisty): the Misty that performs the expression.
+        sound (Union[str, Dict, None], optional): The sound to play or `None` if no sound should be played. Defaults to `None`.
+        colour (Union[str, Dict, None], optional): The colour of LED as a dictionary or a data shortcut or `None` if no special colour should be lit. Defaults to `None`.
+        duration (Union[float, int], optional): The duration of the expression. Defaults to `1.5`.
+
+    Returns:
+        Dict: a dictionary with the key `overall_success` specifying whether all actions were successful and a key for every action containing the dictionarised Misty2pyResponse for that action.
+    """
+    assert duration > 0, "Duration must be higher than zero."
+    assert sound or colour, "At least a sound or a led colour must be set."
+
+    names = []
+    requests = []
+    if sound:
+        names.append("audio_play")
+        requests.append(misty.perform_action("audio_play", data=sound))
+    if colour:
+        names.append("led")
+        requests.append(
+            misty.perform_action(
+                "led",
+                data=get_rgb_from_unknown(colour, allowed_data=misty.allowed_data),
+            )
+        )
+    responses = await asyncio.gather(*requests)
+    actions = [
+        {name: response.parse_to_dict()} for name, response in zip(names, responses)
+    ]
+
+    await asyncio.sleep(duration)
+    if colour:
+        reset_led = await misty.perform_action("led", data="led_off")
+        actions.append({"reset_led": reset_led.parse_to_dict()})
+    return success_of_action_list(actions)
@@ -0,0 +1,657 @@
+"""This module implements `AsyncMisty`, an asyncio counterpart of `misty2py.robot.Misty` which sends REST requests over a pool of persistent connections and delivers events of all subscriptions through a single WebSocket connection as async iterators.
+
+Only the standard library is used; the action, information and data keywords are the same as in `misty2py`. A lost WebSocket connection is restored and all subscriptions are renewed on the new connection; the events sent while the connection was lost are not delivered.
+"""
+import asyncio
+import json
+from typing import Any, Dict, List, Optional, Tuple, Union
+from urllib.parse import urlencode
+
+from misty2py.action import ACTIONS_JSON, DATA_JSON, VALID_HTTP_REQUEST_METHODS
+from misty2py.information import INFOS_JSON
+from misty2py.misty_event import DEFAULT_DEBOUNCE
+from misty2py.response import Misty2pyErrorType, Misty2pyResponse, unknown_error
+from misty2py.utils.colours import construct_transition_dict
+from misty2py.utils.generators import get_random_string
+
+from misty2py_skills.utils.websocket import (
+    OPCODE_CLOSE,
+    OPCODE_PING,
+    OPCODE_PONG,
+    OPCODE_TEXT,
+    MessageAssembler,
+    accept_key,
+    encode_frame,
+    handshake_key,
+    read_frame_async,
+)
+
+DEFAULT_MAX_CONNECTIONS = 8
+"""The default maximum number of concurrent REST requests of an `AsyncMisty`."""
+DEFAULT_TIMEOUT = 10
+"""The default timeout of a REST request in seconds."""
+DEFAULT_MAX_QUEUED = 100
+"""The default maximum number of undelivered messages of a subscription; the oldest message is dropped when exceeded."""
+DEFAULT_RECONNECT_ATTEMPTS = 5
+"""The default number of attempts to restore a lost WebSocket connection before all subscriptions end."""
+RECONNECT_DELAY = 0.5
+"""The delay in seconds before the first attempt to restore a lost WebSocket connection; doubled after every failed attempt."""
+MAX_RECONNECT_DELAY = 8
+"""The maximum delay in seconds between two attempts to restore a lost WebSocket connection."""
+IDEMPOTENT_METHODS = frozenset(["GET", "HEAD", "OPTIONS", "PUT", "DELETE"])
+"""The request methods which are re-sent on a new connection if a reused connection is lost after the request was sent, as Misty may have performed the request already."""
+
+
+def _load_json(path: str) -> Dict:
+    """Loads a JSON file."""
+    with open(path) as f:
+        return json.load(f)
+
+
+class EventSubscription:
+    """A subscription to an event type which yields the messages of the events.
+
+    Use it as an async iterator (`async for message in subscription`), which ends when the subscription is cancelled or the connection is lost and cannot be restored, or await `next` with a timeout.
+    """
+
+    _END = object()
+
+    def __init__(
+        self,
+        misty: "AsyncMisty",
+        event_name: str,
+        request: Optional[Dict] = None,
+        max_queued: int = DEFAULT_MAX_QUEUED,
+    ) -> None:
+        """Initialises a subscription; use `AsyncMisty.subscribe` to create one.
+
+        Args:
+            misty (AsyncMisty): The Misty whose events are delivered.
+            event_name (str): The unique event name.
+            request (Optional[Dict], optional): The subscription message, sent again whenever the connection is restored. Defaults to `None`.
+            max_queued (int, optional): The maximum number of undelivered messages. Defaults to `DEFAULT_MAX_QUEUED`.
+        """
+        self.misty = misty
+        self.event_name = event_name
+        self.request = request
+        self.queue = asyncio.Queue(maxsize=max_queued)
+        self.dropped = 0
+        self.ended = False
+
+    def _deliver(self, message: Any) -> None:
+        """Queues a message, dropping the oldest undelivered message if the queue is full."""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(message)
+
+    def _end(self) -> None:
+        """Ends the subscription once; the end is queued after the undelivered messages, replacing the oldest one if the queue is full."""
+        if not self.ended:
+            self.ended = True
+            if self.queue.full():
+                self.queue.get_nowait()
+            self.queue.put_nowait(self._END)
+
+    async def next(self, timeout: Optional[float] = None) -> Any:
+        """Returns the next message.
+
+        Args:
+            timeout (Optional[float], optional): The maximum time to wait in seconds or `None` to wait indefinitely. Defaults to `None`.
+
+        Raises:
+            asyncio.TimeoutError: If no message arrived in time.
+            StopAsyncIteration: If the subscription has ended.
+        """
+        message = await asyncio.wait_for(self.queue.get(), timeout)
+        if message is self._END:
+            self.queue.put_nowait(self._END)
+            raise StopAsyncIteration
+        return message
+
+    def __aiter__(self) -> "EventSubscription":
+        """Returns the subscription itself, which iterates over its messages."""
+        return self
+
+    async def __anext__(self) -> Any:
+        """Returns the next message, see `next`."""
+        return await self.next()
+
+    async def unsubscribe(self) -> Misty2pyResponse:
+        """Unsubscribes from the event type."""
+        return await self.misty.unsubscribe(self.event_name)
+
+    async def __aenter__(self) -> "EventSubscription":
+        """Returns the subscription."""
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        """Unsubscribes from the event type."""
+        await self.unsubscribe()
+
+
+class AsyncMisty:
+    """An asyncio interface to Misty's REST API and WebSocket API.
+
+    REST requests reuse persistent HTTP connections (at most `max_connections` at once) and all subscriptions share one WebSocket connection read by a single task, so any number of skills and requests can run concurrently on one event loop without extra threads. The task restores a lost WebSocket connection and renews the subscriptions on it; only if `reconnect_attempts` attempts in a row fail, all subscriptions end.
+    """
+
+    def __init__(
+        self,
+        ip: str,
+        protocol: str = "http",
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        timeout: float = DEFAULT_TIMEOUT,
+        custom_allowed_actions: Optional[Dict] = None,
+        custom_allowed_data: Optional[Dict] = None,
+        custom_allowed_infos: Optional[Dict] = None,
+        reconnect_attempts: int = DEFAULT_RECONNECT_ATTEMPTS,
+    ) -> None:
+        """Initialises an AsyncMisty; no connection is opened until needed.
+
+        Args:
+            ip (str): The IP address of Misty, optionally with a port (`"host:port"`).
+            protocol (str, optional): The protocol of the REST API; only `"http"` is supported. Defaults to `"http"`.
+            max_connections (int, optional): The maximum number of concurrent REST requests. Defaults to `DEFAULT_MAX_CONNECTIONS`.
+            timeout (float, optional): The timeout of a REST request in seconds. Defaults to `DEFAULT_TIMEOUT`.
+            custom_allowed_actions (Optional[Dict], optional): Additional action keywords. Defaults to `None`.
+            custom_allowed_data (Optional[Dict], optional): Additional data shortcuts. Defaults to `None`.
+            custom_allowed_infos (Optional[Dict], optional): Additional information keywords. Defaults to `None`.
+            reconnect_attempts (int, optional): The number of attempts to restore a lost WebSocket connection before all subscriptions end. Defaults to `DEFAULT_RECONNECT_ATTEMPTS`.
+        """
+        self.ip = ip
+        self.protocol = protocol
+        host, _, port = ip.partition(":")
+        self.host = host
+        self.port = int(port) if port else 80
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.reconnect_attempts = reconnect_attempts
+
+        self.allowed_actions = dict(
+            _load_json(ACTIONS_JSON), **(custom_allowed_actions or {})
+        )
+        self.allowed_data = dict(_load_json(DATA_JSON), **(custom_allowed_data or {}))
+        self.allowed_infos = dict(
+            _load_json(INFOS_JSON), **(custom_allowed_infos or {})
+        )
+
+        self._idle = []
+        self._slots = None
+        self._ws = None
+        self.ws_lock = None
+        self._ws_reader = None
+        self.subscriptions = {}
+        self.reconnections = 0
+
+    # REST API
+
+    async def request(
+        self,
+        method: str,
+        endpoint: str,
+        data: Optional[Dict] = None,
+        params: Optional[Dict] = None,
+    ) -> Tuple[int, bytes]:
+        """Sends an HTTP request to Misty.
+
+        Args:
+            method (str): The request method.
+            endpoint (str): The endpoint, e.g. `"api/drive"`.
+            data (Optional[Dict], optional): The JSON body or `None` for no body. Defaults to `None`.
+            params (Optional[Dict], optional): The query parameters. Defaults to `None`.
+
+        Returns:
+            Tuple[int, bytes]: The status code and the body of the response.
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_connections)
+        path = "/" + endpoint.lstrip("/")
+        if params:
+            path += "?" + urlencode(params)
+        body = b"" if data is None else json.dumps(data).encode("utf-8")
+        head = (
+            "%s %s HTTP/1.1\r\nHost: %s\r\nContent-Type: application/json\r\n"
+            "Content-Length: %d\r\nConnection: keep-alive\r\n\r\n"
+            % (method.upper(), path, self.ip, len(body))
+        ).encode("latin-1")
+
+        async with self._slots:
+            # an idle connection may have been closed by Misty meanwhile, hence one retry on a new connection
+            for reuse in (True, False):
+                conn = self._take_idle() if reuse else None
+                if conn is None:
+                    reuse = False
+                    conn = await asyncio.wait_for(
+                        asyncio.open_connection(self.host, self.port), self.timeout
+                    )
+                reader, writer = conn
+                try:
+                    writer.write(head + body)
+                    status, keep_alive, content = await asyncio.wait_for(
+                        self._read_response(reader), self.timeout
+                    )
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    writer.close()
+                    if reuse and method.upper() in IDEMPOTENT_METHODS:
+                        continue
+                    raise
+                except BaseException:
+                    writer.close()
+                    raise
+                if keep_alive:
+                    self._idle.append(conn)
+                else:
+                    writer.close()
+                return status, content
+
+    def _take_idle(
+        self,
+    ) -> Optional[Tuple[asyncio.StreamReader, asyncio.StreamWriter]]:
+        """Returns the most recently used idle connection which Misty has not closed yet, closing the ones it has, or `None` if there is none."""
+        while self._idle:
+            reader, writer = self._idle.pop()
+            if not reader.at_eof() and not writer.is_closing():
+                return reader, writer
+            writer.close()
+        return None
+
+    async def _read_response(
+        self, reader: asyncio.StreamReader
+    ) -> Tuple[int, bool, bytes]:
+        """Reads an HTTP response with a body of a known length, a chunked body or a body ending with the connection.
+
+        Args:
+            reader (asyncio.StreamReader): The reader of the connection.
+
+        Returns:
+            Tuple[int, bool, bytes]: The status code, whether the connection can be reused and the body.
+
+        Raises:
+            ConnectionError: If Misty closed the connection before responding.
+        """
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError("Connection closed by Misty.")
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            key, _, value = line.decode("latin-1").partition(":")
+            headers[key.strip().lower()] = value.strip()
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    await reader.readline()
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+            content = b"".join(chunks)
+        elif "content-length" in headers:
+            content = await reader.readexactly(int(headers["content-length"]))
+        else:
+            content = await reader.read()
+            headers["connection"] = "close"
+        connection = headers.get("connection", "").lower()
+        if status_line.startswith(b"HTTP/1.0"):
+            keep_alive = connection == "keep-alive"
+        else:
+            keep_alive = connection != "close"
+        return status, keep_alive, content
+
+    async def _json_request(
+        self,
+        method: str,
+        endpoint: str,
+        data: Optional[Dict] = None,
+        params: Optional[Dict] = None,
+    ) -> Misty2pyResponse:
+        """Sends a request like `request` and parses its JSON response.
+
+        Returns:
+            Misty2pyResponse: The parsed response; an unsuccessful one if the request failed or the response is not JSON.
+        """
+        try:
+            _, content = await self.request(method, endpoint, data=data, params=params)
+        except Exception as e:
+            return unknown_error(e)
+        try:
+            return Misty2pyResponse(True, rest_response=json.loads(content))
+        except Exception as e:
+            return Misty2pyResponse(
+                False,
+                rest_response=content,
+                error_msg=e,
+                error_type=Misty2pyErrorType.UNKNOWN,
+            )
+
+    async def perform_action(
+        self, action_name: str, data: Any = None
+    ) -> Misty2pyResponse:
+        """Sends a request to perform an action like `misty2py.robot.Misty.perform_action`.
+
+        Args:
+            action_name (str): The keyword specifying the action to perform.
+            data (Any, optional): The data to send in the request body in the form of a data shortcut or a json dictionary; `None` for an empty dictionary. Defaults to `None`.
+
+        Returns:
+            Misty2pyResponse: A Misty2pyResponse object with Misty2py sub-response and Misty REST API sub-response.
+        """
+        if action_name not in self.allowed_actions:
+            return Misty2pyResponse(
+                False,
+                error_msg="Command `%s` not supported." % action_name,
+                error_type=Misty2pyErrorType.COMMAND,
+            )
+        if data is None:
+            data = {}
+        if (
+            action_name == "led_trans"
+            and isinstance(data, dict)
+            and 2 <= len(data) <= 4
+        ):
+            try:
+                data = construct_transition_dict(data, self.allowed_data)
+            except ValueError as e:
+                return Misty2pyResponse(
+                    False, error_msg=e, error_type=Misty2pyErrorType.DATA_FORMAT
+                )
+        if not isinstance(data, dict):
+            if data not in self.allowed_data:
+                return Misty2pyResponse(
+                    False,
+                    error_type=Misty2pyErrorType.DATA_SHORTCUT,
+                    error_msg="Data shortcut `%s` is not supported." % data,
+                )
+            data = self.allowed_data[data]
+
+        action = self.allowed_actions[action_name]
+        method = action["method"].upper()
+        if method not in VALID_HTTP_REQUEST_METHODS:
+            return Misty2pyResponse(
+                False,
+                error_msg="Request method `%s` is not supported." % method,
+                error_type=Misty2pyErrorType.REQUEST_METHOD,
+            )
+        return await self._json_request(method, action["endpoint"], data=data)
+
+    async def get_info(
+        self, info_name: str, params: Optional[Dict] = None
+    ) -> Misty2pyResponse:
+        """Sends an information request like `misty2py.robot.Misty.get_info`.
+
+        Args:
+            info_name (str): The information keyword specifying which information is requested.
+            params (Optional[Dict], optional): The query parameters. Defaults to `None`.
+
+        Returns:
+            Misty2pyResponse: A Misty2pyResponse object with Misty2py sub-response and Misty REST API sub-response.
+        """
+        if info_name not in self.allowed_infos:
+            return Misty2pyResponse(
+                False,
+                error_msg="Command `%s` not supported." % info_name,
+                error_type=Misty2pyErrorType.COMMAND,
+            )
+        return await self._json_request(
+            "GET", self.allowed_infos[info_name], params=params
+        )
+
+    # WebSocket API
+
+    async def _open_ws(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        """Opens a WebSocket connection to Misty's WebSocket API.
+
+        Returns:
+            Tuple[asyncio.StreamReader, asyncio.StreamWriter]: The streams of the connection.
+
+        Raises:
+            ConnectionError: If the handshake failed.
+        """
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), self.timeout
+        )
+        key = handshake_key()
+        writer.write(
+            (
+                "GET /pubsub HTTP/1.1\r\nHost: %s\r\nUpgrade: websocket\r\n"
+                "Connection: Upgrade\r\nSec-WebSocket-Key: %s\r\n"
+                "Sec-WebSocket-Version: 13\r\n\r\n" % (self.ip, key)
+            ).encode("latin-1")
+        )
+        try:
+            status_line = await asyncio.wait_for(reader.readline(), self.timeout)
+            headers = {}
+            while True:
+                line = await asyncio.wait_for(reader.readline(), self.timeout)
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+        except BaseException:
+            writer.close()
+            raise
+        if b" 101 " not in status_line + b" " or headers.get(
+            "sec-websocket-accept"
+        ) != accept_key(key):
+            writer.close()
+            raise ConnectionError("WebSocket handshake failed: %r" % status_line)
+        return reader, writer
+
+    async def _connect_ws(self) -> None:
+        """Opens the WebSocket connection and starts the task reading it; called with `ws_lock` held."""
+        reader, writer = await self._open_ws()
+        self._ws = (reader, writer)
+        self._ws_reader = asyncio.create_task(self._read_events(reader, writer))
+
+    async def _send_ws(
+        self, payload: Union[str, bytes], opcode: int = OPCODE_TEXT
+    ) -> None:
+        """Sends a masked frame over the WebSocket connection; called with `ws_lock` held, so that frames of concurrent senders do not interleave.
+
+        Args:
+            payload (Union[str, bytes]): The payload; a string is encoded in UTF-8.
+            opcode (int, optional): The opcode. Defaults to `OPCODE_TEXT`.
+        """
+        _, writer = self._ws
+        writer.write(encode_frame(payload, opcode, masked=True))
+        await writer.drain()
+
+    async def _receive_events(self, reader: asyncio.StreamReader) -> None:
+        """Delivers the messages received over a WebSocket connection to their subscriptions and answers pings until the connection is closed or lost."""
+        assembler = MessageAssembler()
+        try:
+            while True:
+                message = assembler.add(await read_frame_async(reader.readexactly))
+                if message is None:
+                    continue
+                opcode, payload = message
+                if opcode == OPCODE_CLOSE:
+                    break
+                if opcode == OPCODE_PING:
+                    async with self.ws_lock:
+                        if self._ws is not None:
+                            await self._send_ws(payload, OPCODE_PONG)
+                    continue
+                if opcode != OPCODE_TEXT:
+                    continue
+                try:
+                    message = json.loads(payload)
+                except ValueError:
+                    continue
+                if not isinstance(message, dict):
+                    continue
+                subscription = self.subscriptions.get(message.get("eventName"))
+                if subscription is not None:
+                    subscription._deliver(message.get("message"))
+        except (ConnectionError, OSError, asyncio.IncompleteReadError):
+            pass
+
+    async def _reconnect(
+        self,
+    ) -> Optional[Tuple[asyncio.StreamReader, asyncio.StreamWriter]]:
+        """Restores a lost WebSocket connection and renews all subscriptions on it, waiting `RECONNECT_DELAY` seconds before the first attempt and twice as long after every failed one.
+
+        Returns:
+            Optional[Tuple[asyncio.StreamReader, asyncio.StreamWriter]]: The streams of the new connection; `None` if there are no subscriptions left or all `reconnect_attempts` attempts failed.
+        """
+        delay = RECONNECT_DELAY
+        for _ in range(self.reconnect_attempts):
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, MAX_RECONNECT_DELAY)
+            async with self.ws_lock:
+                if not self.subscriptions:
+                    return None
+                try:
+                    reader, writer = await self._open_ws()
+                except (ConnectionError, OSError, asyncio.TimeoutError):
+                    continue
+                self._ws = (reader, writer)
+                try:
+                    for subscription in list(self.subscriptions.values()):
+                        await self._send_ws(
+                            json.dumps(subscription.request, separators=(",", ":"))
+                        )
+                except (ConnectionError, OSError):
+                    self._ws = None
+                    writer.close()
+                    continue
+                self.reconnections += 1
+                return reader, writer
+        return None
+
+    async def _read_events(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Reads the WebSocket connection for as long as there are subscriptions, restoring it whenever it is lost; ends all subscriptions once it is closed by `close` or cannot be restored."""
+        try:
+            while True:
+                await self._receive_events(reader)
+                self._ws = None
+                writer.close()
+                if not self.subscriptions:
+                    break
+                connection = await self._reconnect()
+                if connection is None:
+                    break
+                reader, writer = connection
+        finally:
+            self._ws = None
+            self._ws_reader = None
+            for subscription in self.subscriptions.values():
+                subscription._end()
+            self.subscriptions = {}
+
+    async def subscribe(
+        self,
+        type_str: str,
+        name: Optional[str] = None,
+        debounce: int = DEFAULT_DEBOUNCE,
+        return_property: Optional[str] = None,
+        event_conditions: Optional[List[Dict]] = None,
+        max_queued: int = DEFAULT_MAX_QUEUED,
+    ) -> EventSubscription:
+        """Subscribes to an event type.
+
+        Args:
+            type_str (str): The event type.
+            name (Optional[str], optional): The unique event name; generated if `None`. Defaults to `None`.
+            debounce (int, optional): The minimal interval between two messages in ms. Defaults to `250`.
+            return_property (Optional[str], optional): The only property of the messages to receive. Defaults to `None`.
+            event_conditions (Optional[List[Dict]], optional): The conditions the messages must satisfy to be sent (see `misty2py_skills.utils.events.event_condition`). Defaults to `None`.
+            max_queued (int, optional): The maximum number of undelivered messages. Defaults to `DEFAULT_MAX_QUEUED`.
+
+        Returns:
+            EventSubscription: The subscription.
+        """
+        if self.ws_lock is None:
+            self.ws_lock = asyncio.Lock()
+        if not name:
+            name = "event_%s_%s" % (type_str, get_random_string(8))
+        msg = {
+            "Operation": "subscribe",
+            "Type": type_str,
+            "DebounceMs": debounce,
+            "EventName": name,
+            "ReturnProperty": return_property,
+        }
+        if event_conditions:
+            msg["EventConditions"] = event_conditions
+        async with self.ws_lock:
+            if self._ws_reader is None:
+                await self._connect_ws()
+            subscription = EventSubscription(self, name, msg, max_queued=max_queued)
+            self.subscriptions[name] = subscription
+            # while the connection is being restored, the subscription is sent on the new connection
+            if self._ws is not None:
+                await self._send_ws(json.dumps(msg, separators=(",", ":")))
+        return subscription
+
+    async def unsubscribe(self, name: str) -> Misty2pyResponse:
+        """Unsubscribes from an event and ends its subscription.
+
+        Args:
+            name (str): The event name.
+
+        Returns:
+            Misty2pyResponse: A Misty2pyResponse object with Misty2py sub-response and Misty WebSocket API sub-response.
+        """
+        subscription = self.subscriptions.pop(name, None)
+        if subscription is None:
+            return Misty2pyResponse(
+                True,
+                ws_response={
+                    "success": False,
+                    "message": "Event type `%s` is not subscribed to." % name,
+                },
+            )
+        subscription._end()
+        msg = {"Operation": "unsubscribe", "EventName": name, "Message": ""}
+        try:
+            async with self.ws_lock:
+                if self._ws is not None:
+                    await self._send_ws(json.dumps(msg, separators=(",", ":")))
+        except (ConnectionError, OSError) as e:
+            return unknown_error(e)
+        return Misty2pyResponse(
+            True,
+            ws_response={"success": True, "message": "Event `%s` unsubscribed" % name},
+        )
+
+    async def close(self) -> None:
+        """Unsubscribes from all events and closes all connections."""
+        for name in list(self.subscriptions):
+            await self.unsubscribe(name)
+        if self.ws_lock is not None:
+            async with self.ws_lock:
+                if self._ws is not None:
+                    _, writer = self._ws
+                    try:
+                        await self._send_ws("", OPCODE_CLOSE)
+                    except (ConnectionError, OSError):
+                        pass
+                    writer.close()
+        if self._ws_reader is not None:
+            reading = self._ws_reader
+            reading.cancel()
+            try:
+                await reading
+            except asyncio.CancelledError:
+                pass
+            self._ws_reader = None
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
+
+    async def __aenter__(self) -> "AsyncMisty":
+        """Returns the AsyncMisty; the connections are opened when needed."""
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        """Closes all connections, see `close`."""
+        await self.close()
@@ -0,0 +1,362 @@
+"""This module implements the skill of `misty2py_skills.face_recognition` on an asyncio event loop: Misty greets the people she knows by their name and offers the others a face training session.
+
+The face recognition events, the greetings, the face training and the user inputs are all handled by tasks of one event loop instead of threads; the settings, the filtering, the greeting cooldowns and the reactions to user inputs are shared with the threaded skill via `misty2py_skills.utils.faces`. The state of a run is kept in a `FaceRecognitionState`, so that successive runs start afresh.
+"""
+import asyncio
+import time
+from typing import Callable, Dict, Iterable, Optional
+
+from misty2py.response import success_of_action_dict
+from misty2py.utils.status import Status
+
+from misty2py_skills.aio.basic_skills import cancel_skills, speak
+from misty2py_skills.aio.client import AsyncMisty
+from misty2py_skills.aio.inputs import stdin_lines
+from misty2py_skills.utils.events import EventRateMeter
+from misty2py_skills.utils.faces import (
+    MEASURE_RECOGNITIONS,
+    MIN_CONFIDENCE,
+    MIN_PERSISTENCE,
+    NAME_PROMPT,
+    RECOGNITION_CONDITIONS,
+    RECOGNITION_DEBOUNCE,
+    RECOGNITION_RETURN_PROPERTY,
+    TESTING_NAME,
+    TRAINING_PROMPT,
+    TRAINING_REPLIES,
+    TRAINING_START,
+    TRAINING_TIMEOUT,
+    UNKNOWN_LABEL,
+    UPDATE_TIME,
+    GreetingCooldowns,
+    InputActions,
+    RecognitionFilter,
+    StatusLabels,
+    UserResponses,
+    input_action,
+    training_outcome,
+    unique_face_id,
+    user_from_face_id,
+)
+
+PURGE_CONCURRENCY = 8
+"""The maximum number of concurrent requests forgetting the testing faces."""
+
+
+class FaceRecognitionState:
+    """The state of one run of the skill on one Misty: its status, the faces known to Misty (requested at the start and kept up to date by the skill), the greeting cooldowns, the client-side filter of face recognition events, the rates of the events `"received"`, `"accepted"` by the filter and `"acted_on"`, the task of the current face training (`train_face`) and the tasks performing face training sessions (`perform_training`)."""
+
+    def __init__(self, misty: AsyncMisty) -> None:
+        """Initialises the state of a run that has not started yet.
+
+        Args:
+            misty (AsyncMisty): The Misty performing the skill.
+        """
+        self.misty = misty
+        self.status = Status()
+        self.known_faces = set()
+        self.greeting_cooldowns = GreetingCooldowns(UPDATE_TIME)
+        self.recognition_filter = RecognitionFilter(
+            MIN_CONFIDENCE, MIN_PERSISTENCE, UPDATE_TIME
+        )
+        self.recognition_meter = EventRateMeter()
+        self.training = None
+        self.trainings = set()
+
+
+async def train_face(
+    misty: AsyncMisty,
+    face_id: str,
+    timeout: float = TRAINING_TIMEOUT,
+    on_progress: Optional[Callable[[str, float], None]] = None,
+) -> Dict:
+    """Trains a face, streaming the FaceTraining progress messages, and cancels the training if it does not finish within `timeout` seconds or if the task is cancelled.
+
+    Args:
+        misty (AsyncMisty): The Misty to learn the face.
+        face_id (str): The ID under which to learn the face.
+        timeout (float, optional): The deadline of the training in seconds after its start. Defaults to `TRAINING_TIMEOUT`.
+        on_progress (Optional[Callable[[str, float], None]], optional): Called with every progress message and the time elapsed since the start. Defaults to `None`.
+
+    Returns:
+        Dict: The report of the training like `misty2py_skills.face_recognition.TrainingSession.report`, i.e. the face ID, the outcome (`"complete"`, `"failed"` or `"timeout"`), the duration and the phase timings.
+
+    Raises:
+        asyncio.CancelledError: If the task is cancelled; the training is cancelled on Misty first.
+    """
+    started = time.perf_counter()
+    phases = {}
+    outcome = None
+    subscription = await misty.subscribe("FaceTraining")
+    try:
+        response = await misty.perform_action(
+            "face_train_start", data={"FaceId": face_id}
+        )
+        if not response.parse_to_dict().get("overall_success"):
+            outcome = "failed"
+        previous = 0.0
+        while outcome is None:
+            remaining = timeout - (time.perf_counter() - started)
+            try:
+                data = await subscription.next(max(remaining, 0))
+            except asyncio.TimeoutError:
+                outcome = "timeout"
+                break
+            except StopAsyncIteration:
+                outcome = "failed"
+                break
+            if not isinstance(data, dict) or data.get("faceId", face_id) != face_id:
+                continue
+            message = data.get("message", "")
+            elapsed = time.perf_counter() - started
+            phases[message] = elapsed - previous
+            previous = elapsed
+            if on_progress is not None:
+                on_progress(message, elapsed)
+            outcome = training_outcome(data, face_id)
+    except asyncio.CancelledError:
+        outcome = "cancelled"
+        raise
+    finally:
+        if outcome in ("timeout", "cancelled"):
+            await misty.perform_action("face_train_cancel")
+        await subscription.unsubscribe()
+    return {
+        "face_id": face_id,
+        "outcome": outcome,
+        "duration": time.perf_counter() - started,
+        "phases": phases,
+    }
+
+
+def print_training_progress(message: str, elapsed: float) -> None:
+    """Prints a progress message of a face training."""
+    print("[%.2f s] %s" % (elapsed, message))
+
+
+async def speak_wrapper(state: FaceRecognitionState, utterance: str) -> None:
+    """Changes status to `StatusLabels.TALK` while Misty is talking."""
+    prev_stat = state.status.get_("status")
+    state.status.set_(status=StatusLabels.TALK)
+    print(await speak(state.misty, utterance))
+    state.status.set_(status=prev_stat)
+
+
+async def greet(state: FaceRecognitionState, label: str) -> None:
+    """Greets a known person or asks an unknown person whether to begin a face training session."""
+    if label == UNKNOWN_LABEL:
+        state.status.set_(status=StatusLabels.PROMPT)
+        await speak_wrapper(state, TRAINING_PROMPT)
+        print("An unknown face detected.\nDo you want to start training (yes/no)? [no]")
+    else:
+        await speak_wrapper(state, f"Hello, {user_from_face_id(label)}!")
+        state.status.set_(status=StatusLabels.MAIN)
+
+
+async def handle_recognitions(state: FaceRecognitionState, subscription) -> None:
+    """Greets the people in the face recognition events of `subscription` until it ends.
+
+    A recognition is only acted on in the main state and once per `UPDATE_TIME` seconds per person; the greeting runs as a separate task, so that the events received meanwhile are consumed (and ignored) without delay.
+    """
+    greetings = set()
+    async for data in subscription:
+        if not isinstance(data, dict):
+            if RECOGNITION_RETURN_PROPERTY != "label":
+                continue
+            data = {"label": data}
+        det_time = time.time()
+        state.recognition_meter.count("received")
+        label = data.get("label")
+        if not state.recognition_filter.accept(label, data.get("confidence"), det_time):
+            continue
+        state.recognition_meter.count("accepted")
+        if state.status.get_("status") != StatusLabels.MAIN:
+            continue
+        if state.greeting_cooldowns.check_and_renew(label, det_time):
+            state.recognition_meter.count("acted_on")
+            state.status.set_(status=StatusLabels.GREET, data=label, time=det_time)
+            greeting = asyncio.create_task(greet(state, label))
+            greetings.add(greeting)
+            greeting.add_done_callback(greetings.discard)
+    await asyncio.gather(*greetings)
+
+
+async def perform_training(state: FaceRecognitionState, name: str) -> None:
+    """Trains the face of the user under a unique variant of `name` and informs the user about the outcome; a cancelled training ends the session without a reply."""
+    state.status.set_(status=StatusLabels.TRAIN)
+    new_name = unique_face_id(name, state.known_faces)
+
+    await speak_wrapper(state, TRAINING_START)
+    state.training = asyncio.create_task(
+        train_face(state.misty, new_name, on_progress=print_training_progress)
+    )
+    try:
+        report = await state.training
+    except asyncio.CancelledError:
+        report = {"face_id": new_name, "outcome": "cancelled"}
+    finally:
+        state.training = None
+    print(report)
+    if report["outcome"] == "complete":
+        state.known_faces.add(new_name)
+    if report["outcome"] in TRAINING_REPLIES:
+        await speak_wrapper(state, TRAINING_REPLIES[report["outcome"]])
+    state.status.set_(status=StatusLabels.MAIN)
+
+
+async def handle_user_input(state: FaceRecognitionState, user_input: str) -> None:
+    """Handles user inputs; the face training runs as a separate task, so that it can be stopped by a later input."""
+    action = input_action(state.status.get_("status"), user_input)
+    if action == InputActions.INITIALISE:
+        state.status.set_(status=StatusLabels.INIT)
+        await speak_wrapper(state, NAME_PROMPT)
+        print("Enter your name (the first name suffices)")
+
+    elif action == InputActions.TRAIN:
+        session = asyncio.create_task(perform_training(state, user_input))
+        state.trainings.add(session)
+        session.add_done_callback(state.trainings.discard)
+        # the status must change before the next input is handled
+        state.status.set_(status=StatusLabels.TRAIN)
+
+    elif action == InputActions.ABANDON:
+        state.status.set_(status=StatusLabels.MAIN)
+
+    elif action == InputActions.CANCEL_TRAINING and state.training is not None:
+        state.training.cancel()
+
+    elif action == InputActions.STOP_SPEAKING:
+        print((await state.misty.perform_action("speak_stop")).parse_to_dict())
+        state.status.set_(status=StatusLabels.MAIN)
+
+    elif action == InputActions.DECLINE:
+        print("Training not initialised.")
+        state.status.set_(status=StatusLabels.MAIN)
+
+
+async def purge_testing_faces(
+    state: FaceRecognitionState, faces: Iterable[str]
+) -> None:
+    """Forgets the faces of users that start with `TESTING_NAME`, sending at most `PURGE_CONCURRENCY` requests at the same time."""
+    slots = asyncio.Semaphore(PURGE_CONCURRENCY)
+
+    async def delete_face(face: str) -> None:
+        async with slots:
+            response = await state.misty.perform_action(
+                "face_delete", data={"FaceId": face}
+            )
+        if response.parse_to_dict().get("rest_response", {}).get("success"):
+            state.known_faces.discard(face)
+            print("Successfully forgot the face of %s." % face)
+        else:
+            print("Failed to forget the face of %s." % face)
+
+    await asyncio.gather(
+        *(delete_face(face) for face in faces if face.startswith(TESTING_NAME))
+    )
+
+
+async def face_recognition(
+    misty: AsyncMisty,
+    inputs: Optional[asyncio.Queue] = None,
+    measure: bool = MEASURE_RECOGNITIONS,
+    state: Optional[FaceRecognitionState] = None,
+) -> Dict:
+    """Misty detects a face, if she knows the person, she greets them by their name, else she prompts them to join a face training session.
+
+    Args:
+        misty (AsyncMisty): The Misty to perform the skill.
+        inputs (Optional[asyncio.Queue], optional): The queue of user inputs, which ends the skill with `None`; if `None`, the terminal is read. Defaults to `None`.
+        measure (bool, optional): Whether to report the rates of face recognition events under the key `"recognition_rates"`. Defaults to `MEASURE_RECOGNITIONS`.
+        state (Optional[FaceRecognitionState], optional): The state of this run, e.g. to observe it; a new state if `None`. Defaults to `None`.
+
+    Returns:
+        Dict: The dictionary with `"overall_success"` key (bool) and keys for every action performed (dictionarised Misty2pyResponse).
+    """
+    if state is None:
+        state = FaceRecognitionState(misty)
+    await cancel_skills(misty)
+    set_volume, get_faces_known = await asyncio.gather(
+        misty.perform_action("volume_settings", data="low_volume"),
+        misty.get_info("faces_known"),
+    )
+    set_volume = set_volume.parse_to_dict()
+    get_faces_known = get_faces_known.parse_to_dict()
+    faces = get_faces_known.get("rest_response", {}).get("result")
+    state.known_faces.update(faces if isinstance(faces, list) else [])
+    if state.known_faces:
+        print(
+            "Your misty currently knows these faces: %s."
+            % ", ".join(sorted(state.known_faces))
+        )
+        await purge_testing_faces(state, list(state.known_faces))
+    else:
+        print("Your Misty currently does not know any faces.")
+
+    start_face_recognition = (
+        await misty.perform_action("face_recognition_start")
+    ).parse_to_dict()
+
+    subscription = await misty.subscribe(
+        "FaceRecognition",
+        debounce=RECOGNITION_DEBOUNCE,
+        return_property=RECOGNITION_RETURN_PROPERTY,
+        event_conditions=RECOGNITION_CONDITIONS,
+        max_queued=16,
+    )
+    subscribe_face_recognition = {
+        "overall_success": True,
+        "event_name": subscription.event_name,
+    }
+    state.status.set_(status=StatusLabels.MAIN)
+    recognising = asyncio.create_task(handle_recognitions(state, subscription))
+
+    if inputs is None:
+        inputs = stdin_lines()
+    print(">>> Type 'stop' to terminate <<<")
+    while True:
+        user_input = await inputs.get()
+        if user_input is None:
+            break
+        user_input = user_input.lower()
+        if (
+            user_input in UserResponses.STOP
+            and state.status.get_("status") == StatusLabels.MAIN
+        ):
+            break
+        await handle_user_input(state, user_input)
+
+    unsubscribe_face_recognition = (await subscription.unsubscribe()).parse_to_dict()
+    await recognising
+    for session in state.trainings:
+        session.cancel()
+    # the cancelled trainings are cancelled on Misty before the client is released
+    await asyncio.gather(*state.trainings, return_exceptions=True)
+    face_recognition_stop = (
+        await misty.perform_action("face_recognition_stop")
+    ).parse_to_dict()
+
+    await speak_wrapper(state, "Bye!")
+
+    result = success_of_action_dict(
+        set_volume=set_volume,
+        get_faces_known=get_faces_known,
+        start_face_recognition=start_face_recognition,
+        subscribe_face_recognition=subscribe_face_recognition,
+        unsubscribe_face_recognition=unsubscribe_face_recognition,
+        face_recognition_stop=face_recognition_stop,
+    )
+    if measure:
+        result["recognition_rates"] = state.recognition_meter.report()
+    return result
+
+
+if __name__ == "__main__":
+    from misty2py.utils.env_loader import EnvLoader
+    from misty2py.utils.utils import get_abs_path
+
+    async def main() -> None:
+        async with AsyncMisty(EnvLoader(get_abs_path(".env")).get_ip()) as misty:
+            print(await face_recognition(misty))
+
+    asyncio.run(main())
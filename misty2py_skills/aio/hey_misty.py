@@ -0,0 +1,115 @@
+"""This module implements the skill of `misty2py_skills.hey_misty` on an asyncio event loop: Misty reacts to the keyphrase "Hey, Misty!" with the listening expression.
+"""
+import asyncio
+from typing import Dict, Optional
+
+from misty2py.response import success_of_action_dict
+
+from misty2py_skills.aio.basic_skills import cancel_skills, expression
+from misty2py_skills.aio.client import AsyncMisty
+from misty2py_skills.aio.inputs import stdin_lines
+
+MIN_CONFIDENCE = 60
+"""The minimal confidence of a keyphrase recognition that Misty reacts to."""
+
+
+async def react(misty: AsyncMisty, data: Dict) -> Optional[Dict]:
+    """Reacts to a keyphrase recognition event with the listening expression if the confidence is at least `MIN_CONFIDENCE`.
+
+    Returns:
+        Optional[Dict]: The result of the expression or `None` if Misty did not react.
+    """
+    conf = data.get("confidence") if isinstance(data, dict) else None
+    if not isinstance(conf, int) or conf < MIN_CONFIDENCE:
+        return None
+    print("Hello!")
+    return await expression(misty, colour="azure_light", sound="sound_wake")
+
+
+async def greet(misty: AsyncMisty, stop: Optional[asyncio.Event] = None) -> Dict:
+    """Misty reacts to the keyphrase "Hey, Misty!" with a listening expression until `stop` is set.
+
+    Args:
+        misty (AsyncMisty): The Misty to perform the skill.
+        stop (Optional[asyncio.Event], optional): Ends the skill once set; if `None`, the skill ends when enter is pressed or at the end of the standard input. Defaults to `None`.
+
+    Returns:
+        Dict: The dictionary with `"overall_success"` key (bool), keys for every action performed (dictionarised Misty2pyResponse) and the key `"reactions"` with the results of the expressions.
+    """
+    await cancel_skills(misty)
+    enable_audio = (await misty.perform_action("audio_enable")).parse_to_dict()
+    keyphrase_start = (
+        await misty.perform_action(
+            "keyphrase_recognition_start", data={"CaptureSpeech": "false"}
+        )
+    ).parse_to_dict()
+
+    if not keyphrase_start.get("rest_response", {}).get("result"):
+        keyphrase_start["rest_response"] = {"success": False}
+        return success_of_action_dict(
+            enable_audio=enable_audio, keyphrase_start=keyphrase_start
+        )
+
+    subscription = await misty.subscribe("KeyPhraseRecognized")
+    keyphrase_subscribe = {
+        "overall_success": True,
+        "event_name": subscription.event_name,
+    }
+    print("Keyphrase recognition started.")
+
+    waiting = None
+    if stop is None:
+        stop = asyncio.Event()
+        lines = stdin_lines()
+
+        async def stop_on_enter():
+            # any line or the end of the input
+            await lines.get()
+            stop.set()
+
+        print("\n>>> Press enter to terminate, do not force quit <<<\n")
+        waiting = asyncio.create_task(stop_on_enter())
+
+    async def react_to_keyphrases():
+        async for data in subscription:
+            reaction = await react(misty, data)
+            if reaction is not None:
+                reactions.append(reaction)
+
+    reactions = []
+    reacting = asyncio.create_task(react_to_keyphrases())
+    await stop.wait()
+    if waiting is not None:
+        await waiting
+
+    print("Keyphrase recognition ended.")
+    keyphrase_unsubscribe = (await subscription.unsubscribe()).parse_to_dict()
+    await reacting
+    keyphrase_stop = (
+        await misty.perform_action("keyphrase_recognition_stop")
+    ).parse_to_dict()
+    disable_audio = (await misty.perform_action("audio_disable")).parse_to_dict()
+
+    if len(reactions) == 0:
+        print("Keyphrase not recognised.")
+    result = success_of_action_dict(
+        enable_audio=enable_audio,
+        keyphrase_start=keyphrase_start,
+        keyphrase_subscribe=keyphrase_subscribe,
+        keyphrase_unsubscribe=keyphrase_unsubscribe,
+        keyphrase_stop=keyphrase_stop,
+        disable_audio=disable_audio,
+    )
+    result["reactions"] = reactions
+    return result
+
+
+if __name__ == "__main__":
+    from misty2py.utils.env_loader import EnvLoader
+    from misty2py.utils.utils import get_abs_path
+
+    async def main() -> None:
+        async with AsyncMisty(EnvLoader(get_abs_path(".env")).get_ip()) as misty:
+            print(await greet(misty))
+
+    asyncio.run(main())
@@ -0,0 +1,22 @@
+"""This module feeds the lines of the standard input into an `asyncio.Queue`, so that skills on an event loop can await typed commands.
+"""
+import asyncio
+import sys
+import threading
+
+
+def stdin_lines() -> asyncio.Queue:
+    """Starts reading the standard input on a daemon thread, which does not keep the interpreter alive, and returns the queue receiving its lines; the queue receives `None` at the end of the input.
+
+    Must be called from a running event loop.
+    """
+    loop = asyncio.get_running_loop()
+    lines = asyncio.Queue()
+
+    def read() -> None:
+        for line in sys.stdin:
+            loop.call_soon_threadsafe(lines.put_nowait, line.rstrip("\r\n"))
+        loop.call_soon_threadsafe(lines.put_nowait, None)
+
+    threading.Thread(target=read, daemon=True).start()
+    return lines
@@ -0,0 +1,205 @@
+"""This module implements the dialogue skill of `misty2py_skills.question_answering` on an asyncio event loop.
+
+The dialogue awaits the VoiceRecord and TextToSpeechComplete events directly instead of switching states from listener threads; the transcription runs on a worker thread so that it does not block the other skills on the loop. The routing, the replies and the loading of captured speech are shared with the threaded skill via `misty2py_skills.utils.dialogue`.
+"""
+import asyncio
+from typing import Dict, Optional
+
+from misty2py.utils.generators import get_random_string
+from misty2py.utils.utils import get_abs_path
+
+from misty2py_skills.aio.basic_skills import cancel_skills
+from misty2py_skills.aio.client import AsyncMisty, EventSubscription
+from misty2py_skills.essentials.speech_transcripter import get_speech_transcripter
+from misty2py_skills.utils import dialogue
+from misty2py_skills.utils.status import StreamingActionLog
+from misty2py_skills.utils.utils import SequentialFileNames
+
+speech_transcripter = get_speech_transcripter()
+
+SAVE_DIR = get_abs_path("data")
+"""The location where a speech file is archived."""
+ARCHIVE_SPEECH = True
+"""Whether the captured speech is archived in `SAVE_DIR` in the background."""
+speech_archive = SequentialFileNames(SAVE_DIR)
+"""Allocates the names of the speech files archived in `SAVE_DIR`."""
+
+
+async def prepare_audio(misty: AsyncMisty, actions: StreamingActionLog) -> bool:
+    """Enables the audio service if it is disabled and sets the volume.
+
+    Returns:
+        bool: `True` if the audio service is enabled, `False` otherwise.
+    """
+    audio_status = (await misty.get_info("audio_status")).parse_to_dict()
+    actions.append_({"audio_status": audio_status})
+
+    if not audio_status.get("rest_response", {}).get("result"):
+        enable_audio = (await misty.perform_action("audio_enable")).parse_to_dict()
+        if not enable_audio.get("rest_response", {}).get("result"):
+            actions.append_({"enable_audio": enable_audio})
+            return False
+
+    set_volume = (
+        await misty.perform_action("volume_settings", data="low_volume")
+    ).parse_to_dict()
+    actions.append_({"set_volume": set_volume})
+    return True
+
+
+async def capture_speech(
+    misty: AsyncMisty, voice_records: EventSubscription, actions: StreamingActionLog
+) -> Optional[bool]:
+    """Captures speech and waits for its VoiceRecord event.
+
+    Returns:
+        Optional[bool]: `True` if speech was captured, `False` if the capture should be repeated and `None` if the capture request failed.
+    """
+    print("Listening")
+    capture = (
+        await misty.perform_action("speech_capture", data={"RequireKeyPhrase": False})
+    ).parse_to_dict()
+    actions.append_({"capture_speech": capture})
+    if not capture.get("overall_success"):
+        return None
+    async for data in voice_records:
+        if data.get("errorCode", -1) == 0:
+            return True
+        if data.get("errorCode", -1) == 3:
+            return False
+    return False
+
+
+async def transcribe(misty: AsyncMisty) -> Dict:
+    """Downloads the newest captured speech and transcribes it on a worker thread.
+
+    Returns:
+        Dict: The transcription or an empty dictionary if the speech could not be obtained.
+    """
+    print("Analysing")
+    speech_json = (
+        (
+            await misty.get_info(
+                "audio_file",
+                params={"FileName": dialogue.SPEECH_FILE, "Base64": "true"},
+            )
+        )
+        .parse_to_dict()
+        .get("rest_response", {})
+    )
+    speech_result = speech_json.get("result")
+    speech_base64 = ""
+    if speech_json.get("success") and isinstance(speech_result, dict):
+        speech_base64 = speech_result.get("base64", "")
+    if len(speech_base64) == 0:
+        return {}
+
+    def load_and_transcribe() -> Dict:
+        archive = speech_archive if ARCHIVE_SPEECH else None
+        speech_wav = dialogue.load_speech(speech_base64, speech_transcripter, archive)
+        return speech_transcripter.audio_to_text(speech_wav, show_all=True)
+
+    return await asyncio.to_thread(load_and_transcribe)
+
+
+async def reply(
+    misty: AsyncMisty,
+    reply_type: str,
+    tts_completions: EventSubscription,
+    actions: StreamingActionLog,
+) -> None:
+    """Speaks the reply of `reply_type` and, unless the dialogue ends, waits up to `TTS_TIMEOUT` seconds until Misty finishes speaking it."""
+    print("Replying")
+    handler = dialogue.reply_handlers.get(
+        reply_type, dialogue.reply_handlers["unknown"]
+    )
+    utterance = handler()
+    print(utterance)
+
+    utterance_id = "utterance_" + get_random_string(6)
+    speaking = (
+        await misty.perform_action(
+            "speak",
+            data={"Text": utterance, "Flush": "true", "UtteranceId": utterance_id},
+        )
+    ).parse_to_dict()
+    actions.append_({"speaking": speaking})
+    if reply_type == "goodbye" or not speaking.get("overall_success"):
+        return
+
+    async def spoken() -> None:
+        async for data in tts_completions:
+            if data.get("utteranceId") in (None, utterance_id):
+                return
+
+    try:
+        await asyncio.wait_for(spoken(), dialogue.TTS_TIMEOUT)
+    except asyncio.TimeoutError:
+        pass
+
+
+async def question_answering(misty: AsyncMisty) -> Dict:
+    """A skill that allows a person to have a simple dialogue with Misty.
+
+    Args:
+        misty (AsyncMisty): The Misty to perform the skill.
+
+    Returns:
+        Dict: The dictionary with `"overall_success"` key (bool), keys for every action performed (dictionarised Misty2pyResponse) and, if transcriptions are cached, the key `"transcription_cache"` with the cache statistics.
+    """
+    dialogue.date_renderer.warm()
+    actions = StreamingActionLog()
+    await cancel_skills(misty)
+    voice_records = await misty.subscribe("VoiceRecord")
+    tts_completions = await misty.subscribe("TextToSpeechComplete")
+
+    audio_ready = False
+    reply_type = None
+    while reply_type != "goodbye":
+        if not audio_ready:
+            audio_ready = await prepare_audio(misty, actions)
+            if not audio_ready:
+                break
+        captured = await capture_speech(misty, voice_records, actions)
+        if voice_records.ended:
+            break
+        if not captured:
+            # the audio is prepared again after a failed capture request
+            audio_ready = captured is not None
+            continue
+
+        speech_text = await transcribe(misty)
+        if not speech_text:
+            continue
+        print("Preparing the reply")
+        reply_type = dialogue.route_speech(speech_text)
+        await reply(misty, reply_type, tts_completions, actions)
+
+    actions.append_(
+        {
+            "unsubscribe_voice_record": (
+                await voice_records.unsubscribe()
+            ).parse_to_dict()
+        }
+    )
+    actions.append_(
+        {
+            "unsubscribe_tts_complete": (
+                await tts_completions.unsubscribe()
+            ).parse_to_dict()
+        }
+    )
+    result = actions.summarise()
+    if speech_transcripter.cache is not None:
+        result["transcription_cache"] = speech_transcripter.cache.stats()
+    return result
+
+
+if __name__ == "__main__":
+    from misty2py.utils.env_loader import EnvLoader
+
+    async def main() -> None:
+        async with AsyncMisty(EnvLoader(get_abs_path(".env")).get_ip()) as misty:
+            print(await question_answering(misty))
+
+    asyncio.run(main())
@@ -0,0 +1,200 @@
+"""This module implements the analysis of the battery telemetry recorded by `misty2py_skills.demonstrations.battery_printer.battery_recorder`: the discharge rate, time-to-empty estimates, charge cycles and temperature excursions, computed with NumPy over rolling windows of records.
+
+Binary recordings are memory-mapped rather than read, so recordings of several days are analysed without loading them into memory; CSV recordings are parsed into memory in full, so long recordings should be made in the binary format. The rolling windows are evaluated in chunks of `CHUNK_SIZE` windows either way. Requires the `numpy` package, install it with `poetry install -E battery-analysis` or `pip install numpy`.
+"""
+import sys
+from typing import Dict, Iterator, List, Tuple
+
+try:
+    import numpy as np
+    from numpy.lib.stride_tricks import sliding_window_view
+except ImportError as e:
+    raise ImportError(
+        "The battery analysis requires the `numpy` package, install it with `pip install numpy`."
+    ) from e
+
+from misty2py_skills.demonstrations.battery_printer import TELEMETRY_FIELDS
+
+TELEMETRY_DTYPE = np.dtype(
+    [(field, "<f8") for field in TELEMETRY_FIELDS[:-1]] + [(TELEMETRY_FIELDS[-1], "u1")]
+)
+"""The NumPy equivalent of `misty2py_skills.demonstrations.battery_printer.TELEMETRY_RECORD`."""
+WINDOW = 100
+"""The default number of records in a rolling window."""
+TEMPERATURE_LIMIT = 45
+"""The default temperature in °C above which the rolling mean temperature is an excursion."""
+CHUNK_SIZE = 65536
+"""The number of rolling windows evaluated at once."""
+
+
+def load_telemetry(path: str) -> np.ndarray:
+    """Loads a recording as a structured array of `TELEMETRY_DTYPE`.
+
+    Args:
+        path (str): The path of the recording; a CSV recording if it ends with `.csv`, a binary recording otherwise.
+
+    Returns:
+        np.ndarray: The records; a read-only memory map of the file for a binary recording and an array in memory for a CSV recording. A trailing incomplete record (e.g. of a recording in progress) is ignored.
+    """
+    if path.endswith(".csv"):
+        return np.atleast_1d(
+            np.loadtxt(path, dtype=TELEMETRY_DTYPE, delimiter=",", skiprows=1)
+        )
+    with open(path, "rb") as f:
+        size = f.seek(0, 2)
+    length = size // TELEMETRY_DTYPE.itemsize
+    if length == 0:
+        return np.empty(0, dtype=TELEMETRY_DTYPE)
+    return np.memmap(path, dtype=TELEMETRY_DTYPE, mode="r", shape=(length,))
+
+
+def _chunks(windows: int) -> Iterator[Tuple[int, int]]:
+    for start in range(0, windows, CHUNK_SIZE):
+        yield start, min(start + CHUNK_SIZE, windows)
+
+
+def rolling_mean(values: np.ndarray, window: int = WINDOW) -> np.ndarray:
+    """Returns the mean of every `window` consecutive values; the i-th mean ends with the value at the index `i + window - 1`."""
+    windows = max(len(values) - window + 1, 0)
+    means = np.empty(windows)
+    for start, stop in _chunks(windows):
+        chunk = np.asarray(values[start : stop + window - 1], dtype=np.float64)
+        means[start:stop] = sliding_window_view(chunk, window).mean(axis=1)
+    return means
+
+
+def rolling_slope(x: np.ndarray, y: np.ndarray, window: int = WINDOW) -> np.ndarray:
+    """Returns the least-squares slope of `y` over `x` in every `window` consecutive records, aligned as in `rolling_mean`; `nan` where `x` does not change within a window.
+
+    Each window is centred on its own means, so the slopes stay precise for the large `x` of long recordings.
+    """
+    windows = max(len(x) - window + 1, 0)
+    slopes = np.empty(windows)
+    for start, stop in _chunks(windows):
+        xs = sliding_window_view(
+            np.asarray(x[start : stop + window - 1], dtype=np.float64), window
+        )
+        ys = sliding_window_view(
+            np.asarray(y[start : stop + window - 1], dtype=np.float64), window
+        )
+        dx = xs - xs.mean(axis=1, keepdims=True)
+        dy = ys - ys.mean(axis=1, keepdims=True)
+        variance = (dx * dx).sum(axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            slopes[start:stop] = np.where(
+                variance > 0, (dx * dy).sum(axis=1) / variance, np.nan
+            )
+    return slopes
+
+
+def discharge_rate(telemetry: np.ndarray, window: int = WINDOW) -> np.ndarray:
+    """Returns the change of `chargePercent` per hour in every rolling window of the records, aligned as in `rolling_mean`; negative while discharging and `nan` for the windows in which Misty was charging."""
+    rates = rolling_slope(telemetry["time"], telemetry["chargePercent"], window) * 3600
+    charging = rolling_mean(telemetry["isCharging"], window) > 0
+    rates[charging] = np.nan
+    return rates
+
+
+def time_to_empty(telemetry: np.ndarray, window: int = WINDOW) -> np.ndarray:
+    """Returns the estimated time in seconds until the battery is empty at the end of every rolling window of the records, aligned as in `rolling_mean`, given the discharge rate of the window; `inf` if the battery is not discharging."""
+    rates = discharge_rate(telemetry, window) / 3600
+    charge = np.asarray(telemetry["chargePercent"][window - 1 :], dtype=np.float64)
+    estimates = np.full(len(rates), np.inf)
+    discharging = rates < 0
+    estimates[discharging] = charge[discharging] / -rates[discharging]
+    return estimates
+
+
+def _runs(mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Returns the start indices and the (exclusive) end indices of the runs of `True` in `mask`."""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def charge_cycles(telemetry: np.ndarray) -> List[Dict]:
+    """Detects the periods in which Misty was charging.
+
+    Returns:
+        List[Dict]: For every period, its `"start"` and `"end"` (the times of its first and last record) and the `"start_charge"` and `"end_charge"` (the `chargePercent` of these records).
+    """
+    starts, ends = _runs(np.asarray(telemetry["isCharging"]) > 0)
+    times = telemetry["time"]
+    charge = telemetry["chargePercent"]
+    return [
+        {
+            "start": float(times[start]),
+            "end": float(times[end - 1]),
+            "start_charge": float(charge[start]),
+            "end_charge": float(charge[end - 1]),
+        }
+        for start, end in zip(starts, ends)
+    ]
+
+
+def temperature_excursions(
+    telemetry: np.ndarray,
+    limit: float = TEMPERATURE_LIMIT,
+    window: int = WINDOW,
+) -> List[Dict]:
+    """Detects the periods in which the rolling mean temperature exceeded `limit`.
+
+    Returns:
+        List[Dict]: For every period, its `"start"` and `"end"` (the times of the ends of its first and last window) and the `"peak"` (the highest rolling mean temperature).
+    """
+    means = rolling_mean(telemetry["temperature"], window)
+    starts, ends = _runs(means > limit)
+    times = telemetry["time"][window - 1 :]
+    return [
+        {
+            "start": float(times[start]),
+            "end": float(times[end - 1]),
+            "peak": float(means[start:end].max()),
+        }
+        for start, end in zip(starts, ends)
+    ]
+
+
+def analyse(
+    telemetry: np.ndarray,
+    window: int = WINDOW,
+    temperature_limit: float = TEMPERATURE_LIMIT,
+) -> Dict:
+    """Summarises the battery telemetry.
+
+    Args:
+        telemetry (np.ndarray): The records as returned by `load_telemetry`.
+        window (int, optional): The number of records in a rolling window. Defaults to `WINDOW`.
+        temperature_limit (float, optional): The temperature in °C above which the rolling mean temperature is an excursion. Defaults to `TEMPERATURE_LIMIT`.
+
+    Returns:
+        Dict: The number of `"records"`, the `"duration"` of the recording in seconds, the `"discharge_rate"` per hour (the `"mean"` and `"latest"` over the windows in which Misty was discharging, `None` if there are none), the latest `"time_to_empty"` estimate in seconds (`None` if unknown or not discharging) and the `"charge_cycles"` and `"temperature_excursions"`.
+    """
+    records = len(telemetry)
+    window = max(min(window, records), 1)
+    rates = discharge_rate(telemetry, window)
+    rates = rates[~np.isnan(rates)]
+    estimates = time_to_empty(telemetry, window)
+    return {
+        "records": records,
+        "duration": float(telemetry["time"][-1] - telemetry["time"][0])
+        if records > 0
+        else 0.0,
+        "discharge_rate": {
+            "mean": float(rates.mean()) if len(rates) > 0 else None,
+            "latest": float(rates[-1]) if len(rates) > 0 else None,
+        },
+        "time_to_empty": float(estimates[-1])
+        if len(estimates) > 0 and np.isfinite(estimates[-1])
+        else None,
+        "charge_cycles": charge_cycles(telemetry),
+        "temperature_excursions": temperature_excursions(
+            telemetry, temperature_limit, window
+        ),
+    }
+
+
+if __name__ == "__main__":
+    args = sys.argv
+    if len(args) < 2:
+        raise TypeError("This script expects the path of a battery recording")
+    print(analyse(load_telemetry(args[1])))
@@ -1,48 +1,226 @@
-"""This module implements a skill that prints the battery status every 250ms for the duration specified by the system argument.
+"""This module implements a skill that prints the battery status every 250ms for the duration specified by the system argument and a telemetry recorder mode that records the battery status into a file at a high rate, enabled by passing the path of the file as the second system argument.
+
+The recorder guesses the format of the file from the path: a path ending with `.csv` is written in CSV, any other path in the binary layout of `TELEMETRY_RECORD`.
 """
+import array
+import csv
+import operator
+import os
+import struct
 import sys
+import threading
 import time
-from typing import Dict, Union
+from typing import Dict, Optional, Tuple, Union
 
 from misty2py.basic_skills.cancel_skills import cancel_skills
-from misty2py.response import success_of_action_list
+from misty2py.response import success_of_action_dict
 from misty2py.robot import Misty
 from misty2py.utils.generators import get_random_string
-from misty2py.utils.status import ActionLog
 from pymitter import EventEmitter
 
-actions = ActionLog()
+from misty2py_skills.utils.status import StreamingActionLog
+
+actions = StreamingActionLog()
+"""The log of the subscription and the battery statuses of the current run of `battery_printer`, reset by every run; pass `spill_path` to keep all of them in a file."""
 ee = EventEmitter()
 event_name = "battery_loader_" + get_random_string(6)
 DEFAULT_DURATION = 2
 """The defaults duration of the skill in seconds."""
+REQUIRED_KEYS = (
+    "chargePercent",
+    "created",
+    "current",
+    "healthPercent",
+    "isCharging",
+    "sensorId",
+    "state",
+    "temperature",
+    "trained",
+    "voltage",
+)
+"""The keys of a valid battery status."""
+_get_required = operator.itemgetter(*REQUIRED_KEYS)
+
+TELEMETRY_FIELDS = (
+    "time",
+    "chargePercent",
+    "current",
+    "voltage",
+    "temperature",
+    "isCharging",
+)
+"""The fields of a telemetry record: the time of receipt in seconds since the epoch and the properties of the BatteryCharge message."""
+TELEMETRY_RECORD = struct.Struct("<dddddB")
+"""The little-endian binary layout of a telemetry record (five doubles and one byte) in the order of `TELEMETRY_FIELDS`."""
+TELEMETRY_SCHEMA = (
+    ("chargePercent", (int, float)),
+    ("current", (int, float)),
+    ("voltage", (int, float)),
+    ("temperature", (int, float)),
+    ("isCharging", bool),
+)
+"""The properties of the BatteryCharge message recorded as telemetry and their types."""
+TELEMETRY_BATCH_SIZE = 1024
+"""The default number of telemetry records buffered before they are written to the file."""
+RECORDING_DEBOUNCE = 10
+"""The debounce of the BatteryCharge subscription in ms in the telemetry recorder mode, i.e. the highest rate at which Misty sends the battery status."""
+recorder_event_name = "battery_recorder_" + get_random_string(6)
+
+
+def compile_schema(schema: Tuple[Tuple[str, type], ...]):
+    """Compiles a schema of `(key, type)` pairs into a function which returns the values of the keys of a message as a tuple, or `None` if any of them is missing or of a wrong type.
+
+    The keys are looked up by one `operator.itemgetter` built in advance, so validating a message does not loop over the schema in Python.
+    """
+    get_values = operator.itemgetter(*(key for key, _ in schema))
+    types = tuple(type_ for _, type_ in schema)
+
+    def extract(data: Dict) -> Optional[Tuple]:
+        try:
+            values = get_values(data)
+        except (KeyError, TypeError):
+            return None
+        if all(map(isinstance, values, types)):
+            return values
+        return None
+
+    return extract
+
+
+extract_telemetry = compile_schema(TELEMETRY_SCHEMA)
+"""Returns the values of `TELEMETRY_SCHEMA` from a BatteryCharge message or `None` if the message is invalid."""
 
 
 def status_of_battery_event(data: Dict) -> bool:
     """Verifies whether the receives data indicates a valid battery status."""
-    for required in [
-        "chargePercent",
-        "created",
-        "current",
-        "healthPercent",
-        "isCharging",
-        "sensorId",
-        "state",
-        "temperature",
-        "trained",
-        "voltage",
-    ]:
-        if isinstance(data.get(required), type(None)):
-            return False
-    return True
+    try:
+        return None not in _get_required(data)
+    except (KeyError, TypeError):
+        return False
+
+
+class BatteryTelemetry:
+    """Records battery statuses in columns of typed arrays and writes them to a file in batches.
+
+    At most `batch_size` records are kept in memory, so the memory use is constant regardless of the duration of the recording. The file is either binary, a sequence of records laid out as `TELEMETRY_RECORD`, or CSV with a header of `TELEMETRY_FIELDS`; a new recording is appended to an existing file.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        file_format: str = "binary",
+        batch_size: int = TELEMETRY_BATCH_SIZE,
+    ) -> None:
+        """Initialises an empty recorder; the file is opened with the first flush.
+
+        Args:
+            path (str): The path of the file.
+            file_format (str, optional): `"binary"` or `"csv"`. Defaults to `"binary"`.
+            batch_size (int, optional): The number of records buffered before they are written. Defaults to `TELEMETRY_BATCH_SIZE`.
+        """
+        if file_format not in ("binary", "csv"):
+            raise ValueError("Unsupported telemetry format `%s`." % file_format)
+        self.path = path
+        self.file_format = file_format
+        self.batch_size = batch_size
+        self.columns = tuple(array.array("d") for _ in TELEMETRY_FIELDS[:-1]) + (
+            array.array("B"),
+        )
+        self.counts = {"recorded": 0, "invalid": 0, "flushes": 0}
+        self.lock = threading.Lock()
+        self._file = None
+        self._writer = None
+
+    def record(self, data: Dict, received: Optional[float] = None) -> bool:
+        """Records a BatteryCharge message and writes the buffered records once there are `batch_size` of them.
+
+        Args:
+            data (Dict): The message.
+            received (Optional[float], optional): The time of receipt in seconds since the epoch; the current time if `None`. Defaults to `None`.
+
+        Returns:
+            bool: Whether the message was valid and recorded.
+        """
+        values = extract_telemetry(data)
+        with self.lock:
+            if values is None:
+                self.counts["invalid"] += 1
+                return False
+            self.columns[0].append(time.time() if received is None else received)
+            for column, value in zip(self.columns[1:], values):
+                column.append(value)
+            self.counts["recorded"] += 1
+            if len(self.columns[0]) >= self.batch_size:
+                self._flush()
+        return True
+
+    def _open(self) -> None:
+        """Opens the file for appending; a new or empty CSV file gets the header row first."""
+        if self.file_format == "binary":
+            self._file = open(self.path, "ab")
+            return
+        new = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        self._file = open(self.path, "a", newline="")
+        self._writer = csv.writer(self._file)
+        if new:
+            self._writer.writerow(TELEMETRY_FIELDS)
+
+    def _flush(self) -> None:
+        """Writes the buffered records to the file, opening it on the first write, and empties the buffers; called with `lock` held."""
+        if len(self.columns[0]) == 0:
+            return
+        if self._file is None:
+            self._open()
+        if self.file_format == "binary":
+            self._file.write(b"".join(map(TELEMETRY_RECORD.pack, *self.columns)))
+        else:
+            self._writer.writerows(zip(*self.columns))
+        self._file.flush()
+        for column in self.columns:
+            del column[:]
+        self.counts["flushes"] += 1
+
+    def flush(self) -> None:
+        """Writes the buffered records to the file."""
+        with self.lock:
+            self._flush()
+
+    def close(self) -> None:
+        """Writes the buffered records and closes the file."""
+        with self.lock:
+            self._flush()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+                self._writer = None
+
+    def report(self) -> Dict:
+        """Returns the path and the format of the file and the counts of the recorded and invalid messages and of the flushes."""
+        with self.lock:
+            return dict(self.counts, path=self.path, file_format=self.file_format)
+
+    def __enter__(self) -> "BatteryTelemetry":
+        """Returns the recorder."""
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """Writes the buffered records and closes the file, see `close`."""
+        self.close()
 
 
 @ee.on(event_name)
 def listener(data: Dict):
     """Prints received battery data and appends it to the list of actions."""
     print(data)
+    valid = status_of_battery_event(data)
     actions.append_(
-        {"battery_status": {"message": data, "status": status_of_battery_event(data)}}
+        {
+            "battery_status": {
+                "message": data,
+                "status": valid,
+                "overall_success": valid,
+            }
+        }
     )
 
 
@@ -56,25 +234,75 @@ def battery_printer(
         duration (Union[int, float], optional): The duration of the skill. Defaults to DEFAULT_DURATION.
 
     Returns:
-        Dict: The dictionary with `"overall_success"` key (bool) and keys for every action performed (dictionarised Misty2pyResponse).
+        Dict: The summary of `actions`, see `misty2py_skills.utils.status.StreamingActionLog.summarise`: the keys of `misty2py.response.success_of_action_list` (`"overall_success"` and `"actions"`, limited to the latest `misty2py_skills.utils.status.ACTION_LOG_WINDOW` actions) and the counts of all actions of the run under `"action_counts"`.
     """
     cancel_skills(misty)
+    actions.reset()
 
-    events = []
     event_type = "BatteryCharge"
 
     subscription = misty.event(
         "subscribe", type=event_type, name=event_name, event_emitter=ee
     ).parse_to_dict()
-    events.append({"subscription": subscription})
+    actions.append_({"subscription": subscription})
 
     time.sleep(duration)
-    events.extend(actions.get_())
 
     unsubscription = misty.event("unsubscribe", name=event_name).parse_to_dict()
-    events.append({"unsubscription": unsubscription})
+    actions.append_({"unsubscription": unsubscription})
 
-    return success_of_action_list(events)
+    actions.close()
+    return actions.summarise()
+
+
+def battery_recorder(
+    misty: Misty,
+    path: str,
+    duration: Union[int, float] = DEFAULT_DURATION,
+    file_format: str = "binary",
+    debounce: int = RECORDING_DEBOUNCE,
+    batch_size: int = TELEMETRY_BATCH_SIZE,
+) -> Dict:
+    """Records the battery status into a file via `BatteryTelemetry` for `duration` seconds.
+
+    Args:
+        misty (Misty): The Misty whose battery status to record.
+        path (str): The path of the file.
+        duration (Union[int, float], optional): The duration of the recording in seconds. Defaults to `DEFAULT_DURATION`.
+        file_format (str, optional): `"binary"` or `"csv"`. Defaults to `"binary"`.
+        debounce (int, optional): The debounce of the subscription in ms. Defaults to `RECORDING_DEBOUNCE`.
+        batch_size (int, optional): The number of records buffered before they are written. Defaults to `TELEMETRY_BATCH_SIZE`.
+
+    Returns:
+        Dict: The dictionary with `"overall_success"` key (bool), keys for every action performed (dictionarised Misty2pyResponse) and the key `"telemetry"` with the report of the recorder.
+    """
+    cancel_skills(misty)
+
+    with BatteryTelemetry(
+        path, file_format=file_format, batch_size=batch_size
+    ) as telemetry:
+        ee.on(recorder_event_name, telemetry.record)
+        subscription = misty.event(
+            "subscribe",
+            type="BatteryCharge",
+            name=recorder_event_name,
+            event_emitter=ee,
+            debounce=debounce,
+            len_data_entries=1,
+        ).parse_to_dict()
+
+        time.sleep(duration)
+
+        unsubscription = misty.event(
+            "unsubscribe", name=recorder_event_name
+        ).parse_to_dict()
+        ee.off(recorder_event_name, telemetry.record)
+
+    result = success_of_action_dict(
+        subscription=subscription, unsubscription=unsubscription
+    )
+    result["telemetry"] = telemetry.report()
+    return result
 
 
 if __name__ == "__main__":
@@ -91,4 +319,8 @@ if __name__ == "__main__":
 
     from misty2py.utils.utils import get_misty
 
-    print(battery_printer(get_misty(), duration))
+    if len(args) > 2:
+        file_format = "csv" if args[2].endswith(".csv") else "binary"
+        print(battery_recorder(get_misty(), args[2], duration, file_format))
+    else:
+        print(battery_printer(get_misty(), duration))
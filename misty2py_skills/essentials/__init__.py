@@ -0,0 +1,2 @@
+"""Relatively simple components that can be used as building blocks for skills.
+"""
@@ -0,0 +1,469 @@
+"""This module implements speech transcription with interchangeable backends: Wit.ai and a local, CPU-only Vosk engine.
+
+The backend is selected by the value of `TRANSCRIPTION_BACKEND` in the `.env` file (`"wit"` or `"vosk"`, defaults to `"wit"`). The Vosk backend requires the optional `vosk` package and a model downloaded to the path in `VOSK_MODEL_PATH`.
+
+Running this module benchmarks the available backends on the speech files recorded in the `data` directory.
+"""
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import speech_recognition as sr
+from dotenv import dotenv_values
+from misty2py.utils.utils import get_abs_path, get_files_in_dir
+
+LOCAL_KEYWORDS = {
+    "hello": ("greet", "hello"),
+    "hi": ("greet", "hello"),
+    "good morning": ("greet", "hello"),
+    "good afternoon": ("greet", "hello"),
+    "good evening": ("greet", "hello"),
+    "goodbye": ("greet", "goodbye"),
+    "bye": ("greet", "goodbye"),
+    "good night": ("greet", "goodbye"),
+    "have a nice day": ("greet", "goodbye"),
+    "date": ("datetime", "date"),
+    "month": ("datetime", "month"),
+    "year": ("datetime", "year"),
+    "test": ("test", "test"),
+}
+"""The phrases recognised by local backends mapped to the intent and the entity they represent, mirroring the Wit.ai app in `accompanying_data`."""
+DEFAULT_CACHE_SIZE = 128
+"""The default maximum number of transcriptions cached in memory."""
+DEFAULT_DISK_CACHE_SIZE = 4096
+"""The default maximum number of transcriptions cached on disk."""
+
+
+def extract_entities(text: str) -> Dict:
+    """Extracts the intents and entities from a transcription using `LOCAL_KEYWORDS`.
+
+    Args:
+        text (str): The transcription.
+
+    Returns:
+        Dict: The entities in the format of Wit.ai responses: the key `"intent"` for the list of intents and a key for every other entity found.
+    """
+    padded = " %s " % " ".join(re.findall(r"[a-z0-9']+", text.lower()))
+    entities = {}
+    intents = []
+    for phrase, (intent, entity) in LOCAL_KEYWORDS.items():
+        if " %s " % phrase in padded:
+            if intent not in intents:
+                intents.append(intent)
+            entities.setdefault(entity, []).append({"value": phrase, "body": phrase})
+    if len(intents) > 0:
+        entities["intent"] = [{"value": intent} for intent in intents]
+    return entities
+
+
+class TranscriptionBackend(ABC):
+    """Represents a speech-to-text engine used by `SpeechTranscripter`."""
+
+    name = "base"
+    """The name of the backend."""
+
+    @abstractmethod
+    def transcribe(self, audio: sr.AudioData, show_all: bool = False) -> Any:
+        """Transcribes an audio.
+
+        Args:
+            audio (sr.AudioData): The audio to transcribe.
+            show_all (bool, optional): Whether to return the full response including the entities (`True`) or the transcription only (`False`). Defaults to `False`.
+
+        Raises:
+            sr.UnknownValueError: If the speech is unintelligible.
+            sr.RequestError: If the transcription failed.
+
+        Returns:
+            Any: The transcription as a string or the full response as a dictionary if `show_all` is `True`.
+        """
+
+
+class WitAiBackend(TranscriptionBackend):
+    """Transcribes speech via Wit.ai."""
+
+    name = "wit"
+
+    def __init__(self, wit_ai_key: str, recogniser: sr.Recognizer) -> None:
+        """Initialises the backend.
+
+        Args:
+            wit_ai_key (str): The API key for Wit.ai.
+            recogniser (sr.Recognizer): The speech_recognition package recogniser.
+        """
+        self.key = wit_ai_key
+        self.recogniser = recogniser
+
+    def transcribe(self, audio: sr.AudioData, show_all: bool = False) -> Any:
+        """Transcribes an audio via Wit.ai. See `TranscriptionBackend.transcribe`."""
+        return self.recogniser.recognize_wit(audio, key=self.key, show_all=show_all)
+
+
+class VoskBackend(TranscriptionBackend):
+    """Transcribes speech locally on the CPU with a Vosk model. The model is loaded once when the backend is created and kept in memory."""
+
+    name = "vosk"
+
+    def __init__(self, model_path: str, sample_rate: int = 16000) -> None:
+        """Loads the Vosk model.
+
+        Args:
+            model_path (str): The path to the directory of a Vosk model.
+            sample_rate (int, optional): The sample rate the audio is converted to before transcription. Defaults to `16000`.
+        """
+        try:
+            import vosk
+        except ImportError as e:
+            raise ImportError(
+                "The Vosk backend requires the `vosk` package, install it with `pip install vosk`."
+            ) from e
+
+        if not os.path.isdir(model_path):
+            raise FileNotFoundError("Vosk model not found at `%s`." % model_path)
+
+        vosk.SetLogLevel(-1)
+        self.vosk = vosk
+        self.model = vosk.Model(model_path)
+        self.sample_rate = sample_rate
+
+    def transcribe(self, audio: sr.AudioData, show_all: bool = False) -> Any:
+        """Transcribes an audio with the local model. See `TranscriptionBackend.transcribe`; the full response contains the keys `"text"` and `"entities"` obtained via `extract_entities`."""
+        recogniser = self.vosk.KaldiRecognizer(self.model, self.sample_rate)
+        recogniser.AcceptWaveform(
+            audio.get_raw_data(convert_rate=self.sample_rate, convert_width=2)
+        )
+        text = json.loads(recogniser.FinalResult()).get("text", "")
+        if len(text) == 0:
+            raise sr.UnknownValueError()
+        if not show_all:
+            return text
+        return {"text": text, "entities": extract_entities(text)}
+
+
+class TranscriptionCache:
+    """Caches transcriptions keyed by the hash of the transcribed audio, so identical audio is only transcribed once.
+
+    The most recently used transcriptions are kept in memory up to `max_entries`; if `cache_dir` is supplied, every transcription is also saved there as a JSON file and loaded back when it is not in memory. The on-disk tier keeps the most recently used transcriptions up to `max_disk_entries`, the entries already in `cache_dir` included.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_CACHE_SIZE,
+        cache_dir: Optional[str] = None,
+        max_disk_entries: int = DEFAULT_DISK_CACHE_SIZE,
+    ) -> None:
+        """Initialises the cache with the entries already saved in `cache_dir`.
+
+        Args:
+            max_entries (int, optional): The maximum number of transcriptions kept in memory. Defaults to `DEFAULT_CACHE_SIZE`.
+            cache_dir (Optional[str], optional): The absolute path to the directory of the on-disk tier or `None` to only cache in memory. Defaults to `None`.
+            max_disk_entries (int, optional): The maximum number of transcriptions kept in `cache_dir`. Defaults to `DEFAULT_DISK_CACHE_SIZE`.
+        """
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.max_disk_entries = max_disk_entries
+        self.entries = OrderedDict()
+        self.disk_entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+            self._index_disk()
+
+    @staticmethod
+    def key(audio: sr.AudioData, backend_name: str, show_all: bool) -> str:
+        """Constructs the cache key of an audio transcribed by a backend."""
+        digest = hashlib.sha256(audio.frame_data)
+        digest.update(
+            (
+                "%d:%d:%s:%s"
+                % (audio.sample_rate, audio.sample_width, backend_name, show_all)
+            ).encode()
+        )
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        """Returns the path of the on-disk entry of `key`."""
+        return os.path.join(self.cache_dir, "%s.json" % key)
+
+    def _remember(self, key: str, value: Dict) -> None:
+        """Stores a value in memory, evicting the least recently used entries above `max_entries`."""
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def _index_disk(self) -> None:
+        """Orders the entries saved in `cache_dir` from the least to the most recently used by their modification times and evicts those above `max_disk_entries`."""
+        saved = []
+        for f_name in os.listdir(self.cache_dir):
+            if not f_name.endswith(".json"):
+                continue
+            try:
+                saved.append(
+                    (
+                        os.path.getmtime(os.path.join(self.cache_dir, f_name)),
+                        f_name[: -len(".json")],
+                    )
+                )
+            except OSError:
+                continue
+        for _, key in sorted(saved):
+            self.disk_entries[key] = None
+        self._evict_disk()
+
+    def _touch_disk(self, key: str) -> None:
+        """Marks the on-disk entry of `key` as the most recently used and evicts the least recently used entries above `max_disk_entries`."""
+        self.disk_entries[key] = None
+        self.disk_entries.move_to_end(key)
+        self._evict_disk()
+
+    def _evict_disk(self) -> None:
+        """Removes the least recently used on-disk entries above `max_disk_entries`."""
+        while len(self.disk_entries) > self.max_disk_entries:
+            key, _ = self.disk_entries.popitem(last=False)
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def get_(self, key: str) -> Optional[Dict]:
+        """Returns the cached transcription for `key` or `None` if it is not cached."""
+        with self.lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return value
+
+            if self.cache_dir is not None:
+                try:
+                    with open(self._path(key), "r") as f:
+                        value = json.load(f)
+                except (OSError, ValueError):
+                    value = None
+                if value is not None:
+                    self._remember(key, value)
+                    self._touch_disk(key)
+                    try:
+                        # keeps the recency of the entry across restarts
+                        os.utime(self._path(key))
+                    except OSError:
+                        pass
+                    self.disk_hits += 1
+                    return value
+
+            self.misses += 1
+            return None
+
+    def set_(self, key: str, value: Dict) -> None:
+        """Caches the transcription `value` under `key`."""
+        with self.lock:
+            self._remember(key, value)
+        if self.cache_dir is not None:
+            # a unique temporary file lets concurrent writers of a key replace it atomically without the lock
+            tmp_path = "%s.%d.tmp" % (self._path(key), threading.get_ident())
+            with open(tmp_path, "w") as f:
+                json.dump(value, f)
+            os.replace(tmp_path, self._path(key))
+            with self.lock:
+                self._touch_disk(key)
+
+    def stats(self) -> Dict:
+        """Returns the numbers of memory hits, disk hits and misses and the numbers of entries in memory and on disk."""
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "entries": len(self.entries),
+                "disk_entries": len(self.disk_entries),
+            }
+
+
+class SpeechTranscripter:
+    """Represents the speech transcribing component of a skill."""
+
+    def __init__(
+        self,
+        wit_ai_key: str = "",
+        backend: TranscriptionBackend = None,
+        cache: Optional[TranscriptionCache] = None,
+    ) -> None:
+        """Initialises the speech transcripter.
+
+        Args:
+            wit_ai_key (str, optional): The API key for Wit.ai, used if `backend` is `None`. Defaults to `""`.
+            backend (TranscriptionBackend, optional): The backend performing the transcription. Defaults to `None` for a `WitAiBackend`.
+            cache (Optional[TranscriptionCache], optional): The cache of successful transcriptions or `None` to transcribe every audio. Defaults to `None`.
+        """
+        self.key = wit_ai_key
+        self.recogniser = sr.Recognizer()
+        if backend is None:
+            backend = WitAiBackend(wit_ai_key, self.recogniser)
+        self.backend = backend
+        self.cache = cache
+
+    def load_wav(self, audio_path: str) -> sr.AudioData:
+        """Loads an audio (.wav) file.
+
+        Args:
+            audio_path (str): The absolute path to the audio file in .wav format to transcribe.
+
+        Returns:
+            sr.AudioData: The speech_recognition package representation of the audio.
+        """
+        with sr.AudioFile(audio_path) as source:
+            return self.recogniser.record(source)
+
+    def load_wav_bytes(self, wav: bytes) -> sr.AudioData:
+        """Loads an audio in .wav format from memory.
+
+        Args:
+            wav (bytes): The content of the .wav file to transcribe.
+
+        Returns:
+            sr.AudioData: The speech_recognition package representation of the audio.
+        """
+        with sr.AudioFile(io.BytesIO(wav)) as source:
+            return self.recogniser.record(source)
+
+    def audio_to_text(self, audio: sr.AudioData, show_all: bool = False) -> Dict:
+        """Transcribes an audio of a valid speech_recognition package defined format to plaintext.
+
+        Args:
+            audio (sr.AudioData): The audio to transcribe.
+            show_all (bool, optional): Whether to return all possible transcriptions (`True`) or the one in which the backend is most confident (`False`). Defaults to `False`.
+
+        Returns:
+            Dict: The keys `"success"` (bool) and `"content"` for the transcription, and `"error_details"` if the transcription failed.
+        """
+        key = None
+        if self.cache is not None:
+            key = self.cache.key(audio, self.backend.name, show_all)
+            cached = self.cache.get_(key)
+            if cached is not None:
+                return cached
+
+        try:
+            transcription = self.backend.transcribe(audio, show_all=show_all)
+            result = {"success": True, "content": transcription}
+
+        except sr.UnknownValueError:
+            # not cached, so that only recognised speech takes up the cache
+            return {"success": True, "content": "unknown"}
+
+        except sr.RequestError as e:
+            return {
+                "success": False,
+                "content": "Invalid request.",
+                "error_details": str(e),
+            }
+
+        if key is not None:
+            self.cache.set_(key, result)
+        return result
+
+
+def get_speech_transcripter(env_path: str = ".env") -> SpeechTranscripter:
+    """Constructs the speech transcripter with the backend specified by `TRANSCRIPTION_BACKEND` and the cache specified by `TRANSCRIPTION_CACHE_SIZE` (`0` disables caching, `DEFAULT_CACHE_SIZE` is used if it is empty or not a number), `TRANSCRIPTION_CACHE_DIR` (memory-only if not set) and `TRANSCRIPTION_CACHE_DISK_SIZE` (`DEFAULT_DISK_CACHE_SIZE` is used if it is empty or not a number) in the supplied .env file."""
+    values = dotenv_values(env_path)
+    wit_ai_key = values.get("WIT_AI_KEY", "")
+    backend_name = values.get("TRANSCRIPTION_BACKEND", WitAiBackend.name).lower()
+
+    cache = None
+    try:
+        cache_size = int(values.get("TRANSCRIPTION_CACHE_SIZE") or DEFAULT_CACHE_SIZE)
+    except ValueError:
+        cache_size = DEFAULT_CACHE_SIZE
+    if cache_size > 0:
+        cache_dir = values.get("TRANSCRIPTION_CACHE_DIR")
+        if cache_dir:
+            cache_dir = get_abs_path(cache_dir)
+        try:
+            disk_cache_size = int(
+                values.get("TRANSCRIPTION_CACHE_DISK_SIZE") or DEFAULT_DISK_CACHE_SIZE
+            )
+        except ValueError:
+            disk_cache_size = DEFAULT_DISK_CACHE_SIZE
+        cache = TranscriptionCache(
+            max_entries=cache_size,
+            cache_dir=cache_dir,
+            max_disk_entries=disk_cache_size,
+        )
+
+    if backend_name == VoskBackend.name:
+        model_path = get_abs_path(values.get("VOSK_MODEL_PATH", "model"))
+        return SpeechTranscripter(
+            wit_ai_key, backend=VoskBackend(model_path), cache=cache
+        )
+
+    if backend_name != WitAiBackend.name:
+        raise ValueError("Unknown transcription backend `%s`." % backend_name)
+
+    return SpeechTranscripter(wit_ai_key, cache=cache)
+
+
+def audio_duration(audio: sr.AudioData) -> float:
+    """Returns the duration of an audio in seconds."""
+    return len(audio.frame_data) / (audio.sample_rate * audio.sample_width)
+
+
+def benchmark_transcripters(
+    transcripters: Dict[str, SpeechTranscripter], corpus: List[str]
+) -> Dict:
+    """Measures the transcription latency of speech transcripters on the same corpus.
+
+    Args:
+        transcripters (Dict[str, SpeechTranscripter]): The transcripters to benchmark, keyed by their names.
+        corpus (List[str]): The absolute paths to the .wav files to transcribe.
+
+    Returns:
+        Dict: For every transcripter, the keys `"files"`, `"audio_seconds"`, `"transcription_seconds"`, `"seconds_per_audio_second"` and `"failures"`.
+    """
+    results = {}
+    for name, transcripter in transcripters.items():
+        audio_seconds = 0.0
+        transcription_seconds = 0.0
+        failures = 0
+        for path in corpus:
+            audio = transcripter.load_wav(path)
+            audio_seconds += audio_duration(audio)
+            start = time.perf_counter()
+            result = transcripter.audio_to_text(audio, show_all=True)
+            transcription_seconds += time.perf_counter() - start
+            if not result.get("success"):
+                failures += 1
+        results[name] = {
+            "files": len(corpus),
+            "audio_seconds": audio_seconds,
+            "transcription_seconds": transcription_seconds,
+            "seconds_per_audio_second": transcription_seconds / audio_seconds
+            if audio_seconds > 0
+            else None,
+            "failures": failures,
+        }
+    return results
+
+
+if __name__ == "__main__":
+    values = dotenv_values(".env")
+    corpus = sorted(
+        f for f in get_files_in_dir(get_abs_path("data")) if f.endswith(".wav")
+    )
+    transcripters = {"wit": SpeechTranscripter(values.get("WIT_AI_KEY", ""))}
+    try:
+        model_path = get_abs_path(values.get("VOSK_MODEL_PATH", "model"))
+        transcripters["vosk"] = SpeechTranscripter(backend=VoskBackend(model_path))
+    except (ImportError, FileNotFoundError) as e:
+        print("Skipping the Vosk backend: %s" % e)
+    print(benchmark_transcripters(transcripters, corpus))
@@ -1,8 +1,10 @@
 """This module implements a face recognition skill that allows Misty to greet people with their chosen name.
 """
+import queue
+import threading
 import time
-from enum import Enum
-from typing import Dict, List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple
 
 from misty2py.basic_skills.cancel_skills import cancel_skills
 from misty2py.basic_skills.speak import speak
@@ -13,114 +15,483 @@ from misty2py.utils.status import Status
 from misty2py.utils.utils import get_misty
 from pymitter import EventEmitter
 
+from misty2py_skills.utils.events import EventFanIn, EventRateMeter, subscribe_event
+from misty2py_skills.utils.faces import (
+    MEASURE_RECOGNITIONS,
+    MIN_CONFIDENCE,
+    MIN_PERSISTENCE,
+    NAME_PROMPT,
+    RECOGNITION_CONDITIONS,
+    RECOGNITION_DEBOUNCE,
+    RECOGNITION_RETURN_PROPERTY,
+    TESTING_NAME,
+    TRAINING_PROMPT,
+    TRAINING_REPLIES,
+    TRAINING_START,
+    TRAINING_TIMEOUT,
+    UNKNOWN_LABEL,
+    UPDATE_TIME,
+    GreetingCooldowns,
+    InputActions,
+    RecognitionFilter,
+    StatusLabels,
+    UserResponses,
+    input_action,
+    training_outcome,
+    unique_face_id,
+    user_from_face_id,
+)
+from misty2py_skills.utils.inputs import InputMultiplexer
+
 ee = EventEmitter()
 misty_glob = get_misty()
 status = Status()
+robot_statuses = {}
+"""The statuses of the Mistys of `lobby_face_recognition` by the Mistys, so that one Misty talking does not keep the others from greeting; the other Mistys use `status`."""
 event_face_rec = "face_rec_%s" % get_random_string(6)
-event_face_train = "face_train_%s" % get_random_string(6)
+recognitions = queue.Queue(maxsize=16)
+"""The face recognition events waiting to be handled as tuples of the time of receipt, the label and the key of the Misty which sent it (`None` outside of `lobby_face_recognition`); if full, the oldest event is discarded."""
+recognition_stop = threading.Event()
+"""Set to stop the recognition worker."""
+training_ends = queue.Queue()
+"""The ended training sessions waiting for the recognition worker to inform the user about their outcome."""
 
-UPDATE_TIME = 1
-"""The minimum amount of time (in seconds) that must pass between Misty greets the same person again."""
-UNKNOWN_LABEL = "unknown person"
-"""The label used by Misty's REST API for an unknown face."""
-TESTING_NAME = "chris"
-"""The name of the person testing this module. For convenience, the faces commencing with this name are forgotten in at beginning of the skill so they can be learnt again."""
+DELETE_WORKERS = 8
+"""The maximum number of `face_delete` requests sent to Misty at the same time."""
+INPUT_ADDRESS = None
+"""The local address (host, port) on which to accept user inputs in addition to the terminal, or `None` to only read the terminal."""
 
 
-class UserResponses:
-    """Represents responses that a user can give to different prompts used in this skill."""
+greeting_cooldowns = GreetingCooldowns(UPDATE_TIME)
+"""The per-label greeting cooldowns, rebuilt from `UPDATE_TIME` by `reset_recognition_state` whenever the skill starts."""
 
-    YES = frozenset(["yes", "y"])
-    NO = frozenset(["no", "n"])
-    STOP = frozenset(["stop", "s", "terminate"])
 
+class FacesRegistry:
+    """A local copy of the faces known to Misty.
 
-class StatusLabels(Enum):
-    """Represents states in which the skill can be."""
+    The faces are requested from Misty only when the registry is refreshed (or first needed) and are afterwards kept up to date by the skill itself as it trains and forgets faces, so that name lookups do not require a request.
+    """
 
-    MAIN = "running_main"
-    """The main state of waiting for a face recognition event."""
-    PROMPT = "running_train_prompt"
-    """The state of running the training prompt and waiting for the user's response."""
-    TRAIN = "running_training"
-    """The face training state."""
-    INIT = "running_training_initialisation"
-    """The state of the initialisation of face training."""
-    GREET = "running_greeting"
-    """The state of greeting a person."""
-    TALK = "talking"
-    """The state of talking."""
+    def __init__(self) -> None:
+        """Initialises an empty registry that has not been loaded yet."""
+        self._faces = set()
+        self._loaded = False
+        self.lock = threading.Lock()
+
+    def refresh(self, misty: Misty, merge: bool = False) -> Dict:
+        """Replaces the registry with the faces currently known to Misty.
+
+        Args:
+            misty (Misty): The Misty whose known faces to request.
+            merge (bool, optional): Whether to add the faces to the registry instead of replacing it, e.g. to share one registry among several Mistys. Defaults to `False`.
+
+        Returns:
+            Dict: The dictionarised Misty2pyResponse of the `faces_known` request.
+        """
+        response = misty.get_info("faces_known").parse_to_dict()
+        faces = response.get("rest_response", {}).get("result")
+        faces = set(faces) if isinstance(faces, list) else set()
+        with self.lock:
+            self._faces = self._faces | faces if merge else faces
+            self._loaded = True
+        return response
+
+    def get_(self, misty: Misty) -> FrozenSet[str]:
+        """Returns the known faces, requesting them from Misty if the registry has not been loaded yet."""
+        if not self._loaded:
+            self.refresh(misty)
+        with self.lock:
+            return frozenset(self._faces)
+
+    def add(self, face: str) -> None:
+        """Registers a newly trained face."""
+        with self.lock:
+            self._faces.add(face)
+
+    def discard(self, face: str) -> None:
+        """Unregisters a forgotten face."""
+        with self.lock:
+            self._faces.discard(face)
+
+    def __contains__(self, face: str) -> bool:
+        """Tells whether `face` is a registered face; does not request the faces from Misty."""
+        with self.lock:
+            return face in self._faces
+
+    def unique_name(self, misty: Misty, name: str) -> str:
+        """Returns the face ID to train the face of `name` under, see `misty2py_skills.utils.faces.unique_face_id`."""
+        return unique_face_id(name, self.get_(misty))
+
+    def delete(
+        self, misty: Misty, faces: Iterable[str], max_workers: int = DELETE_WORKERS
+    ) -> Dict[str, bool]:
+        """Makes Misty forget `faces`, sending at most `max_workers` requests at the same time, and unregisters the faces forgotten successfully.
+
+        Args:
+            misty (Misty): The Misty to forget the faces.
+            faces (Iterable[str]): The faces to forget.
+            max_workers (int, optional): The maximum number of concurrent requests. Defaults to `DELETE_WORKERS`.
+
+        Returns:
+            Dict[str, bool]: Whether each face was forgotten successfully.
+        """
+
+        def delete_face(face: str) -> bool:
+            d = (
+                misty.perform_action("face_delete", data={"FaceId": face})
+                .parse_to_dict()
+                .get("rest_response", {})
+            )
+            return bool(d.get("success"))
 
+        faces = list(faces)
+        if not faces:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(faces))) as pool:
+            results = dict(zip(faces, pool.map(delete_face, faces)))
+        for face, success in results.items():
+            if success:
+                self.discard(face)
+        return results
 
-@ee.on(event_face_rec)
-def listener(data: Dict) -> None:
-    """Reacts to a face recognition event.
 
-    Only greets a person if the current status of the skill is not training, talking or greeting. Does not greet the person if they were greeted the previous time less than `UPDATE_TIME` seconds ago. Greets the person if they are a different person than the person greeted the previous time less than `UPDATE_TIME` seconds ago.
+faces_registry = FacesRegistry()
+"""The faces known to Misty."""
+
+
+class TrainingSession:
+    """A face training session which streams the FaceTraining progress messages and cancels the training if it does not finish before its deadline.
+
+    The session ends with one of the outcomes `"complete"`, `"failed"` (Misty could not start or reported a failure), `"timeout"` or `"cancelled"`; the attribute `messages` holds the progress messages received until then with the time (in seconds) elapsed since the start of the session.
+    """
+
+    def __init__(
+        self,
+        misty: Misty,
+        face_id: str,
+        timeout: float = TRAINING_TIMEOUT,
+        on_progress: Optional[Callable[[str, float], None]] = None,
+        on_finish: Optional[Callable[["TrainingSession"], None]] = None,
+    ) -> None:
+        """Initialises a session which has not been started yet.
+
+        Args:
+            misty (Misty): The Misty to learn the face.
+            face_id (str): The ID under which to learn the face.
+            timeout (float, optional): The deadline of the session in seconds after its start. Defaults to `TRAINING_TIMEOUT`.
+            on_progress (Optional[Callable[[str, float], None]], optional): Called with every progress message and the time elapsed since the start. Defaults to `None`.
+            on_finish (Optional[Callable[[TrainingSession], None]], optional): Called with the session when it ends. Defaults to `None`.
+        """
+        self.misty = misty
+        self.face_id = face_id
+        self.timeout = timeout
+        self.on_progress = on_progress
+        self.on_finish = on_finish
+        self.event_name = "face_train_%s" % get_random_string(6)
+        self.messages = []
+        self.outcome = None
+        self.started = None
+        self.finished = None
+        self.done = threading.Event()
+        self.lock = threading.Lock()
+        self._timer = None
+
+    def start(self) -> Dict:
+        """Subscribes to the FaceTraining events and starts the training.
+
+        Returns:
+            Dict: The dictionarised Misty2pyResponse of the `face_train_start` request or of the subscription if it failed, in which case the training is not started.
+        """
+        self.started = time.perf_counter()
+        ee.on(self.event_name, self._on_message)
+        subscription = self.misty.event(
+            "subscribe", type="FaceTraining", name=self.event_name, event_emitter=ee
+        ).parse_to_dict()
+        if not subscription.get("overall_success"):
+            # without the progress messages the end of the training could not be told
+            self._finish("failed")
+            return subscription
+        self._timer = threading.Timer(self.timeout, self._on_deadline)
+        self._timer.daemon = True
+        self._timer.start()
+        response = self.misty.perform_action(
+            "face_train_start", data={"FaceId": self.face_id}
+        ).parse_to_dict()
+        if not response.get("overall_success"):
+            self._finish("failed")
+        return response
+
+    def elapsed(self) -> float:
+        """Returns the time in seconds since the start of the session until now or until its end."""
+        end = time.perf_counter() if self.finished is None else self.finished
+        return end - self.started
+
+    def _on_message(self, data: Dict) -> None:
+        """Records a FaceTraining progress message of the trained face and ends the session if the message reports that the training completed or failed (see `training_outcome`)."""
+        if data.get("faceId", self.face_id) != self.face_id:
+            return
+        message = data.get("message", "")
+        elapsed = time.perf_counter() - self.started
+        with self.lock:
+            if self.outcome is not None:
+                return
+            self.messages.append((elapsed, message))
+        if self.on_progress is not None:
+            self.on_progress(message, elapsed)
+        outcome = training_outcome(data, self.face_id)
+        if outcome is not None:
+            self._finish(outcome)
+
+    def _on_deadline(self) -> None:
+        """Cancels the training if the session has not ended by its deadline."""
+        if self._end("timeout"):
+            self.misty.perform_action("face_train_cancel")
+            self._clean_up()
+
+    def cancel(self) -> None:
+        """Cancels the training unless the session has already ended."""
+        if self._end("cancelled"):
+            self.misty.perform_action("face_train_cancel")
+            self._clean_up()
+
+    def _end(self, outcome: str) -> bool:
+        """Sets the outcome of the session unless it has already ended and returns whether it did, so that only one of the competing endings proceeds."""
+        with self.lock:
+            if self.outcome is not None:
+                return False
+            self.outcome = outcome
+            self.finished = time.perf_counter()
+            return True
+
+    def _finish(self, outcome: str) -> None:
+        """Ends the session with `outcome` unless it has already ended (see `_clean_up`)."""
+        if self._end(outcome):
+            self._clean_up()
+
+    def _clean_up(self) -> None:
+        """Stops the deadline timer, unsubscribes from the FaceTraining events and calls `on_finish` of the ended session."""
+        if self._timer is not None:
+            self._timer.cancel()
+        self.misty.event("unsubscribe", name=self.event_name)
+        ee.off(self.event_name, self._on_message)
+        if self.on_finish is not None:
+            self.on_finish(self)
+        self.done.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Blocks until the session ends or `timeout` seconds pass and returns whether it has ended."""
+        return self.done.wait(timeout)
+
+    def phase_timings(self) -> Dict[str, float]:
+        """Returns the duration of every phase of the training in seconds, i.e. the time until each progress message since the previous one (or since the start)."""
+        timings = {}
+        previous = 0.0
+        for elapsed, message in self.messages:
+            timings[message] = elapsed - previous
+            previous = elapsed
+        return timings
+
+    def report(self) -> Dict:
+        """Returns the face ID, the outcome, the total duration and the phase timings of the session."""
+        return {
+            "face_id": self.face_id,
+            "outcome": self.outcome,
+            "duration": self.elapsed(),
+            "phases": self.phase_timings(),
+        }
+
+
+training_session = None
+"""The current or last `TrainingSession` of the skill."""
+
+
+recognition_filter = RecognitionFilter(MIN_CONFIDENCE, MIN_PERSISTENCE, UPDATE_TIME)
+"""The client-side filter of face recognition events, rebuilt from `MIN_CONFIDENCE`, `MIN_PERSISTENCE` and `UPDATE_TIME` by `reset_recognition_state` whenever the skill starts."""
+recognition_meter = EventRateMeter()
+"""Counts the face recognition events `"received"`, `"accepted"` by `recognition_filter` and `"acted_on"`."""
+
+
+def reset_recognition_state() -> None:
+    """Builds `recognition_filter` and `greeting_cooldowns` from the current values of the settings and resets `recognition_meter`."""
+    global recognition_filter, greeting_cooldowns
+    recognition_filter = RecognitionFilter(MIN_CONFIDENCE, MIN_PERSISTENCE, UPDATE_TIME)
+    greeting_cooldowns = GreetingCooldowns(UPDATE_TIME)
+    recognition_meter.reset()
+
+
+def receive_recognition(data: Dict, robot: Optional[str] = None) -> None:
+    """Reacts to a face recognition event by timestamping it and queueing it for `recognition_worker` if it passes `recognition_filter`, so that the receiving thread is never blocked by the greeting.
 
     Args:
         data (Dict): The data received from Misty's WebSocket API along with the face recognition event.
+        robot (Optional[str], optional): The key of the Misty which sent the event, `None` for the Misty of `face_recognition`. Defaults to `None`.
     """
-    if status.get_("status") == StatusLabels.MAIN:
-        prev_time = status.get_("time")
-        prev_label = status.get_("data")
-        curr_label = data.get("label")
-        curr_time = time.time()
-        if curr_time - prev_time > UPDATE_TIME:
-            handle_recognition(misty_glob, curr_label, curr_time)
-        elif curr_label != prev_label:
-            handle_recognition(misty_glob, curr_label, curr_time)
-        status.set_(time=curr_time)
-
-
-@ee.on(event_face_train)
+    if not isinstance(data, dict):
+        if RECOGNITION_RETURN_PROPERTY != "label":
+            return
+        data = {"label": data}
+    det_time = time.time()
+    recognition_meter.count("received")
+    if not recognition_filter.accept(
+        data.get("label"), data.get("confidence"), det_time
+    ):
+        return
+    recognition_meter.count("accepted")
+    recognition = (det_time, data.get("label"), robot)
+    while True:
+        try:
+            recognitions.put_nowait(recognition)
+            return
+        except queue.Full:
+            try:
+                recognitions.get_nowait()
+            except queue.Empty:
+                pass
+
+
+@ee.on(event_face_rec)
 def listener(data: Dict) -> None:
-    """Handles face training events and terminates the training session if the data states the training is complete.
+    """Passes the face recognition events of the Misty of `face_recognition` to `receive_recognition`.
 
     Args:
-        data (Dict): The data received from Misty's WebSocket API along with the face training event.
+        data (Dict): The data received from Misty's WebSocket API along with the face recognition event.
     """
-    if data.get("message") == "Face training embedding phase complete.":
-        speak_wrapper(misty_glob, "Thank you, the training is complete now.")
-        status.set_(status=StatusLabels.MAIN)
-        d = misty_glob.event("unsubscribe", name=event_face_train).parse_to_dict()
-        print(d)
+    receive_recognition(data)
+
+
+def take_recognitions(timeout: float) -> List[Tuple[float, str, Optional[str]]]:
+    """Waits up to `timeout` seconds for queued recognitions and takes all of them, discarding those older than `UPDATE_TIME` seconds and all but the newest recognition of every label (regardless of the Misty which sent it).
+
+    Returns:
+        List[Tuple[float, str, Optional[str]]]: The remaining recognitions as tuples of the time of receipt, the label and the key of the Misty, oldest first.
+    """
+    try:
+        taken = [recognitions.get(timeout=timeout)]
+    except queue.Empty:
+        return []
+    while True:
+        try:
+            taken.append(recognitions.get_nowait())
+        except queue.Empty:
+            break
+
+    now = time.time()
+    newest = {}
+    for det_time, label, robot in taken:
+        if now - det_time <= UPDATE_TIME:
+            newest[label] = (det_time, robot)
+    return sorted(
+        ((det_time, label, robot) for label, (det_time, robot) in newest.items()),
+        key=lambda recognition: recognition[0],
+    )
+
+
+def handle_recognition_event(
+    misty: Misty, label: str, det_time: float, offer_training: bool = True
+) -> None:
+    """Handles a recognition taken from the queue.
+
+    Only greets a person if the current status of the skill on the Misty (see `status_of`) is not training, talking or greeting. Does not greet the person if they were recognised less than `UPDATE_TIME` seconds ago, regardless of who else was recognised meanwhile.
+
+    Args:
+        misty (Misty): The Misty which recognised the face.
+        label (str): The label of the face.
+        det_time (float): The time of the recognition.
+        offer_training (bool, optional): Whether to prompt an unknown person to join a face training session; unknown people are ignored otherwise. Defaults to `True`.
+    """
+    if not offer_training and label == UNKNOWN_LABEL:
+        return
+    if status_of(misty).get_("status") == StatusLabels.MAIN:
+        if greeting_cooldowns.check_and_renew(label, det_time):
+            recognition_meter.count("acted_on")
+            handle_recognition(misty, label, det_time)
+
+
+def recognition_worker(
+    misty: Optional[Misty], robots: Optional[Dict[str, Misty]] = None
+) -> None:
+    """Handles the queued recognitions and the ended training sessions until `recognition_stop` is set.
+
+    Args:
+        misty (Optional[Misty]): The Misty of `face_recognition`.
+        robots (Optional[Dict[str, Misty]], optional): The Mistys of `lobby_face_recognition` by their keys; unknown people are not offered face training if set. Defaults to `None`.
+    """
+    while not recognition_stop.is_set():
+        handle_training_ends()
+        for det_time, label, robot in take_recognitions(timeout=0.1):
+            if robot is None:
+                handle_recognition_event(misty, label, det_time)
+            elif robots is not None and robot in robots:
+                handle_recognition_event(
+                    robots[robot], label, det_time, offer_training=False
+                )
+
+
+def print_training_progress(message: str, elapsed: float) -> None:
+    """Prints a progress message of a face training session."""
+    print("[%.2f s] %s" % (elapsed, message))
+
+
+def queue_training_end(session: TrainingSession) -> None:
+    """Queues an ended training session for `recognition_worker`, so that the thread which ended it (the WebSocket thread or the deadline timer) is not blocked while Misty speaks."""
+    training_ends.put(session)
+
+
+def handle_training_end(session: TrainingSession) -> None:
+    """Registers the face if the training session is complete, informs the user about its outcome and returns to the main state.
+
+    Args:
+        session (TrainingSession): The ended training session.
+    """
+    print(session.report())
+    if session.outcome == "complete":
+        faces_registry.add(session.face_id)
+    if session.outcome in TRAINING_REPLIES:
+        speak_wrapper(session.misty, TRAINING_REPLIES[session.outcome])
+    status.set_(status=StatusLabels.MAIN)
+
 
+def handle_training_ends() -> None:
+    """Handles the training sessions queued by `queue_training_end`."""
+    while True:
+        try:
+            session = training_ends.get_nowait()
+        except queue.Empty:
+            return
+        handle_training_end(session)
 
-def user_from_face_id(face_id: str) -> str:
-    """Returns the name from a face ID."""
-    return face_id.split("_")[0].capitalize()
+
+def status_of(misty: Misty) -> Status:
+    """Returns the status of the skill on `misty`: its own status in `lobby_face_recognition`, else `status`."""
+    return robot_statuses.get(misty, status)
 
 
 def training_prompt(misty: Misty):
     """Misty asks whether to begin a face training session."""
-    status.set_(status=StatusLabels.PROMPT)
-    speak_wrapper(
-        misty,
-        "Hello! I do not know you yet, do you want to begin the face training session?",
-    )
+    status_of(misty).set_(status=StatusLabels.PROMPT)
+    speak_wrapper(misty, TRAINING_PROMPT)
     print("An unknown face detected.\nDo you want to start training (yes/no)? [no]")
 
 
 def speak_wrapper(misty: Misty, utterance: str) -> None:
     """Changes status to `StatusLabels.TALK` while Misty is talking."""
-    prev_stat = status.get_("status")
-    status.set_(status=StatusLabels.TALK)
+    prev_stat = status_of(misty).get_("status")
+    status_of(misty).set_(status=StatusLabels.TALK)
     print(speak(misty, utterance))
-    status.set_(status=prev_stat)
+    status_of(misty).set_(status=prev_stat)
 
 
 def handle_greeting(misty: Misty, user_name: str) -> None:
     """Greets a person."""
-    status.set_(status=StatusLabels.GREET)
+    status_of(misty).set_(status=StatusLabels.GREET)
     utterance = f"Hello, {user_from_face_id(user_name)}!"
     speak_wrapper(misty, utterance)
-    status.set_(status=StatusLabels.MAIN)
+    status_of(misty).set_(status=StatusLabels.MAIN)
 
 
 def handle_recognition(misty: Misty, label: str, det_time: float) -> None:
     """Handles recognition of a face."""
-    status.set_(data=label, time=det_time)
+    status_of(misty).set_(data=label, time=det_time)
     if label == UNKNOWN_LABEL:
         training_prompt(misty)
     else:
@@ -130,10 +501,7 @@ def handle_recognition(misty: Misty, label: str, det_time: float) -> None:
 def initialise_training(misty: Misty):
     """Initialises the face training session, including prompting the user to enter their name."""
     status.set_(status=StatusLabels.INIT)
-    speak_wrapper(
-        misty,
-        "<p>How should I call you?</p><p>Please enter your name in the terminal.</p>",
-    )
+    speak_wrapper(misty, NAME_PROMPT)
     print("Enter your name (the first name suffices)")
 
 
@@ -145,77 +513,67 @@ def perform_training(misty: Misty, name: str) -> None:
         name (str): The name of the user.
     """
     status.set_(status=StatusLabels.TRAIN)
-    d = misty.get_info("faces_known").parse_to_dict().get("rest_response", {})
-    new_name = name
-    if not d.get("result") is None:
-        while new_name in d.get("result"):
-            new_name = name + "_" + get_random_string(3)
-        if new_name != name:
-            print(f"The name {name} is already in use, using {new_name} instead.")
-    if new_name == "":
-        new_name = get_random_string(6)
-        print(f"The name {name} is invalid, using {new_name} instead.")
-
-    d = misty.perform_action(
-        "face_train_start", data={"FaceId": new_name}
-    ).parse_to_dict()
-    print(d)
-    speak_wrapper(misty, "The training has commenced, please do not look away now.")
-    misty.event(
-        "subscribe", type="FaceTraining", name=event_face_train, event_emitter=ee
+    new_name = faces_registry.unique_name(misty, name)
+
+    global training_session
+    speak_wrapper(misty, TRAINING_START)
+    training_session = TrainingSession(
+        misty,
+        new_name,
+        on_progress=print_training_progress,
+        on_finish=queue_training_end,
     )
+    print(training_session.start())
 
 
 def handle_user_input(misty: Misty, user_input: str) -> None:
     """Handles keyboard inputs."""
-    if user_input in UserResponses.YES and status.get_("status") == StatusLabels.PROMPT:
+    action = input_action(status.get_("status"), user_input)
+    if action == InputActions.INITIALISE:
         initialise_training(misty)
 
-    elif (
-        status.get_("status") == StatusLabels.INIT
-        and not user_input in UserResponses.STOP
-    ):
+    elif action == InputActions.TRAIN:
         perform_training(misty, user_input)
 
-    elif (
-        status.get_("status") == StatusLabels.INIT and user_input in UserResponses.STOP
-    ):
+    elif action == InputActions.ABANDON:
         d = misty.perform_action("face_train_cancel").parse_to_dict()
         print(d)
         status.set_(status=StatusLabels.MAIN)
 
-    elif (
-        status.get_("status") == StatusLabels.TALK and user_input in UserResponses.STOP
-    ):
+    elif action == InputActions.CANCEL_TRAINING and training_session is not None:
+        training_session.cancel()
+
+    elif action == InputActions.STOP_SPEAKING:
         d = misty.perform_action("speak_stop").parse_to_dict()
         print(d)
         status.set_(status=StatusLabels.MAIN)
 
-    elif status.get_("status") == StatusLabels.PROMPT:
+    elif action == InputActions.DECLINE:
         print("Training not initialised.")
         status.set_(status=StatusLabels.MAIN)
 
 
-def purge_testing_faces(misty: Misty, known_faces: List) -> None:
-    """Forgets the faces of users that start with `TESTING NAME`."""
-    for face in known_faces:
-        if face.startswith(TESTING_NAME):
-            d = (
-                misty.perform_action("face_delete", data={"FaceId": face})
-                .parse_to_dict()
-                .get("rest_response", {})
-            )
-            if d.get("success"):
-                print("Successfully forgot the face of %s." % face)
-            else:
-                print("Failed to forget the face of %s." % face)
+def purge_testing_faces(misty: Misty, known_faces: Iterable[str]) -> None:
+    """Forgets the faces of users that start with `TESTING NAME`, sending the requests concurrently."""
+    testing_faces = [face for face in known_faces if face.startswith(TESTING_NAME)]
+    for face, success in faces_registry.delete(misty, testing_faces).items():
+        if success:
+            print("Successfully forgot the face of %s." % face)
+        else:
+            print("Failed to forget the face of %s." % face)
 
 
-def face_recognition(misty: Misty) -> Dict:
+def face_recognition(
+    misty: Misty,
+    inputs: Optional[InputMultiplexer] = None,
+    measure: bool = MEASURE_RECOGNITIONS,
+) -> Dict:
     """Misty detects a face, if she knows the person, she greets them by their name, else she prompts them to join a face training session.
 
     Args:
         misty (Misty): The Misty to perform the skill.
+        inputs (Optional[InputMultiplexer], optional): The source of user inputs; if `None`, the terminal and the socket at `INPUT_ADDRESS` (if set) are read. Defaults to `None`.
+        measure (bool, optional): Whether to report the rates of face recognition events under the key `"recognition_rates"`. Defaults to `MEASURE_RECOGNITIONS`.
 
     Returns:
         Dict: The dictionary with `"overall_success"` key (bool) and keys for every action performed (dictionarised Misty2pyResponse).
@@ -225,11 +583,9 @@ def face_recognition(misty: Misty) -> Dict:
         "volume_settings", data="low_volume"
     ).parse_to_dict()
 
-    get_faces_known = (
-        misty.get_info("faces_known").parse_to_dict().get("rest_response", {})
-    )
-    known_faces = get_faces_known.get("result")
-    if not known_faces is None:
+    get_faces_known = faces_registry.refresh(misty)
+    known_faces = sorted(faces_registry.get_(misty))
+    if known_faces:
         print("Your misty currently knows these faces: %s." % ", ".join(known_faces))
         purge_testing_faces(misty, known_faces)
     else:
@@ -239,24 +595,48 @@ def face_recognition(misty: Misty) -> Dict:
         "face_recognition_start"
     ).parse_to_dict()
 
-    subscribe_face_recognition = misty.event(
-        "subscribe", type="FaceRecognition", name=event_face_rec, event_emitter=ee
+    reset_recognition_state()
+    subscribe_face_recognition = subscribe_event(
+        misty,
+        "FaceRecognition",
+        name=event_face_rec,
+        event_emitter=ee,
+        debounce=RECOGNITION_DEBOUNCE,
+        return_property=RECOGNITION_RETURN_PROPERTY,
+        event_conditions=RECOGNITION_CONDITIONS,
     ).parse_to_dict()
     status.set_(status=StatusLabels.MAIN)
     print(subscribe_face_recognition)
 
+    recognition_stop.clear()
+    worker = threading.Thread(target=recognition_worker, args=(misty,), daemon=True)
+    worker.start()
+
+    own_inputs = inputs is None
+    if own_inputs:
+        inputs = InputMultiplexer(address=INPUT_ADDRESS)
+    if inputs.address is not None:
+        print("Accepting inputs at %s:%d." % inputs.address)
+
     print(">>> Type 'stop' to terminate <<<")
     user_input = ""
     while not (
         user_input in UserResponses.STOP and status.get_("status") == StatusLabels.MAIN
     ):
-        user_input = input().lower()
+        user_input = inputs.read_line()
+        if user_input is None:
+            break
+        user_input = user_input.lower()
         handle_user_input(misty, user_input)
+    if own_inputs:
+        inputs.close()
 
     unsubscribe_face_recognition = misty.event(
         "unsubscribe", name=event_face_rec
     ).parse_to_dict()
     print(unsubscribe_face_recognition)
+    recognition_stop.set()
+    worker.join()
 
     face_recognition_stop = misty.perform_action(
         "face_recognition_stop"
@@ -264,7 +644,7 @@ def face_recognition(misty: Misty) -> Dict:
 
     speak_wrapper(misty, "Bye!")
 
-    return success_of_action_dict(
+    result = success_of_action_dict(
         set_volume=set_volume,
         get_faces_known=get_faces_known,
         start_face_recognition=start_face_recognition,
@@ -272,6 +652,109 @@ def face_recognition(misty: Misty) -> Dict:
         unsubscribe_face_recognition=unsubscribe_face_recognition,
         face_recognition_stop=face_recognition_stop,
     )
+    if measure:
+        result["recognition_rates"] = recognition_meter.report()
+    return result
+
+
+def start_lobby_robot(misty: Misty) -> Dict:
+    """Prepares a Misty of `lobby_face_recognition` and starts its face recognition."""
+    cancel_skills(misty)
+    set_volume = misty.perform_action(
+        "volume_settings", data="low_volume"
+    ).parse_to_dict()
+    start_face_recognition = misty.perform_action(
+        "face_recognition_start"
+    ).parse_to_dict()
+    return success_of_action_dict(
+        set_volume=set_volume, start_face_recognition=start_face_recognition
+    )
+
+
+def lobby_face_recognition(
+    robots: Dict[str, Misty],
+    inputs: Optional[InputMultiplexer] = None,
+    measure: bool = MEASURE_RECOGNITIONS,
+) -> Dict:
+    """Several Mistys detect faces at once and greet the people they know by their name; every person is greeted only once per `UPDATE_TIME` seconds by any of the Mistys. Unknown people are not offered face training.
+
+    The events of all Mistys are received on a single thread via `misty2py_skills.utils.events.EventFanIn` and the known faces of all Mistys are merged into `faces_registry`.
+
+    Args:
+        robots (Dict[str, Misty]): The Mistys to perform the skill by unique keys (e.g. their locations).
+        inputs (Optional[InputMultiplexer], optional): The source of user inputs; if `None`, the terminal and the socket at `INPUT_ADDRESS` (if set) are read. Defaults to `None`.
+        measure (bool, optional): Whether to report the rates of face recognition events under the key `"recognition_rates"`. Defaults to `MEASURE_RECOGNITIONS`.
+
+    Raises:
+        ValueError: If `robots` is empty.
+
+    Returns:
+        Dict: The dictionary with `"overall_success"` key (bool) and keys for every action performed for every Misty (dictionarised Misty2pyResponse), prefixed with the key of the Misty.
+    """
+    if not robots:
+        raise ValueError("lobby_face_recognition requires at least one Misty.")
+    actions = {}
+    first, *others = robots.values()
+    faces_registry.refresh(first)
+    with ThreadPoolExecutor(max_workers=min(len(robots), DELETE_WORKERS)) as pool:
+        for key, result in zip(robots, pool.map(start_lobby_robot, robots.values())):
+            actions["%s_start" % key] = result
+        list(pool.map(lambda misty: faces_registry.refresh(misty, merge=True), others))
+    print(
+        "Your Mistys currently know these faces: %s."
+        % ", ".join(sorted(faces_registry.get_(first)))
+    )
+
+    reset_recognition_state()
+    fan_in = EventFanIn(lambda key, name, data: receive_recognition(data, key))
+    for key, misty in robots.items():
+        actions["%s_subscribe" % key] = fan_in.subscribe(
+            key,
+            misty,
+            "FaceRecognition",
+            name="%s_%s" % (event_face_rec, key),
+            debounce=RECOGNITION_DEBOUNCE,
+            return_property=RECOGNITION_RETURN_PROPERTY,
+            event_conditions=RECOGNITION_CONDITIONS,
+        ).parse_to_dict()
+    robot_statuses.clear()
+    for misty in robots.values():
+        robot_statuses[misty] = Status(init_status=StatusLabels.MAIN)
+    fan_in.start()
+
+    recognition_stop.clear()
+    worker = threading.Thread(
+        target=recognition_worker, args=(None, robots), daemon=True
+    )
+    worker.start()
+
+    own_inputs = inputs is None
+    if own_inputs:
+        inputs = InputMultiplexer(address=INPUT_ADDRESS)
+    print(">>> Type 'stop' to terminate <<<")
+    while True:
+        user_input = inputs.read_line()
+        if user_input is None or user_input.lower() in UserResponses.STOP:
+            break
+    if own_inputs:
+        inputs.close()
+
+    fan_in.stop()
+    recognition_stop.set()
+    worker.join()
+    robot_statuses.clear()
+
+    def stop_robot(misty: Misty) -> Dict:
+        return misty.perform_action("face_recognition_stop").parse_to_dict()
+
+    with ThreadPoolExecutor(max_workers=min(len(robots), DELETE_WORKERS)) as pool:
+        for key, result in zip(robots, pool.map(stop_robot, robots.values())):
+            actions["%s_stop" % key] = result
+
+    result = success_of_action_dict(**actions)
+    if measure:
+        result["recognition_rates"] = recognition_meter.report()
+    return result
 
 
 if __name__ == "__main__":
@@ -1,90 +1,48 @@
 """This module implements a skill that allows a person to have a simple dialogue with Misty.
 """
-import datetime
-import os
+import threading
 from enum import Enum
-from typing import Dict, List, Tuple
+from typing import Dict, FrozenSet, List
 
 import speech_recognition as sr
-from dotenv import dotenv_values
 from misty2py.basic_skills.cancel_skills import cancel_skills
-from misty2py.response import success_of_action_list
-from misty2py.utils.base64 import *
 from misty2py.utils.generators import get_random_string
-from misty2py.utils.status import ActionLog, Status
-from misty2py.utils.utils import (
-    get_abs_path,
-    get_base_fname_without_ext,
-    get_files_in_dir,
-    get_misty,
-)
-from num2words import num2words
+from misty2py.utils.utils import get_abs_path, get_misty
 from pymitter import EventEmitter
 
-
-class SpeechTranscripter:
-    """Represents the speech transcribing component of Wit.ai."""
-
-    def __init__(self, wit_ai_key: str) -> None:
-        """Initialises the speech transcripyer.
-
-        Args:
-            wit_ai_key (str): The API key for Wit.ai.
-        """
-        self.key = wit_ai_key
-        self.recogniser = sr.Recognizer()
-
-    def load_wav(self, audio_path: str) -> sr.AudioFile:
-        """Loads an audio (.wav) file.
-
-        Args:
-            audio_path (str): The absolute path to the audio file in .wav format to transcribe.
-
-        Returns:
-            sr.AudioFile: The speech_recognition package representation of an audio file.
-        """
-        with sr.AudioFile(audio_path) as source:
-            return self.recogniser.record(source)
-
-    def audio_to_text(self, audio: sr.AudioSource, show_all: bool = False) -> Dict:
-        """Transcribes an audio of a valid speech_recognition package defined format to plaintext.
-
-        Args:
-            audio (sr.AudioSource): The audio to transcribe.
-            show_all (bool, optional): Whether to return all possible transcriptions (`True`) or the one in which Wit.ai is most confident (`False`). Defaults to `False`.
-
-        Returns:
-            Dict: [description]
-        """
-        try:
-            transcription = self.recogniser.recognize_wit(
-                audio, key=self.key, show_all=show_all
-            )
-            return {"success": True, "content": transcription}
-
-        except sr.UnknownValueError:
-            return {"success": True, "content": "unknown"}
-
-        except sr.RequestError as e:
-            return {
-                "success": False,
-                "content": "Invalid request.",
-                "error_details": str(e),
-            }
-
+from misty2py_skills.essentials.speech_transcripter import get_speech_transcripter
+from misty2py_skills.utils.dialogue import (
+    SPEECH_FILE,
+    TTS_TIMEOUT,
+    date_renderer,
+    reply_handlers,
+    route_speech,
+)
+from misty2py_skills.utils.dialogue import load_speech as load_dialogue_speech
+from misty2py_skills.utils.status import ConditionStatus, StreamingActionLog
+from misty2py_skills.utils.utils import SequentialFileNames, get_next_file_name
 
 ee = EventEmitter()
 misty = get_misty()
-status = Status()
-action_log = ActionLog()
+status = ConditionStatus()
+action_log = StreamingActionLog()
+"""The log of the actions of the current dialogue, reset by every run of `question_answering`; pass `spill_path` to keep all of them in a file."""
 event_name = "user_speech_" + get_random_string(6)
-values = dotenv_values(".env")
-speech_transcripter = SpeechTranscripter(values.get("WIT_AI_KEY", ""))
+tts_event_name = "tts_complete_" + get_random_string(6)
+audio_ready = threading.Event()
+"""Set once the audio service is enabled and the volume is set, so that the following captures only issue the capture request."""
+speech_transcripter = get_speech_transcripter()
 
 SAVE_DIR = get_abs_path("data")
 """The location where a speech file is saved."""
-SPEECH_FILE = "capture_Dialogue.wav"
-"""The name od a speech file on Misty's server."""
+IN_MEMORY_SPEECH = True
+"""Whether the captured speech is transcribed straight from memory (`True`) or saved to `SAVE_DIR` and re-loaded from there first (`False`)."""
+ARCHIVE_SPEECH = True
+"""Whether the captured speech is archived in `SAVE_DIR` in the background when `IN_MEMORY_SPEECH` is `True`."""
+speech_archive = SequentialFileNames(SAVE_DIR)
+"""Allocates the names of the speech files saved in `SAVE_DIR`."""
+CHECK_AUDIO_LIST = False
+"""Whether to verify that `SPEECH_FILE` is in the (cached) list of Misty's audio files before requesting it. If `False`, the file is requested directly and a failed request re-initialises the dialogue."""
 
 
 class StatusLabels(Enum):
@@ -102,11 +60,51 @@ class StatusLabels(Enum):
     """The terminating state."""
     SPEAK = "ready_to_speak"
     """The speaking state."""
+    TALK = "talking"
+    """The state of waiting for Misty to finish speaking."""
+
+
+ACTIVE_STATES = frozenset(
+    [
+        StatusLabels.REINIT,
+        StatusLabels.INFER,
+        StatusLabels.PREP,
+        StatusLabels.SPEAK,
+        StatusLabels.STOP,
+    ]
+)
+"""The states in which the dialogue loop has work to do; in any other state (i.e. while listening or talking), the loop sleeps until a listener moves the dialogue into one of these."""
+
+
+class AudioListCache:
+    """Caches the names of the audio files on Misty's server until invalidated."""
+
+    def __init__(self) -> None:
+        """Initialises an empty cache."""
+        self.names = None
+        self.lock = threading.Lock()
+
+    def invalidate(self) -> None:
+        """Discards the cached names so that the next `get_` requests them again."""
+        with self.lock:
+            self.names = None
+
+    def get_(self) -> FrozenSet[str]:
+        """Returns the cached names of the audio files, requesting them from Misty if the cache is invalidated."""
+        with self.lock:
+            if self.names is None:
+                self.names = frozenset(get_all_audio_file_names())
+            return self.names
+
+
+audio_list_cache = AudioListCache()
 
 
 @ee.on(event_name)
 def listener(data: Dict):
     """Reacts to a capture speech event by commencing inferrence if speech was captured or by re-initialising the process in case of an initialisation error."""
+    audio_list_cache.invalidate()
+
     if data.get("errorCode", -1) == 0:
         status.set_(status=StatusLabels.INFER)
 
@@ -114,13 +112,14 @@ def listener(data: Dict):
         status.set_(status=StatusLabels.REINIT)
 
 
-def get_next_file_name(dir_: str) -> str:
-    """Generates the next file name in a directory whose files are named incrementally with strings representing integers, zero-padded to four characters."""
-    files = get_files_in_dir(dir_)
-    highest = 0
-    if len(files) > 0:
-        highest = max([int(get_base_fname_without_ext(f).lstrip("0")) for f in files])
-    return os.path.join(dir_, "%s.wav" % str(highest + 1).zfill(4))
+@ee.on(tts_event_name)
+def tts_listener(data: Dict):
+    """Reacts to Misty finishing an utterance by capturing the next speech."""
+    if status.get_("status") != StatusLabels.TALK:
+        return
+    utterance_id = data.get("utteranceId")
+    if utterance_id is None or utterance_id == status.get_("data"):
+        status.set_(status=StatusLabels.REINIT)
 
 
 def get_all_audio_file_names() -> List[str]:
@@ -137,182 +136,161 @@ def get_all_audio_file_names() -> List[str]:
     return audio_list
 
 
-def speech_capture() -> None:
-    """Captures speech."""
-    print("Listening")
+def prepare_audio() -> bool:
+    """Enables the audio service if it is disabled and sets the volume.
 
+    Returns:
+        bool: `True` if the audio service is enabled, `False` otherwise.
+    """
     audio_status = misty.get_info("audio_status").parse_to_dict()
     action_log.append_({"audio_status": audio_status})
 
-    if not audio_status.get("result"):
+    if not audio_status.get("rest_response", {}).get("result"):
         enable_audio = misty.perform_action("audio_enable").parse_to_dict()
         if not enable_audio.get("rest_response", {}).get("result"):
             action_log.append_({"enable_audio": enable_audio})
-            status.set_(status=StatusLabels.STOP)
-            return
+            return False
 
     set_volume = misty.perform_action(
         "volume_settings", data="low_volume"
     ).parse_to_dict()
     action_log.append_({"set_volume": set_volume})
+    return True
+
+
+def speech_capture() -> None:
+    """Captures speech. The audio service is only prepared before the first capture and after a failed capture."""
+    print("Listening")
+
+    if not audio_ready.is_set():
+        if not prepare_audio():
+            status.set_(status=StatusLabels.STOP)
+            return
+        audio_ready.set()
 
+    # the status must be set before the capture starts, otherwise a quick VoiceRecord event could be overwritten
+    status.set_(status=StatusLabels.LISTEN)
     capture_speech = misty.perform_action(
         "speech_capture", data={"RequireKeyPhrase": False}
     ).parse_to_dict()
     action_log.append_({"capture_speech": capture_speech})
-    status.set_(status=StatusLabels.LISTEN)
+    if not capture_speech.get("overall_success"):
+        audio_ready.clear()
+
+
+def load_speech(speech_base64: str) -> sr.AudioData:
+    """Loads a captured speech encoded in base64, either in memory or via a file in `SAVE_DIR` depending on `IN_MEMORY_SPEECH`, see `misty2py_skills.utils.dialogue.load_speech`."""
+    archive = speech_archive if ARCHIVE_SPEECH or not IN_MEMORY_SPEECH else None
+    return load_dialogue_speech(
+        speech_base64, speech_transcripter, archive, IN_MEMORY_SPEECH
+    )
 
 
 def perform_inference() -> None:
     """Transcribes the newest obtained captured speech."""
     print("Analysing")
-    label = StatusLabels.REINIT
-    data = ""
-
-    if SPEECH_FILE in get_all_audio_file_names():
-        speech_json = misty.get_info(
-            "audio_file", params={"FileName": SPEECH_FILE, "Base64": "true"}
-        )
-        speech_base64 = speech_json.get("result", {}).get("base64", "")
-        if len(speech_base64) > 0:
-            f_name = get_next_file_name(SAVE_DIR)
-            base64_to_content(speech_base64, save_path=f_name)
-            speech_wav = speech_transcripter.load_wav(f_name)
-            speech_text = speech_transcripter.audio_to_text(speech_wav, show_all=True)
-            label = StatusLabels.PREP
-            data = speech_text
-
-    status.set_(status=label, data=data)
-
-
-def get_intents_keywords(entities: Dict) -> Tuple[List[str], List[str]]:
-    """Obtains the list of intents and the list of keywords from an Wit.ai entity."""
-    intents = []
-    keywords = []
-    for key, val in entities.items():
-        if key == "intent":
-            intents.extend([dct.get("value") for dct in val])
-        else:
-            keywords.append(key)
-    return intents, keywords
-
-
-def choose_reply() -> None:
-    """Chooses the reply to the newest recorded speech by inferring the keywords and intents of the speech and matching the fitting reply to them."""
-    print("Preparing the reply")
 
-    data = status.get_("data")
-    if isinstance(data, Dict):
-        data = data.get("content", {})
+    if CHECK_AUDIO_LIST and SPEECH_FILE not in audio_list_cache.get_():
+        status.set_(status=StatusLabels.REINIT, data="")
+        return
 
-    intents, keywords = get_intents_keywords(data.get("entities", {}))
-    utterance_type = "unknown"
+    # a missing file results in an unsuccessful response without a result
+    speech_json = (
+        misty.get_info("audio_file", params={"FileName": SPEECH_FILE, "Base64": "true"})
+        .parse_to_dict()
+        .get("rest_response", {})
+    )
+    speech_result = speech_json.get("result")
+    speech_base64 = ""
+    if speech_json.get("success") and isinstance(speech_result, dict):
+        speech_base64 = speech_result.get("base64", "")
 
-    if "greet" in intents:
-        if "hello" in keywords:
-            utterance_type = "hello"
-        elif "goodbye" in keywords:
-            utterance_type = "goodbye"
-        else:
-            utterance_type = "hello"
+    if len(speech_base64) == 0:
+        status.set_(status=StatusLabels.REINIT, data="")
+        return
 
-    elif "datetime" in intents:
-        if "date" in keywords:
-            utterance_type = "date"
-        elif "month" in keywords:
-            utterance_type = "month"
-        elif "year" in keywords:
-            utterance_type = "year"
+    speech_wav = load_speech(speech_base64)
+    speech_text = speech_transcripter.audio_to_text(speech_wav, show_all=True)
+    status.set_(status=StatusLabels.PREP, data=speech_text)
 
-    elif "test" in intents:
-        utterance_type = "test"
 
-    status.set_(status=StatusLabels.SPEAK, data=utterance_type)
+def choose_reply() -> None:
+    """Chooses the reply to the newest recorded speech by inferring the keywords and intents of the speech and matching the fitting reply to them via `intent_router`."""
+    print("Preparing the reply")
+    status.set_(status=StatusLabels.SPEAK, data=route_speech(status.get_("data")))
 
 
 def speak(utterance: str) -> None:
-    """Misty speaks the `utterance`."""
+    """Misty speaks the `utterance`. Unless the dialogue ends, the next speech is captured once the `TextToSpeechComplete` event for the utterance arrives."""
     print(utterance)
 
+    utterance_id = "utterance_" + get_random_string(6)
+    if status.get_("data") == "goodbye":
+        label = StatusLabels.STOP
+    else:
+        label = StatusLabels.TALK
+    # the status must be set before the request, otherwise a quick TextToSpeechComplete event could be ignored
+    status.set_(status=label, data=utterance_id)
+
     speaking = misty.perform_action(
         "speak",
-        data={"Text": utterance, "Flush": "true"},
+        data={"Text": utterance, "Flush": "true", "UtteranceId": utterance_id},
     ).parse_to_dict()
     action_log.append_({"speaking": speaking})
 
-    label = StatusLabels.REINIT
-    if status.get_("data") == "goodbye":
-        label = StatusLabels.STOP
-
-    status.set_(status=label)
+    if label == StatusLabels.TALK and not speaking.get("overall_success"):
+        status.set_(status=StatusLabels.REINIT)
 
 
 def perform_reply() -> None:
-    """Formulates and speaks the reply based on the reply type obtained in the previous step (choosing a reply)."""
+    """Formulates and speaks the reply based on the reply type obtained in the previous step (choosing a reply) using the handler in `reply_handlers`; reply types without a handler are replied to as `"unknown"`."""
     print("Replying")
     reply_type = status.get_("data")
-
-    if reply_type == "test":
-        speak("I received your test.")
-
-    elif reply_type == "unknown":
-        speak("I am sorry, I do not understand.")
-
-    elif reply_type == "hello":
-        speak("Hello!")
-
-    elif reply_type == "goodbye":
-        speak("Goodbye!")
-
-    elif reply_type == "year":
-        now = datetime.datetime.now()
-        speak("It is the year %s." % num2words(now.year))
-
-    elif reply_type == "month":
-        now = datetime.datetime.now()
-        speak("It is the month of %s." % now.strftime("%B"))
-
-    elif reply_type == "date":
-        now = datetime.datetime.now()
-        speak(
-            "It is the %s of %s, year %s."
-            % (
-                num2words(now.day, to="ordinal"),
-                now.strftime("%B"),
-                num2words(now.year),
-            )
-        )
+    handler = reply_handlers.get(reply_type, reply_handlers["unknown"])
+    speak(handler())
 
 
 def subscribe():
-    """Subscribes to VoiceRecord event."""
+    """Subscribes to VoiceRecord and TextToSpeechComplete events."""
     subscribe_voice_record = misty.event(
         "subscribe", type="VoiceRecord", name=event_name, event_emitter=ee
     ).parse_to_dict()
     action_log.append_({"subscribe_voice_record": subscribe_voice_record})
 
+    subscribe_tts_complete = misty.event(
+        "subscribe", type="TextToSpeechComplete", name=tts_event_name, event_emitter=ee
+    ).parse_to_dict()
+    action_log.append_({"subscribe_tts_complete": subscribe_tts_complete})
+
 
 def unsubscribe():
-    """Unsubscribes from VoiceRecord event."""
+    """Unsubscribes from VoiceRecord and TextToSpeechComplete events."""
     unsubscribe_voice_record = misty.event(
         "unsubscribe", name=event_name
     ).parse_to_dict()
     action_log.append_({"unsubscribe_voice_record": unsubscribe_voice_record})
 
+    unsubscribe_tts_complete = misty.event(
+        "unsubscribe", name=tts_event_name
+    ).parse_to_dict()
+    action_log.append_({"unsubscribe_tts_complete": unsubscribe_tts_complete})
+
 
 def question_answering() -> Dict:
     """A skill that allows a person to have a simple dialogue with Misty.
 
     Returns:
-        Dict: The dictionary with `"overall_success"` key (bool) and keys for every action performed (dictionarised Misty2pyResponse).
+        Dict: The dictionary with `"overall_success"` key (bool), keys for every action performed (dictionarised Misty2pyResponse) and, if transcriptions are cached, the key `"transcription_cache"` with the cache statistics.
     """
+    date_renderer.warm()
+    audio_ready.clear()
+    action_log.reset()
     cancel_skills(misty)
     subscribe()
     status.set_(status=StatusLabels.REINIT)
 
-    while status.get_("status") != StatusLabels.STOP:
-        current_status = status.get_("status")
-
+    current_status = status.get_("status")
+    while current_status != StatusLabels.STOP:
         if current_status == StatusLabels.REINIT:
             speech_capture()
 
@@ -325,8 +303,20 @@ def question_answering() -> Dict:
         elif current_status == StatusLabels.SPEAK:
             perform_reply()
 
+        if status.get_("status") == StatusLabels.TALK:
+            current_status = status.wait_for_(ACTIVE_STATES, timeout=TTS_TIMEOUT)
+            if current_status == StatusLabels.TALK:
+                status.set_(status=StatusLabels.REINIT)
+                current_status = StatusLabels.REINIT
+        else:
+            current_status = status.wait_for_(ACTIVE_STATES)
+
     unsubscribe()
-    return success_of_action_list(action_log.get_())
+    action_log.close()
+    result = action_log.summarise()
+    if speech_transcripter.cache is not None:
+        result["transcription_cache"] = speech_transcripter.cache.stats()
+    return result
 
 
 if __name__ == "__main__":
@@ -3,15 +3,21 @@
 from typing import Dict, Union
 
 from misty2py.basic_skills.cancel_skills import cancel_skills
-from misty2py.basic_skills.movement import Movement
-from misty2py.response import success_of_action_list
-from misty2py.utils.status import ActionLog
 from misty2py.utils.utils import get_misty
 from pynput import keyboard
 
+from misty2py_skills.utils.drive import (
+    DRIVE_TTL,
+    HOLD_REFRESH,
+    MIN_INTERVAL,
+    DriveScheduler,
+    HeldDrive,
+)
+from misty2py_skills.utils.status import StreamingActionLog
+
 misty = get_misty()
-moves = Movement()
-actions = ActionLog()
+actions = StreamingActionLog()
+"""The log of the drive commands of the current run of `remote_control`, reset by every run; pass `spill_path` to keep all of them in a file."""
 
 FORW_KEY = keyboard.KeyCode.from_char("w")
 """The key for driving forward."""
@@ -31,53 +37,117 @@ TURN_VELOCITY = 10
 """The default turning velocity of the remote-controlled Misty."""
 BASE_ANGLE = 50
 """The default angle of turning."""
+COMMAND_INTERVAL = MIN_INTERVAL
+"""The minimal time in seconds between two drive commands; the commands of the keys pressed meanwhile are coalesced into the latest one."""
+HOLD_TO_DRIVE = False
+"""Whether Misty drives only while the direction keys are held (in the combined direction of all held keys) instead of driving in the direction of the last key tapped until the stop key is pressed."""
+DRIVE_TTL_MS = DRIVE_TTL
+"""The duration in ms of a drive command sent while the direction keys are held; Misty stops by herself if it is not refreshed in time."""
+HOLD_REFRESH_INTERVAL = HOLD_REFRESH
+"""The interval in seconds at which the drive command is sent again while the direction keys are held."""
+MEASURE_LATENCY = False
+"""Whether to report the counts and latencies of the drive commands under the key `"drive_commands"`."""
+
+KEY_COMMANDS = {
+    FORW_KEY: (
+        "drive_forward",
+        "drive",
+        {"LinearVelocity": BASE_VELOCITY, "AngularVelocity": 0},
+    ),
+    BACK_KEY: (
+        "drive_backward",
+        "drive",
+        {"LinearVelocity": -BASE_VELOCITY, "AngularVelocity": 0},
+    ),
+    L_KEY: (
+        "drive_left",
+        "drive",
+        {"LinearVelocity": TURN_VELOCITY, "AngularVelocity": BASE_ANGLE},
+    ),
+    R_KEY: (
+        "drive_right",
+        "drive",
+        {"LinearVelocity": TURN_VELOCITY, "AngularVelocity": -BASE_ANGLE},
+    ),
+}
+"""The drive commands of the keys as tuples of the name in the action log, the action keyword and the data."""
+KEY_DIRECTIONS = {
+    FORW_KEY: "forward",
+    BACK_KEY: "backward",
+    L_KEY: "left",
+    R_KEY: "right",
+}
+"""The directions of the keys when `HOLD_TO_DRIVE` is `True`."""
+scheduler = None
+"""Sends the drive commands of the pressed keys at a bounded rate; built by every run of `remote_control`, so that no run inherits the commands or counts of the previous one."""
+held_drive = None
+"""Drives Misty while the direction keys are held when `HOLD_TO_DRIVE` is `True`; built by every run of `remote_control`."""
 
 
 def handle_input(key: Union[keyboard.Key, keyboard.KeyCode]):
-    """Receives the kyboard inputs and transforms them into Misty's actions.
+    """Receives the kyboard inputs and transforms them into Misty's actions, which are sent by `scheduler`.
 
     Args:
         key (Union[keyboard.Key, keyboard.KeyCode]): the key pressed.
     """
-    if key == L_KEY:
-        actions.append_(
-            {"drive_left": moves.drive_left(misty, TURN_VELOCITY, BASE_ANGLE)}
-        )
-    elif key == R_KEY:
-        actions.append_(
-            {"drive_right": moves.drive_right(misty, TURN_VELOCITY, BASE_ANGLE)}
-        )
-    elif key == FORW_KEY:
-        actions.append_({"drive_forward": moves.drive_forward(misty, BASE_VELOCITY)})
-    elif key == BACK_KEY:
-        actions.append_({"drive_backward": moves.drive_backward(misty, BASE_VELOCITY)})
+    if HOLD_TO_DRIVE and key in KEY_DIRECTIONS:
+        held_drive.press(KEY_DIRECTIONS[key])
+    elif key in KEY_COMMANDS:
+        scheduler.submit(*KEY_COMMANDS[key])
+    elif key == STOP_KEY and HOLD_TO_DRIVE:
+        held_drive.release_all()
     elif key == STOP_KEY:
-        actions.append_({"stop_driving": moves.stop_driving(misty)})
+        scheduler.submit("stop_driving", "drive_stop", urgent=True)
     elif key == TERM_KEY:
         return False
 
 
-def handle_release(key: keyboard.Key):
-    """The method required by the keyboard package but not used in this skill."""
-    pass
+def handle_release(key: Union[keyboard.Key, keyboard.KeyCode]):
+    """Stops driving in the direction of a released key when `HOLD_TO_DRIVE` is `True`.
+
+    Args:
+        key (Union[keyboard.Key, keyboard.KeyCode]): the key released.
+    """
+    if HOLD_TO_DRIVE and key in KEY_DIRECTIONS:
+        held_drive.release(KEY_DIRECTIONS[key])
 
 
-def remote_control() -> Dict:
+def remote_control(measure: bool = MEASURE_LATENCY) -> Dict:
     """A skill that allows the user to remotely control Misty using a keyboard.
 
+    Args:
+        measure (bool, optional): Whether to report the counts and latencies of the drive commands under the key `"drive_commands"`. Defaults to `MEASURE_LATENCY`.
+
     Returns:
         Dict: The dictionary with `"overall_success"` key (bool) and keys for every action performed (dictionarised Misty2pyResponse).
     """
+    global scheduler, held_drive
     cancel_skills(misty)
+    actions.reset()
+    scheduler = DriveScheduler(misty, min_interval=COMMAND_INTERVAL, actions=actions)
+    held_drive = HeldDrive(
+        scheduler,
+        BASE_VELOCITY,
+        TURN_VELOCITY,
+        BASE_ANGLE,
+        ttl=DRIVE_TTL_MS,
+        refresh=HOLD_REFRESH_INTERVAL,
+    )
     print(
         f">>> Press {TERM_KEY} to terminate; control the movement via {L_KEY}, {BACK_KEY}, {R_KEY}, {FORW_KEY}; stop moving with {STOP_KEY}. <<<"
     )
+    scheduler.start()
     with keyboard.Listener(
         on_press=handle_input, on_release=handle_release
     ) as listener:
         listener.join()
+    scheduler.stop()
 
-    return success_of_action_list(actions.get_())
+    actions.close()
+    result = actions.summarise()
+    if measure:
+        result["drive_commands"] = scheduler.report()
+    return result
 
 
 if __name__ == "__main__":
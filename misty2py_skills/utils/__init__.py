@@ -0,0 +1,2 @@
+"""Utility modules shared by the skills of this package.
+"""
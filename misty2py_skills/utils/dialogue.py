@@ -0,0 +1,269 @@
+"""This module contains the parts of the dialogue skill shared by `misty2py_skills.question_answering` and `misty2py_skills.aio.question_answering`: the routing of transcribed speech to reply types, the replies and the loading of captured speech. It does not connect to Misty.
+"""
+import base64
+import datetime
+import threading
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+
+import speech_recognition as sr
+from misty2py.utils.base64 import base64_to_content
+from num2words import num2words
+
+from misty2py_skills.essentials.speech_transcripter import SpeechTranscripter
+from misty2py_skills.utils.utils import SequentialFileNames
+
+SPEECH_FILE = "capture_Dialogue.wav"
+"""The name od a speech file on Misty's server."""
+TTS_TIMEOUT = 10
+"""The maximum time (in seconds) to wait for the `TextToSpeechComplete` event before capturing speech again."""
+
+
+class IntentRouter:
+    """Maps the intents and keywords of a speech to the type of reply.
+
+    Every intent has an ordered list of keyword routes and an optional default reply type; if a speech has several intents, the intent registered first wins, and if it has several keywords of the winning intent, the keyword route registered first wins. Routing a speech takes time proportional to the number of its intents and keywords, regardless of the number of routes.
+    """
+
+    def __init__(self, fallback: str = "unknown") -> None:
+        """Initialises a router without any routes.
+
+        Args:
+            fallback (str, optional): The reply type for a speech without any routed intent. Defaults to `"unknown"`.
+        """
+        self.fallback = fallback
+        self.intent_priorities = {}
+        self.intent_defaults = {}
+        self.keyword_routes = {}
+
+    def add_route(
+        self, intent: str, reply_type: str, keyword: Optional[str] = None
+    ) -> None:
+        """Routes a speech with `intent` (and `keyword`) to `reply_type`.
+
+        Args:
+            intent (str): The intent of the speech.
+            reply_type (str): The type of the reply.
+            keyword (Optional[str], optional): The keyword of the speech or `None` to set the default reply type of `intent`. Defaults to `None`.
+        """
+        self.intent_priorities.setdefault(intent, len(self.intent_priorities))
+        if keyword is None:
+            self.intent_defaults[intent] = reply_type
+            return
+        routes = self.keyword_routes.setdefault(intent, {})
+        if keyword in routes:
+            routes[keyword] = (routes[keyword][0], reply_type)
+        else:
+            routes[keyword] = (len(routes), reply_type)
+
+    def route(self, intents: Set[str], keywords: Set[str]) -> str:
+        """Returns the reply type for a speech with `intents` and `keywords`."""
+        routed = [i for i in intents if i in self.intent_priorities]
+        if len(routed) == 0:
+            return self.fallback
+        intent = min(routed, key=self.intent_priorities.get)
+
+        routes = self.keyword_routes.get(intent, {})
+        matches = [routes[k] for k in keywords if k in routes]
+        if len(matches) > 0:
+            return min(matches)[1]
+        return self.intent_defaults.get(intent, self.fallback)
+
+
+intent_router = IntentRouter()
+"""The router of the intents and keywords of Wit.ai responses to reply types; more routes can be added via `intent_router.add_route`."""
+intent_router.add_route("greet", "hello", keyword="hello")
+intent_router.add_route("greet", "goodbye", keyword="goodbye")
+intent_router.add_route("greet", "hello")
+intent_router.add_route("datetime", "date", keyword="date")
+intent_router.add_route("datetime", "month", keyword="month")
+intent_router.add_route("datetime", "year", keyword="year")
+intent_router.add_route("test", "test")
+
+
+class DateRenderer:
+    """Renders the spoken forms of the current date.
+
+    The ordinals of the days of a month and the names of the months are rendered once; the spoken forms of the current day, month and year are re-rendered only when the day changes.
+    """
+
+    def __init__(self) -> None:
+        """Initialises the renderer without rendering anything; call `warm` to render ahead of the first use."""
+        self.ordinals = {}
+        self.months = {}
+        self.today = None
+        self.spoken = {}
+        self.lock = threading.Lock()
+
+    def warm(self) -> None:
+        """Renders the ordinals, the month names and the current date, which also loads the language data of `num2words`."""
+        with self.lock:
+            self._render_static()
+            self._refresh()
+
+    def _render_static(self) -> None:
+        """Renders the ordinals of the days of a month and the names of the months."""
+        if len(self.ordinals) == 0:
+            self.ordinals = {d: num2words(d, to="ordinal") for d in range(1, 32)}
+            self.months = {
+                m: datetime.date(2000, m, 1).strftime("%B") for m in range(1, 13)
+            }
+
+    def _refresh(self) -> None:
+        """Re-renders the spoken forms of the current date if the day has changed since the last rendering."""
+        today = datetime.date.today()
+        if today == self.today:
+            return
+        year = (
+            self.spoken.get("year")
+            if self.today is not None and today.year == self.today.year
+            else num2words(today.year)
+        )
+        self.spoken = {
+            "day": self.ordinals[today.day],
+            "month": self.months[today.month],
+            "year": year,
+        }
+        self.today = today
+
+    def _get(self, part: str) -> str:
+        """Returns the spoken form of `part` (`"day"`, `"month"` or `"year"`) of the current date."""
+        with self.lock:
+            self._render_static()
+            self._refresh()
+            return self.spoken[part]
+
+    def day(self) -> str:
+        """Returns the ordinal of the current day of the month."""
+        return self._get("day")
+
+    def month(self) -> str:
+        """Returns the name of the current month."""
+        return self._get("month")
+
+    def year(self) -> str:
+        """Returns the current year in words."""
+        return self._get("year")
+
+    def date(self) -> Tuple[str, str, str]:
+        """Returns the ordinal of the current day of the month, the name of the current month and the current year in words, all rendered from the same date even if the day changes meanwhile."""
+        with self.lock:
+            self._render_static()
+            self._refresh()
+            return self.spoken["day"], self.spoken["month"], self.spoken["year"]
+
+
+date_renderer = DateRenderer()
+"""Renders the spoken forms of the current date for the replies."""
+
+reply_handlers = {}
+"""The functions returning the utterance for a reply type, keyed by the reply type."""
+
+
+def register_reply(reply_type: str) -> Callable:
+    """Registers the decorated function as the handler of `reply_type`, i.e. the function returning the utterance Misty speaks as the reply of this type."""
+
+    def decorator(handler: Callable[[], str]) -> Callable[[], str]:
+        reply_handlers[reply_type] = handler
+        return handler
+
+    return decorator
+
+
+def get_intents_keywords(entities: Dict) -> Tuple[Set[str], Set[str]]:
+    """Obtains the set of intents and the set of keywords from an Wit.ai entity."""
+    intents = set()
+    keywords = set()
+    for key, val in entities.items():
+        if key == "intent":
+            intents.update(dct.get("value") for dct in val)
+        else:
+            keywords.add(key)
+    return intents, keywords
+
+
+def route_speech(speech_text: Any) -> str:
+    """Returns the reply type for a transcription returned by `SpeechTranscripter.audio_to_text` with `show_all=True` by matching its intents and keywords via `intent_router`."""
+    data = speech_text
+    if isinstance(data, dict):
+        data = data.get("content", {})
+    if not isinstance(data, dict):
+        data = {}
+
+    intents, keywords = get_intents_keywords(data.get("entities", {}))
+    return intent_router.route(intents, keywords)
+
+
+@register_reply("test")
+def reply_test() -> str:
+    """Replies to a test."""
+    return "I received your test."
+
+
+@register_reply("unknown")
+def reply_unknown() -> str:
+    """Replies to a speech that was not understood."""
+    return "I am sorry, I do not understand."
+
+
+@register_reply("hello")
+def reply_hello() -> str:
+    """Replies to a greeting."""
+    return "Hello!"
+
+
+@register_reply("goodbye")
+def reply_goodbye() -> str:
+    """Replies to a farewell."""
+    return "Goodbye!"
+
+
+@register_reply("year")
+def reply_year() -> str:
+    """Replies with the current year."""
+    return "It is the year %s." % date_renderer.year()
+
+
+@register_reply("month")
+def reply_month() -> str:
+    """Replies with the current month."""
+    return "It is the month of %s." % date_renderer.month()
+
+
+@register_reply("date")
+def reply_date() -> str:
+    """Replies with the current date."""
+    return "It is the %s of %s, year %s." % date_renderer.date()
+
+
+def archive_speech(wav: bytes, archive: SequentialFileNames) -> None:
+    """Saves the content of a captured speech file under the next free file name of `archive`."""
+    with open(archive.allocate(), "wb") as f:
+        f.write(wav)
+
+
+def load_speech(
+    speech_base64: str,
+    transcripter: SpeechTranscripter,
+    archive: Optional[SequentialFileNames] = None,
+    in_memory: bool = True,
+) -> sr.AudioData:
+    """Loads a captured speech encoded in base64 for `transcripter`.
+
+    Args:
+        speech_base64 (str): The captured speech encoded in base64.
+        transcripter (SpeechTranscripter): The transcripter to load the speech.
+        archive (Optional[SequentialFileNames], optional): Allocates the names of the saved speech files; if `None`, the speech is not saved. Defaults to `None`.
+        in_memory (bool, optional): Whether to load the speech straight from memory, archiving it via `archive` in the background, instead of saving it via `archive` and re-loading it from the file; `archive` is required if `False`. Defaults to `True`.
+
+    Returns:
+        sr.AudioData: The loaded speech.
+    """
+    if not in_memory:
+        f_name = archive.allocate()
+        base64_to_content(speech_base64, save_path=f_name)
+        return transcripter.load_wav(f_name)
+
+    wav = base64.b64decode(speech_base64)
+    if archive is not None:
+        threading.Thread(target=archive_speech, args=(wav, archive)).start()
+    return transcripter.load_wav_bytes(wav)
@@ -0,0 +1,257 @@
+"""This module implements scheduling of drive commands, so that a burst of commands (e.g. from the key-repeat of a keyboard) is coalesced into the latest desired motion and sent at a bounded rate instead of queueing up behind each other.
+"""
+import collections
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from misty2py.robot import Misty
+from misty2py.utils.status import ActionLog
+
+MIN_INTERVAL = 0.1
+"""The default minimal time in seconds between two drive commands sent to Misty."""
+LATENCY_ENTRIES = 256
+"""The default number of the latest command latencies kept for the report."""
+DRIVE_TTL = 500
+"""The default duration in ms of a timed drive command sent while the direction keys are held."""
+HOLD_REFRESH = 0.2
+"""The default interval in seconds at which a timed drive command is sent again while the direction keys are held; must be shorter than `DRIVE_TTL`."""
+
+
+class DriveScheduler:
+    """Sends the latest submitted drive command to Misty on a background thread.
+
+    Only one command is pending at a time: submitting a command replaces the pending one, which is dropped. The commands are sent at most once per `min_interval` seconds unless they are urgent (e.g. stopping) and a command equal to the last one sent is dropped as redundant unless it is a repeat (e.g. refreshing a timed drive command).
+
+    A command can be refreshed, i.e. sent again every `refresh` seconds until another command is submitted, which keeps a timed drive command (`"drive_time"`) going for as long as it is wanted while Misty stops by herself if the refreshes stop coming.
+
+    The latency of a sent command is the time from its submission until its request starts; since superseded commands are never sent, it stays bounded by `min_interval` plus the duration of one request regardless of the rate of submissions.
+    """
+
+    def __init__(
+        self,
+        misty: Misty,
+        min_interval: float = MIN_INTERVAL,
+        actions: Optional[ActionLog] = None,
+        latency_entries: int = LATENCY_ENTRIES,
+    ) -> None:
+        """Initialises a scheduler; the sending thread starts with `start`.
+
+        Args:
+            misty (Misty): The Misty to drive.
+            min_interval (float, optional): The minimal time in seconds between two commands that are not urgent. Defaults to `MIN_INTERVAL`.
+            actions (Optional[ActionLog], optional): The log to which the responses are appended under the names of the commands, if any. Defaults to `None`.
+            latency_entries (int, optional): The number of the latest latencies kept for the report. Defaults to `LATENCY_ENTRIES`.
+        """
+        self.misty = misty
+        self.min_interval = min_interval
+        self.actions = actions
+        self.latencies = collections.deque(maxlen=latency_entries)
+        self.counts = {
+            "submitted": 0,
+            "sent": 0,
+            "dropped": 0,
+            "redundant": 0,
+            "refreshed": 0,
+        }
+        self.last_sent = None
+        self._pending = None
+        self._refreshing = None
+        self._refresh_at = None
+        self._last_time = None
+        self._condition = threading.Condition()
+        self._running = False
+        self._thread = None
+
+    def submit(
+        self,
+        name: str,
+        action: str,
+        data: Optional[Dict] = None,
+        urgent: bool = False,
+        repeat: bool = False,
+        refresh: Optional[float] = None,
+    ) -> None:
+        """Makes a command the next one to send, replacing the pending command.
+
+        Args:
+            name (str): The name of the command in the action log, e.g. `"drive_forward"`.
+            action (str): The action keyword of `misty.perform_action`, e.g. `"drive"`.
+            data (Optional[Dict], optional): The data of the action; `None` for no data. Defaults to `None`.
+            urgent (bool, optional): Whether to send the command without waiting for `min_interval` to pass. Defaults to `False`.
+            repeat (bool, optional): Whether to send the command even if it equals the last command sent. Defaults to `False`.
+            refresh (Optional[float], optional): The interval in seconds at which to send the command again until another command is submitted, or `None` to send it once. Defaults to `None`.
+        """
+        if data is None:
+            data = {}
+        with self._condition:
+            self.counts["submitted"] += 1
+            if self._pending is not None:
+                self.counts["dropped"] += 1
+                urgent = urgent or self._pending[4]
+            if not repeat and self.last_sent == (action, data):
+                self._pending = None
+                self.counts["redundant"] += 1
+                return
+            self._pending = (name, action, data, time.perf_counter(), urgent, refresh)
+            self._condition.notify()
+
+    def start(self) -> None:
+        """Starts sending the commands on a background thread."""
+        self._running = True
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+
+    def run(self) -> None:
+        """Sends the pending commands until `stop` is called."""
+        while True:
+            with self._condition:
+                while True:
+                    if self._pending is None:
+                        if not self._running:
+                            return
+                        if self._refreshing is None:
+                            self._condition.wait()
+                            continue
+                        wait = self._refresh_at - time.perf_counter()
+                        if wait > 0:
+                            self._condition.wait(wait)
+                            continue
+                        # a refresh is not a submission, hence it has no latency
+                        name, action, data, refresh = self._refreshing
+                        self._pending = (name, action, data, None, True, refresh)
+                        self.counts["refreshed"] += 1
+                    if not self._pending[4] and self._last_time is not None:
+                        wait = self._last_time + self.min_interval - time.perf_counter()
+                        if wait > 0 and self._running:
+                            self._condition.wait(wait)
+                            continue
+                    break
+                name, action, data, submitted, _, refresh = self._pending
+                self._pending = None
+                self.last_sent = (action, data)
+                self._last_time = time.perf_counter()
+                if submitted is not None:
+                    self.latencies.append(self._last_time - submitted)
+                self.counts["sent"] += 1
+                if refresh is None:
+                    self._refreshing = None
+                else:
+                    self._refreshing = (name, action, data, refresh)
+                    self._refresh_at = self._last_time + refresh
+            response = self.misty.perform_action(action, data=data).parse_to_dict()
+            if self.actions is not None:
+                self.actions.append_({name: response})
+
+    def stop(self) -> None:
+        """Sends the pending command, if any, and stops the sending thread."""
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def report(self) -> Dict:
+        """Returns the counts of the submitted, sent, dropped (superseded), redundant and refreshed commands and the mean, median, 95th percentile and maximum latency in ms."""
+        with self._condition:
+            latencies = sorted(self.latencies)
+            counts = dict(self.counts)
+        if not latencies:
+            return {"counts": counts, "latency_ms": {}}
+        return {
+            "counts": counts,
+            "latency_ms": {
+                "mean": sum(latencies) / len(latencies) * 1000,
+                "p50": latencies[len(latencies) // 2] * 1000,
+                "p95": latencies[max(int(len(latencies) * 0.95) - 1, 0)] * 1000,
+                "max": latencies[-1] * 1000,
+            },
+        }
+
+
+class HeldDrive:
+    """Drives Misty while direction keys are held.
+
+    The held directions (`"forward"`, `"backward"`, `"left"` and `"right"`) are combined into one motion, e.g. forward and left into a left curve, and opposite directions cancel out. The motion is sent as a timed drive command lasting `ttl` ms which is refreshed every `refresh` seconds while the keys are held, so Misty stops by herself if the refreshes stop coming; releasing the last key stops her at once. A repeated press of a held key (the key-repeat of a keyboard) sends nothing.
+    """
+
+    DIRECTIONS = frozenset(["forward", "backward", "left", "right"])
+
+    def __init__(
+        self,
+        scheduler: DriveScheduler,
+        velocity: int,
+        turn_velocity: int,
+        angle: int,
+        ttl: int = DRIVE_TTL,
+        refresh: float = HOLD_REFRESH,
+    ) -> None:
+        """Initialises a HeldDrive with no keys held.
+
+        Args:
+            scheduler (DriveScheduler): The scheduler sending the commands.
+            velocity (int): The linear velocity when driving forward or backward.
+            turn_velocity (int): The linear velocity when only turning.
+            angle (int): The angular velocity when turning.
+            ttl (int, optional): The duration of a timed drive command in ms. Defaults to `DRIVE_TTL`.
+            refresh (float, optional): The interval in seconds at which the command is sent again. Defaults to `HOLD_REFRESH`.
+        """
+        self.scheduler = scheduler
+        self.velocity = velocity
+        self.turn_velocity = turn_velocity
+        self.angle = angle
+        self.ttl = ttl
+        self.refresh = refresh
+        self.held = set()
+        self.lock = threading.Lock()
+
+    def motion(self) -> Tuple[int, int]:
+        """Returns the linear and angular velocity of the held directions."""
+        forward = ("forward" in self.held) - ("backward" in self.held)
+        turn = ("left" in self.held) - ("right" in self.held)
+        linear = forward * self.velocity
+        if forward == 0 and turn != 0:
+            linear = self.turn_velocity
+        return linear, turn * self.angle
+
+    def press(self, direction: str) -> None:
+        """Holds a direction and drives in the new combined motion unless the direction was already held."""
+        with self.lock:
+            if direction in self.held:
+                return
+            self.held.add(direction)
+            self._drive()
+
+    def release(self, direction: str) -> None:
+        """Releases a direction and drives in the remaining motion or stops if no motion remains."""
+        with self.lock:
+            if not direction in self.held:
+                return
+            self.held.discard(direction)
+            self._drive()
+
+    def release_all(self) -> None:
+        """Releases all directions and stops."""
+        with self.lock:
+            self.held.clear()
+            self._drive()
+
+    def _drive(self) -> None:
+        """Submits the motion of the held directions as a timed drive command refreshed every `refresh` seconds, or an urgent stop if no motion remains; called with `lock` held."""
+        linear, angular = self.motion()
+        if linear == 0 and angular == 0:
+            self.scheduler.submit("stop_driving", "drive_stop", urgent=True)
+            return
+        self.scheduler.submit(
+            "drive_held",
+            "drive_time",
+            {
+                "LinearVelocity": linear,
+                "AngularVelocity": angular,
+                "TimeMs": self.ttl,
+            },
+            urgent=True,
+            repeat=True,
+            refresh=self.refresh,
+        )
@@ -0,0 +1,443 @@
+"""This module extends the event subscriptions of `misty2py` with the options of Misty's WebSocket API that `misty2py.robot.Misty.event` does not expose and implements measuring the rate of received events.
+"""
+import json
+import selectors
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+import websocket
+from misty2py.misty_event import DEFAULT_DEBOUNCE, DEFAULT_LEN_ENTRIES, MistyEvent
+from misty2py.response import Misty2pyErrorType, Misty2pyResponse, unknown_error
+from misty2py.robot import Misty
+from misty2py.utils.generators import get_random_string
+
+RECONNECT_DELAY = 0.5
+"""The delay in seconds before the first attempt to restore a lost connection of `EventFanIn`."""
+MAX_RECONNECT_DELAY = 8
+"""The maximum delay in seconds between two attempts to restore a lost connection of `EventFanIn`; the delay doubles after every failed attempt."""
+RECEIVE_TIMEOUT = 0.05
+"""The socket timeout in seconds of the connections of `EventFanIn` once they are established; a message whose frame arrives only partially is completed on a later pass of the receiving thread instead of blocking it."""
+CONNECT_WORKERS = 4
+"""The maximum number of connections of `EventFanIn` restored at the same time."""
+
+
+def event_condition(property_: str, inequality: str, value: Any) -> Dict:
+    """Constructs an event condition in the format required by Misty's WebSocket API.
+
+    Args:
+        property_ (str): The property of the event message to compare.
+        inequality (str): The comparison operator, one of `"="`, `"!="`, `">"`, `">="`, `"<"` and `"<="`.
+        value (Any): The value to compare the property with.
+
+    Returns:
+        Dict: The event condition.
+    """
+    return {"Property": property_, "Inequality": inequality, "Value": value}
+
+
+class ConditionalMistyEvent(MistyEvent):
+    """A `MistyEvent` whose subscription can contain event conditions, so that Misty only sends the messages that satisfy them."""
+
+    def __init__(
+        self,
+        url: str,
+        type_str: str,
+        event_name: str,
+        return_property: Optional[str],
+        debounce: int,
+        len_data_entries: int,
+        event_emitter: Optional[Callable],
+        event_conditions: Optional[List[Dict]] = None,
+    ):
+        """Initialises an event object.
+
+        Args:
+            url (str): The URL of Misty's WebSocket API.
+            type_str (str): The event type string as required by Misty's WebSockets API.
+            event_name (str): A custom, unique event name.
+            return_property (Optional[str]): The property to return as required by Misty's WebSockets API.
+            debounce (int): The interval at which new information is sent in ms.
+            len_data_entries (int): The maximum number of data entries to keep.
+            event_emitter (Optional[Callable]): The event emitter function if one is desired, False otherwise.
+            event_conditions (Optional[List[Dict]], optional): The event conditions (see `event_condition`). Defaults to `None`.
+        """
+        # set before the initialisation of the parent, which already starts the subscribing thread
+        self.event_conditions = event_conditions or []
+        super().__init__(
+            url,
+            type_str,
+            event_name,
+            return_property,
+            debounce,
+            len_data_entries,
+            event_emitter,
+        )
+
+    def subscribe(self):
+        """Constructs the subscription message including the event conditions."""
+        msg = {
+            "Operation": "subscribe",
+            "Type": self.type_str,
+            "DebounceMs": self.debounce,
+            "EventName": self.event_name,
+            "ReturnProperty": self.return_property,
+        }
+        if self.event_conditions:
+            msg["EventConditions"] = self.event_conditions
+        self.ws.send(json.dumps(msg, separators=(",", ":")))
+
+
+def subscribe_event(
+    misty: Misty,
+    type_str: str,
+    name: Optional[str] = None,
+    event_emitter: Optional[Callable] = None,
+    debounce: int = DEFAULT_DEBOUNCE,
+    return_property: Optional[str] = None,
+    event_conditions: Optional[List[Dict]] = None,
+    len_data_entries: int = DEFAULT_LEN_ENTRIES,
+) -> Misty2pyResponse:
+    """Subscribes to an event type like `misty.event("subscribe", ...)` but allows to specify event conditions.
+
+    The event is registered with `misty`'s event handler, so it can be unsubscribed via `misty.event("unsubscribe", name=name)`.
+
+    Args:
+        misty (Misty): The Misty to subscribe to.
+        type_str (str): The event type.
+        name (Optional[str], optional): The unique event name; generated if `None`. Defaults to `None`.
+        event_emitter (Optional[Callable], optional): The event emitter which emits the event `name` upon every message. Defaults to `None`.
+        debounce (int, optional): The minimal interval between two messages in ms. Defaults to `250`.
+        return_property (Optional[str], optional): The only property of the messages to receive; all properties are received if `None`. Defaults to `None`.
+        event_conditions (Optional[List[Dict]], optional): The conditions the messages must satisfy to be sent (see `event_condition`). Defaults to `None`.
+        len_data_entries (int, optional): The maximum number of data entries to keep. Defaults to `10`.
+
+    Returns:
+        Misty2pyResponse: A Misty2pyResponse object with Misty2py sub-response and Misty WebSocket API sub-response.
+    """
+    if not type_str:
+        return Misty2pyResponse(
+            False,
+            error_msg="No event type specified.",
+            error_type=Misty2pyErrorType.MISSING,
+        )
+    if not name:
+        name = "event_%s_%s" % (type_str, get_random_string(8))
+    handler = misty.event_handler
+    try:
+        event = ConditionalMistyEvent(
+            handler.url,
+            type_str,
+            name,
+            return_property,
+            debounce,
+            len_data_entries,
+            event_emitter,
+            event_conditions=event_conditions,
+        )
+    except Exception as e:
+        return unknown_error(e)
+    handler.events[name] = event
+    return Misty2pyResponse(
+        True,
+        ws_response={
+            "success": True,
+            "event_name": name,
+            "message": "Subscribed to event type `%s` with name `%s`"
+            % (type_str, name),
+        },
+    )
+
+
+class EventRateMeter:
+    """Counts events under different names (e.g. received and acted on) and reports their rates per second since the meter was started."""
+
+    def __init__(self) -> None:
+        """Initialises and starts the meter."""
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Clears the counts and restarts the meter."""
+        with self.lock:
+            self.counts = {}
+            self.started = time.perf_counter()
+
+    def count(self, name: str, n: int = 1) -> None:
+        """Adds `n` events to the count of `name`."""
+        with self.lock:
+            self.counts[name] = self.counts.get(name, 0) + n
+
+    def report(self) -> Dict:
+        """Returns the duration of the measurement, the counts and the rates per second."""
+        with self.lock:
+            duration = time.perf_counter() - self.started
+            counts = dict(self.counts)
+        return {
+            "duration": duration,
+            "counts": counts,
+            "rates": {
+                name: (count / duration if duration > 0 else 0.0)
+                for name, count in counts.items()
+            },
+        }
+
+
+class EventFanIn:
+    """Receives the events of many Mistys on a single thread.
+
+    Every Misty gets one WebSocket connection which carries all of its subscriptions; the connections are watched by one selector and every message is passed to `callback` together with the key of the Misty and the name of the event. Unlike `misty2py.robot.Misty.event`, which starts a thread per subscription, the number of threads does not grow with the number of Mistys or event types.
+
+    A lost connection is restored after `RECONNECT_DELAY` seconds, with the delay doubling up to `MAX_RECONNECT_DELAY` seconds while the attempts fail, and its subscriptions are renewed; the errors are collected in `errors`. The connections are opened outside `lock` (the lost ones by a pool of `CONNECT_WORKERS` threads), so connecting to an unresponsive Misty does not hold up the events of the others.
+    """
+
+    def __init__(
+        self, callback: Callable[[str, str, Any], None], timeout: float = 5
+    ) -> None:
+        """Initialises the fan-in without any connections.
+
+        Args:
+            callback (Callable[[str, str, Any], None]): Called on the receiving thread with the key of the Misty, the event name and the message of every event.
+            timeout (float, optional): The timeout of connecting in seconds; the established connections use `RECEIVE_TIMEOUT`. Defaults to `5`.
+        """
+        self.callback = callback
+        self.timeout = timeout
+        self.selector = selectors.DefaultSelector()
+        self.robots = {}
+        self.connections = {}
+        self.subscriptions = {}
+        self.messages = {}
+        self.reconnects = {}
+        self.connecting = set()
+        self.reconnections = 0
+        self.errors = []
+        self.lock = threading.Lock()
+        self._running = threading.Event()
+        self._thread = None
+        self._connector = None
+
+    def subscribe(
+        self,
+        key: str,
+        misty: Misty,
+        type_str: str,
+        name: Optional[str] = None,
+        debounce: int = DEFAULT_DEBOUNCE,
+        return_property: Optional[str] = None,
+        event_conditions: Optional[List[Dict]] = None,
+    ) -> Misty2pyResponse:
+        """Subscribes to an event type of a Misty, connecting to the Misty first if necessary.
+
+        Args:
+            key (str): The key under which the Misty's events are passed to the callback.
+            misty (Misty): The Misty to subscribe to.
+            type_str (str): The event type.
+            name (Optional[str], optional): The unique event name; generated if `None`. Defaults to `None`.
+            debounce (int, optional): The minimal interval between two messages in ms. Defaults to `250`.
+            return_property (Optional[str], optional): The only property of the messages to receive. Defaults to `None`.
+            event_conditions (Optional[List[Dict]], optional): The conditions the messages must satisfy to be sent. Defaults to `None`.
+
+        Returns:
+            Misty2pyResponse: A Misty2pyResponse object with Misty2py sub-response and Misty WebSocket API sub-response.
+        """
+        if not name:
+            name = "event_%s_%s" % (type_str, get_random_string(8))
+        msg = {
+            "Operation": "subscribe",
+            "Type": type_str,
+            "DebounceMs": debounce,
+            "EventName": name,
+            "ReturnProperty": return_property,
+        }
+        if event_conditions:
+            msg["EventConditions"] = event_conditions
+        raw = json.dumps(msg, separators=(",", ":"))
+        try:
+            with self.lock:
+                self.robots[key] = misty
+                self.subscriptions[name] = key
+                self.messages[name] = raw
+                ws = self.connections.get(key)
+                # a connection being opened or restored sends the subscription once it is registered
+                if ws is not None:
+                    ws.send(raw)
+                connect = (
+                    ws is None
+                    and key not in self.reconnects
+                    and key not in self.connecting
+                )
+                if connect:
+                    self.connecting.add(key)
+            if connect:
+                self._register(key, self._open(key))
+        except Exception as e:
+            with self.lock:
+                if connect:
+                    self.connecting.discard(key)
+                self.subscriptions.pop(name, None)
+                self.messages.pop(name, None)
+            return unknown_error(e)
+        return Misty2pyResponse(
+            True,
+            ws_response={
+                "success": True,
+                "event_name": name,
+                "message": "Subscribed to event type `%s` with name `%s`"
+                % (type_str, name),
+            },
+        )
+
+    def unsubscribe(self, name: str) -> None:
+        """Unsubscribes from an event."""
+        with self.lock:
+            key = self.subscriptions.pop(name, None)
+            self.messages.pop(name, None)
+            ws = self.connections.get(key)
+        if ws is not None:
+            msg = {"Operation": "unsubscribe", "EventName": name, "Message": ""}
+            try:
+                ws.send(json.dumps(msg, separators=(",", ":")))
+            except (websocket.WebSocketException, OSError) as e:
+                self.errors.append((key, e))
+
+    def start(self) -> None:
+        """Starts receiving the events on a background thread."""
+        self._running.set()
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+
+    def run(self) -> None:
+        """Receives and dispatches the events until `stop` is called; the connections being restored when it is called are closed before it returns."""
+        self._connector = ThreadPoolExecutor(max_workers=CONNECT_WORKERS)
+        try:
+            while self._running.is_set():
+                self._reconnect_due()
+                if not self.connections:
+                    time.sleep(0.1)
+                    continue
+                for selector_key, _ in self.selector.select(0.1):
+                    self._receive(selector_key.data)
+        finally:
+            self._connector.shutdown(wait=True)
+
+    def _open(self, key: str) -> websocket.WebSocket:
+        """Connects to the Misty of `key`; blocks for up to `timeout` seconds, so the caller must not hold `lock`."""
+        with self.lock:
+            url = self.robots[key].event_handler.url
+        ws = websocket.create_connection(url, timeout=self.timeout)
+        ws.settimeout(RECEIVE_TIMEOUT)
+        return ws
+
+    def _register(self, key: str, ws: websocket.WebSocket) -> None:
+        """Registers the new connection of `key` with the selector and sends all subscriptions of the Misty over it.
+
+        Raises:
+            websocket.WebSocketException or OSError: If a subscription could not be sent, in which case the connection is closed.
+        """
+        with self.lock:
+            self.connecting.discard(key)
+            try:
+                for name, sub_key in list(self.subscriptions.items()):
+                    if sub_key == key:
+                        ws.send(self.messages[name])
+            except (websocket.WebSocketException, OSError):
+                ws.close()
+                raise
+            self.connections[key] = ws
+            self.selector.register(ws.sock, selectors.EVENT_READ, key)
+
+    def _reconnect_due(self) -> None:
+        """Hands the lost connections whose reconnection delay has passed over to the connecting threads (see `_restore`)."""
+        now = time.monotonic()
+        with self.lock:
+            due = [key for key, (at, _) in self.reconnects.items() if at <= now]
+            for key in due:
+                _, delay = self.reconnects.pop(key)
+                self.connecting.add(key)
+                self._connector.submit(self._restore, key, delay)
+
+    def _restore(self, key: str, delay: float) -> None:
+        """Restores the lost connection of `key` and renews its subscriptions; a failed attempt is retried after twice the `delay` of this attempt."""
+        try:
+            ws = self._open(key)
+            if not self._running.is_set():
+                ws.close()
+                with self.lock:
+                    self.connecting.discard(key)
+                return
+            self._register(key, ws)
+            with self.lock:
+                self.reconnections += 1
+        except (websocket.WebSocketException, OSError) as e:
+            self.errors.append((key, e))
+            delay = min(delay * 2, MAX_RECONNECT_DELAY)
+            with self.lock:
+                self.connecting.discard(key)
+                if self._running.is_set():
+                    self.reconnects[key] = (time.monotonic() + delay, delay)
+
+    def _receive(self, key: str) -> None:
+        """Receives a message from the connection of `key` and passes it to the callback if it is an event; a failed or closed connection is scheduled for reconnection."""
+        with self.lock:
+            ws = self.connections.get(key)
+        if ws is None:
+            return
+        try:
+            raw = ws.recv()
+        except websocket.WebSocketTimeoutException:
+            # the rest of a partially received frame is read once it arrives
+            return
+        except (websocket.WebSocketException, OSError) as e:
+            self.errors.append((key, e))
+            self._disconnect(key, reconnect=True)
+            return
+        if not ws.connected:
+            self._disconnect(key, reconnect=True)
+            return
+        if not raw:
+            return
+        try:
+            message = json.loads(raw)
+        except ValueError:
+            return
+        if isinstance(message, dict) and "eventName" in message:
+            self.callback(key, message["eventName"], message.get("message"))
+
+    def _disconnect(self, key: str, reconnect: bool = False) -> None:
+        """Closes the connection of `key`.
+
+        Args:
+            key (str): The key of the Misty.
+            reconnect (bool, optional): Whether to keep the subscriptions of the connection and restore it after `RECONNECT_DELAY` seconds (`True`) or to drop them (`False`). Defaults to `False`.
+        """
+        with self.lock:
+            ws = self.connections.pop(key, None)
+            if ws is None:
+                return
+            # the socket is looked up by the key, as `ws.sock` is `None` once Misty closed the connection
+            for selector_key in list(self.selector.get_map().values()):
+                if selector_key.data == key:
+                    self.selector.unregister(selector_key.fileobj)
+            if reconnect:
+                self.reconnects[key] = (
+                    time.monotonic() + RECONNECT_DELAY,
+                    RECONNECT_DELAY,
+                )
+            else:
+                for name in [n for n, k in self.subscriptions.items() if k == key]:
+                    self.subscriptions.pop(name)
+                    self.messages.pop(name, None)
+        ws.close()
+
+    def stop(self) -> None:
+        """Unsubscribes from all events, closes the connections and stops the receiving thread."""
+        for name in list(self.subscriptions):
+            self.unsubscribe(name)
+        self._running.clear()
+        if self._thread is not None:
+            self._thread.join()
+        with self.lock:
+            self.reconnects.clear()
+        for key in list(self.connections):
+            self._disconnect(key)
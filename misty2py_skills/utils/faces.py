@@ -0,0 +1,273 @@
+"""This module contains the parts of the face recognition skill shared by `misty2py_skills.face_recognition` and `misty2py_skills.aio.face_recognition`: the settings, the client-side filtering of recognitions, the greeting cooldowns, the states of the skill and the handling of the face training and of the user inputs. It does not connect to Misty.
+"""
+import heapq
+import threading
+import time
+from enum import Enum
+from typing import Dict, Iterable, Optional
+
+from misty2py.utils.generators import get_random_string
+
+UPDATE_TIME = 1
+"""The minimum amount of time (in seconds) that must pass between Misty greets the same person again."""
+UNKNOWN_LABEL = "unknown person"
+"""The label used by Misty's REST API for an unknown face."""
+TESTING_NAME = "chris"
+"""The name of the person testing this module. For convenience, the faces commencing with this name are forgotten in at beginning of the skill so they can be learnt again."""
+TRAINING_TIMEOUT = 30
+"""The maximum duration of a face training session in seconds; a longer session is cancelled."""
+TRAINING_COMPLETE_MESSAGE = "Face training embedding phase complete."
+"""The message of the FaceTraining event which marks a finished training."""
+TRAINING_FAILURE_MESSAGES = frozenset(
+    ["Face training failed.", "Face training cancelled.", "Face training timed out."]
+)
+"""The messages of the FaceTraining event which mark a training that ended without learning the face."""
+RECOGNITION_DEBOUNCE = 250
+"""The minimal interval between two face recognition events sent by Misty in ms."""
+RECOGNITION_RETURN_PROPERTY = None
+"""The only property of the face recognition events to receive (e.g. `"label"`), or `None` to receive all of them."""
+RECOGNITION_CONDITIONS = []
+"""The conditions (see `misty2py_skills.utils.events.event_condition`) that a face recognition event must satisfy to be sent by Misty."""
+MIN_CONFIDENCE = 0.0
+"""The minimal confidence of a face recognition event for it to be handled; events without a confidence are not filtered."""
+MIN_PERSISTENCE = 1
+"""The number of successive recognitions of the same label (at most `UPDATE_TIME` seconds apart) required before the recognition is handled."""
+MEASURE_RECOGNITIONS = False
+"""Whether to report the rates of face recognition events received, accepted by the filter and acted on."""
+TRAINING_PROMPT = (
+    "Hello! I do not know you yet, do you want to begin the face training session?"
+)
+"""What Misty says to an unknown person."""
+NAME_PROMPT = (
+    "<p>How should I call you?</p><p>Please enter your name in the terminal.</p>"
+)
+"""What Misty says to a person who agreed to the face training."""
+TRAINING_START = "The training has commenced, please do not look away now."
+"""What Misty says when the face training starts."""
+TRAINING_REPLIES = {
+    "complete": "Thank you, the training is complete now.",
+    "timeout": "I am sorry, the training took too long.",
+    "failed": "I am sorry, the training failed.",
+}
+"""What Misty says at the end of a face training by its outcome; a cancelled training ends without a reply."""
+
+
+class GreetingCooldowns:
+    """Remembers for every label until when Misty should not greet it again.
+
+    Each label has its own cooldown window of `duration` seconds which is renewed by every recognition of the label, so a person who stays in front of Misty is greeted only once no matter how many other people are recognised meanwhile. The expiry times are kept in a heap so that expired labels are forgotten in logarithmic time without scanning the whole table.
+    """
+
+    def __init__(self, duration: float) -> None:
+        """Initialises an empty cooldown table.
+
+        Args:
+            duration (float): The length of a cooldown window in seconds.
+        """
+        self.duration = duration
+        self._expiries = {}
+        self._heap = []
+        self.lock = threading.Lock()
+
+    def _expire(self, now: float) -> None:
+        """Forgets the labels whose cooldowns expired by `now`; heap entries superseded by a renewal are discarded on the way."""
+        while self._heap and self._heap[0][0] <= now:
+            expiry, label = heapq.heappop(self._heap)
+            if self._expiries.get(label) == expiry:
+                del self._expiries[label]
+
+    def check_and_renew(self, label: str, det_time: Optional[float] = None) -> bool:
+        """Renews the cooldown of `label` and tells whether it had already expired.
+
+        Args:
+            label (str): The label of the recognised face.
+            det_time (Optional[float], optional): The time of the recognition; the current time if None. Defaults to None.
+
+        Returns:
+            bool: True if the label was not cooling down (i.e. the person should be greeted), False otherwise.
+        """
+        if det_time is None:
+            det_time = time.time()
+        with self.lock:
+            self._expire(det_time)
+            ready = label not in self._expiries
+            expiry = det_time + self.duration
+            self._expiries[label] = expiry
+            heapq.heappush(self._heap, (expiry, label))
+            if len(self._heap) > 2 * len(self._expiries) + 16:
+                self._heap = [(e, l) for l, e in self._expiries.items()]
+                heapq.heapify(self._heap)
+            return ready
+
+    def clear(self) -> None:
+        """Forgets all cooldowns."""
+        with self.lock:
+            self._expiries.clear()
+            self._heap.clear()
+
+    def __len__(self) -> int:
+        """Returns the number of labels currently cooling down."""
+        with self.lock:
+            self._expire(time.time())
+            return len(self._expiries)
+
+
+class RecognitionFilter:
+    """Filters face recognition events on the client side by their confidence and by the persistence of their label.
+
+    A label passes once it has been recognised `min_persistence` times in a row with no more than `max_gap` seconds between two recognitions, which suppresses labels that only flicker into the recognition results for a frame or two.
+    """
+
+    def __init__(
+        self, min_confidence: float, min_persistence: int, max_gap: float
+    ) -> None:
+        """Initialises the filter.
+
+        Args:
+            min_confidence (float): The minimal confidence of an accepted recognition.
+            min_persistence (int): The number of successive recognitions of a label required for it to be accepted.
+            max_gap (float): The maximal time in seconds between two successive recognitions of a label.
+        """
+        self.min_confidence = min_confidence
+        self.min_persistence = min_persistence
+        self.max_gap = max_gap
+        self._streaks = {}
+        self.lock = threading.Lock()
+
+    def accept(self, label: str, confidence: Optional[float], det_time: float) -> bool:
+        """Records a recognition and tells whether it passes the filter.
+
+        Args:
+            label (str): The recognised label.
+            confidence (Optional[float]): The confidence of the recognition or `None` if unknown.
+            det_time (float): The time of the recognition.
+
+        Returns:
+            bool: Whether the recognition should be handled.
+        """
+        if confidence is not None and confidence < self.min_confidence:
+            return False
+        if self.min_persistence <= 1:
+            return True
+        with self.lock:
+            count, last = self._streaks.get(label, (0, det_time))
+            count = count + 1 if det_time - last <= self.max_gap else 1
+            self._streaks[label] = (count, det_time)
+            if len(self._streaks) > 64:
+                self._streaks = {
+                    l: streak
+                    for l, streak in self._streaks.items()
+                    if det_time - streak[1] <= self.max_gap
+                }
+        return count >= self.min_persistence
+
+    def clear(self) -> None:
+        """Forgets the recorded recognitions."""
+        with self.lock:
+            self._streaks.clear()
+
+
+class UserResponses:
+    """Represents responses that a user can give to different prompts used in this skill."""
+
+    YES = frozenset(["yes", "y"])
+    NO = frozenset(["no", "n"])
+    STOP = frozenset(["stop", "s", "terminate"])
+
+
+class StatusLabels(Enum):
+    """Represents states in which the skill can be."""
+
+    MAIN = "running_main"
+    """The main state of waiting for a face recognition event."""
+    PROMPT = "running_train_prompt"
+    """The state of running the training prompt and waiting for the user's response."""
+    TRAIN = "running_training"
+    """The face training state."""
+    INIT = "running_training_initialisation"
+    """The state of the initialisation of face training."""
+    GREET = "running_greeting"
+    """The state of greeting a person."""
+    TALK = "talking"
+    """The state of talking."""
+
+
+class InputActions(Enum):
+    """Represents the reactions of the skill to a user input, see `input_action`."""
+
+    INITIALISE = "initialise"
+    """Ask for the name of the person to train."""
+    TRAIN = "train"
+    """Train the face of the person under the input name."""
+    ABANDON = "abandon"
+    """Return to the main state without training."""
+    CANCEL_TRAINING = "cancel_training"
+    """Cancel the running face training."""
+    STOP_SPEAKING = "stop_speaking"
+    """Stop Misty's speech and return to the main state."""
+    DECLINE = "decline"
+    """Return to the main state after the training was not agreed to."""
+
+
+def input_action(current: StatusLabels, user_input: str) -> Optional[InputActions]:
+    """Decides how the skill reacts to a user input.
+
+    Args:
+        current (StatusLabels): The current state of the skill.
+        user_input (str): The lowercase user input.
+
+    Returns:
+        Optional[InputActions]: The reaction or `None` if the input is ignored.
+    """
+    if user_input in UserResponses.YES and current == StatusLabels.PROMPT:
+        return InputActions.INITIALISE
+    if current == StatusLabels.INIT and user_input not in UserResponses.STOP:
+        return InputActions.TRAIN
+    if current == StatusLabels.INIT:
+        return InputActions.ABANDON
+    if current == StatusLabels.TRAIN and user_input in UserResponses.STOP:
+        return InputActions.CANCEL_TRAINING
+    if current == StatusLabels.TALK and user_input in UserResponses.STOP:
+        return InputActions.STOP_SPEAKING
+    if current == StatusLabels.PROMPT:
+        return InputActions.DECLINE
+    return None
+
+
+def user_from_face_id(face_id: str) -> str:
+    """Returns the name from a face ID."""
+    return face_id.split("_")[0].capitalize()
+
+
+def unique_face_id(name: str, known_faces: Iterable[str]) -> str:
+    """Returns the face ID to train the face of `name` under: `name` if no known face has it, else `name` with a random suffix that makes it unique, or a random ID if `name` is empty. Prints the replacement if `name` is not used."""
+    known_faces = frozenset(known_faces)
+    new_name = name
+    while new_name in known_faces:
+        new_name = name + "_" + get_random_string(3)
+    if new_name != name:
+        print(f"The name {name} is already in use, using {new_name} instead.")
+    if new_name == "":
+        new_name = get_random_string(6)
+        print(f"The name {name} is invalid, using {new_name} instead.")
+    return new_name
+
+
+def training_outcome(data: Dict, face_id: str) -> Optional[str]:
+    """Tells whether a FaceTraining event message ends the training of `face_id`.
+
+    Args:
+        data (Dict): The message of the FaceTraining event.
+        face_id (str): The ID under which the face is learnt.
+
+    Returns:
+        Optional[str]: `"complete"` if the message is `TRAINING_COMPLETE_MESSAGE`, `"failed"` if it is one of `TRAINING_FAILURE_MESSAGES` and `None` if the training goes on.
+    """
+    message = data.get("message", "")
+    if data.get("faceId", face_id) != face_id:
+        return None
+    if message == TRAINING_COMPLETE_MESSAGE:
+        return "complete"
+    if message in TRAINING_FAILURE_MESSAGES:
+        return "failed"
+    return None
@@ -0,0 +1,189 @@
+"""This module implements multiplexing of line-based user inputs from the console, local socket connections and other threads, so that skills controlled by typed commands can also be driven remotely or programmatically.
+"""
+import collections
+import os
+import selectors
+import socket
+import sys
+import threading
+import time
+from typing import Optional, Tuple
+
+
+class InputMultiplexer:
+    """Reads lines of user input from several sources through a single selector.
+
+    The sources are:
+
+    - the standard input (optional),
+    - connections to a local listening socket (optional), each sending lines terminated by a newline,
+    - the method `put`, which can be called from any thread.
+
+    The lines are returned by `read_line` in the order in which they became available. If the standard input cannot be selected on (e.g. on Windows or when it is replaced by a file-like object), it is read by a background thread instead. Once the standard input ends (EOF) and there is no listening socket, `read_line` returns `None` as there are no more lines to wait for.
+    """
+
+    def __init__(
+        self, stdin: bool = True, address: Optional[Tuple[str, int]] = None
+    ) -> None:
+        """Initialises the multiplexer and opens its sources.
+
+        Args:
+            stdin (bool, optional): Whether to read the standard input. Defaults to `True`.
+            address (Optional[Tuple[str, int]], optional): The address on which to accept connections sending user inputs, e.g. `("127.0.0.1", 0)` for a free local port, or `None` for no socket. Defaults to `None`.
+        """
+        self.selector = selectors.DefaultSelector()
+        self.lines = collections.deque()
+        self.lock = threading.Lock()
+        self.closed = False
+        self.stdin_ended = False
+        self._stdin_fd = None
+        self._buffers = {}
+
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self.selector.register(self._wake_r, selectors.EVENT_READ, self._read_wake)
+
+        self.server = None
+        if address is not None:
+            self.server = socket.create_server(address)
+            self.server.setblocking(False)
+            self.selector.register(self.server, selectors.EVENT_READ, self._accept)
+
+        if stdin:
+            self._open_stdin()
+
+    @property
+    def address(self) -> Optional[Tuple[str, int]]:
+        """The address of the listening socket or `None` if there is none."""
+        if self.server is None:
+            return None
+        return self.server.getsockname()[:2]
+
+    def _open_stdin(self) -> None:
+        """Registers the standard input with the selector or, if it cannot be selected on, starts a thread reading it."""
+        try:
+            if sys.platform == "win32":
+                raise OSError("The standard input cannot be selected on Windows.")
+            fd = sys.stdin.fileno()
+            self.selector.register(fd, selectors.EVENT_READ, self._read_stdin)
+            self._buffers[fd] = b""
+            self._stdin_fd = fd
+        except (AttributeError, OSError, ValueError):
+            threading.Thread(target=self._stdin_worker, daemon=True).start()
+
+    def _stdin_worker(self) -> None:
+        """Reads the standard input line by line on a background thread until it ends or the multiplexer is closed."""
+        while not self.closed:
+            try:
+                line = input()
+            except (EOFError, OSError):
+                self.stdin_ended = True
+                self._wake()
+                return
+            self.put(line)
+
+    def _read_stdin(self, fd: int) -> None:
+        """Reads the data available on the standard input directly from its descriptor, since lines buffered by `sys.stdin` would not be reported by the selector."""
+        self._read_chunk(fd, os.read(fd, 4096))
+
+    def _read_wake(self, sock: socket.socket) -> None:
+        """Drains the wake-up socket, which only serves to interrupt a waiting `read_line`."""
+        try:
+            while sock.recv(4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    def _accept(self, server: socket.socket) -> None:
+        """Accepts a connection to the listening socket and registers it as a source of lines."""
+        conn, _ = server.accept()
+        conn.setblocking(False)
+        self._buffers[conn] = b""
+        self.selector.register(conn, selectors.EVENT_READ, self._read_connection)
+
+    def _read_connection(self, conn: socket.socket) -> None:
+        """Reads the data available on a connection; a closed or failed connection ends it."""
+        try:
+            data = conn.recv(4096)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            data = b""
+        self._read_chunk(conn, data)
+
+    def _read_chunk(self, source, data: bytes) -> None:
+        """Splits the data read from a source into lines, keeping an incomplete last line in the buffer of the source; empty data ends the source and flushes its buffer."""
+        if not data:
+            rest = self._buffers.pop(source, b"")
+            if rest:
+                self._append(rest.decode("utf-8", "replace").rstrip("\r"))
+            self.selector.unregister(source)
+            if isinstance(source, socket.socket):
+                source.close()
+            elif source == self._stdin_fd:
+                self.stdin_ended = True
+            return
+        *lines, self._buffers[source] = (self._buffers[source] + data).split(b"\n")
+        for line in lines:
+            self._append(line.decode("utf-8", "replace").rstrip("\r"))
+
+    def _append(self, line: str) -> None:
+        """Queues a line for `read_line`."""
+        with self.lock:
+            self.lines.append(line)
+
+    def _wake(self) -> None:
+        """Interrupts a `read_line` waiting in the selector."""
+        try:
+            self._wake_w.send(b"\0")
+        except OSError:
+            pass
+
+    def put(self, line: str) -> None:
+        """Queues a line of user input; safe to call from any thread."""
+        self._append(line)
+        self._wake()
+
+    def read_line(self, timeout: Optional[float] = None) -> Optional[str]:
+        """Returns the next line of user input.
+
+        Args:
+            timeout (Optional[float], optional): The maximum time to wait for a line in seconds or `None` to wait indefinitely. Defaults to `None`.
+
+        Returns:
+            Optional[str]: The line without the trailing newline or `None` if no line arrived in time, the standard input ended and there is no listening socket or the multiplexer is closed.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.closed:
+            with self.lock:
+                if self.lines:
+                    return self.lines.popleft()
+            if self.stdin_ended and self.server is None:
+                return None
+            remaining = None
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+            for key, _ in self.selector.select(remaining):
+                key.data(key.fileobj)
+        return None
+
+    def close(self) -> None:
+        """Closes all sources except for the standard input."""
+        if self.closed:
+            return
+        self.closed = True
+        for key in list(self.selector.get_map().values()):
+            if isinstance(key.fileobj, socket.socket):
+                key.fileobj.close()
+        self.selector.close()
+        self._wake_w.close()
+
+    def __enter__(self) -> "InputMultiplexer":
+        """Returns the multiplexer itself."""
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """Closes the multiplexer."""
+        self.close()
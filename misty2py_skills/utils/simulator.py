@@ -0,0 +1,783 @@
+"""This module implements an in-process simulator of the parts of Misty's REST API and WebSocket API used by the skills of this package, so that the skills can run headless (e.g. in tests or benchmarks) without a robot.
+
+A minimal example of running a skill against the simulator:
+
+```python
+from misty2py_skills.utils.simulator import MistySimulator
+
+with MistySimulator(latency=0.01) as sim:
+    misty = sim.get_misty()
+    sim.schedule(0.5, "BatteryCharge", sim.battery)
+    print(misty.get_info("battery_status").parse_to_dict())
+    print(sim.requests_to("api/battery"))
+```
+
+The simulator keeps the state the skills interact with (audio service, volume, known faces, audio files, utterances spoken, drive commands, ...), answers REST requests in the format of Misty's REST API and pushes events to WebSocket subscribers in the format of Misty's WebSocket API. Events are pushed either from a scripted timeline (`schedule`, `timeline`), as reactions to requests (`on_request`) or periodically for the event types in `periodic_events`.
+"""
+import base64
+import io
+import json
+import threading
+import time
+import wave
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+from urllib.parse import parse_qs, urlparse
+
+import speech_recognition as sr
+from misty2py.robot import Misty
+
+from misty2py_skills.essentials.speech_transcripter import (
+    TranscriptionBackend,
+    extract_entities,
+)
+from misty2py_skills.utils.websocket import (
+    OPCODE_CLOSE,
+    OPCODE_PING,
+    OPCODE_PONG,
+    OPCODE_TEXT,
+    MessageAssembler,
+    accept_key,
+    encode_frame,
+    read_frame,
+)
+
+WS_PATH = "/pubsub"
+"""The path of the simulated WebSocket API."""
+SPEECH_SAMPLE_RATE = 16000
+"""The sample rate of the simulated speech recordings."""
+FACE_TRAINING_MESSAGES = [
+    "Face training started.",
+    "Face training collection phase complete.",
+    "Face training embedding phase complete.",
+]
+"""The messages of the FaceTraining event sent during a simulated face training, in order."""
+CONTINUOUS_EVENTS = frozenset(
+    ["BatteryCharge", "FaceRecognition", "FaceDetection", "IMU", "TimeOfFlight"]
+)
+"""The event types whose messages are throttled by the debounce interval of a subscription; messages of other event types (e.g. VoiceRecord) are always sent."""
+
+
+def text_to_wav(text: str) -> bytes:
+    """Encodes a text as the frames of a .wav file; `SimulatedSpeechBackend` decodes it back, which allows to script what a person says to the simulated Misty."""
+    frames = text.encode("utf-8")
+    if len(frames) % 2 == 1:
+        frames += b"\x00"
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SPEECH_SAMPLE_RATE)
+        f.writeframes(frames)
+    return buffer.getvalue()
+
+
+class SimulatedSpeechBackend(TranscriptionBackend):
+    """Transcribes the speech recorded by the simulator by decoding the text encoded in it by `text_to_wav`. The full response contains the entities obtained via `extract_entities`."""
+
+    name = "simulated"
+
+    def transcribe(self, audio: sr.AudioData, show_all: bool = False) -> Any:
+        """Transcribes an audio created by `text_to_wav`. See `TranscriptionBackend.transcribe`."""
+        text = audio.frame_data.rstrip(b"\x00").decode("utf-8", errors="ignore")
+        if len(text) == 0:
+            raise sr.UnknownValueError()
+        if not show_all:
+            return text
+        return {"text": text, "entities": extract_entities(text)}
+
+
+class SimulatedRequest:
+    """Represents a request received by the simulator.
+
+    Attributes:
+        method (str): The HTTP method in upper case.
+        path (str): The endpoint without the leading slash, e.g. `"api/drive"`.
+        params (Dict): The query parameters, one value per parameter.
+        body (Any): The JSON body or `None` if the request has none.
+        time (float): The time of receipt as returned by `time.perf_counter`.
+    """
+
+    def __init__(self, method: str, path: str, params: Dict, body: Any) -> None:
+        """Initialises the request."""
+        self.method = method
+        self.path = path
+        self.params = params
+        self.body = body
+        self.time = time.perf_counter()
+
+    def arg(self, name: str, default: Any = None) -> Any:
+        """Returns the value of an argument from the JSON body or the query parameters."""
+        if isinstance(self.body, dict) and name in self.body:
+            return self.body[name]
+        return self.params.get(name, default)
+
+    def __repr__(self) -> str:
+        """Returns a concise representation of the request."""
+        return "%s /%s %s" % (self.method, self.path, self.body or self.params or "")
+
+
+class WebSocketConnection:
+    """Represents a connection to the simulated WebSocket API; implements the server side of the subset of RFC 6455 needed by the WebSocket clients of the skills."""
+
+    def __init__(self, rfile: io.BufferedIOBase, wfile: io.BufferedIOBase) -> None:
+        """Initialises the connection over the streams of an upgraded HTTP connection."""
+        self.rfile = rfile
+        self.wfile = wfile
+        self.lock = threading.Lock()
+        self.closed = False
+        self.assembler = MessageAssembler()
+
+    def _read_exactly(self, n: int) -> bytes:
+        """Reads exactly `n` bytes, raising `ConnectionError` if the connection is closed."""
+        data = self.rfile.read(n)
+        if data is None or len(data) < n:
+            raise ConnectionError("WebSocket connection closed.")
+        return data
+
+    def receive(self) -> Tuple[int, bytes]:
+        """Receives a message or a control frame and returns its opcode and its unmasked payload; fragmented messages are reassembled."""
+        while True:
+            message = self.assembler.add(read_frame(self._read_exactly))
+            if message is not None:
+                return message
+
+    def send(self, payload: Union[str, bytes], opcode: int = OPCODE_TEXT) -> bool:
+        """Sends a single unmasked frame.
+
+        Returns:
+            bool: `True` if the frame was sent, `False` if the connection is closed.
+        """
+        frame = encode_frame(payload, opcode)
+        with self.lock:
+            if self.closed:
+                return False
+            try:
+                self.wfile.write(frame)
+                self.wfile.flush()
+                return True
+            except (OSError, ValueError):
+                self.closed = True
+                return False
+
+    def close(self) -> None:
+        """Sends the closing frame and marks the connection as closed."""
+        self.send(b"", opcode=OPCODE_CLOSE)
+        with self.lock:
+            self.closed = True
+
+
+class Subscription:
+    """Represents an event subscription of a WebSocket client.
+
+    Attributes:
+        connection (WebSocketConnection): The connection of the subscriber.
+        event_type (str): The subscribed event type.
+        event_name (str): The name of the subscription chosen by the subscriber.
+        debounce (float): The minimal interval between two messages of a continuous event type (see `CONTINUOUS_EVENTS`) in seconds.
+        return_property (Optional[str]): The only property of the messages to send or `None` to send all properties.
+        conditions (List[Dict]): The event conditions; a message is only sent if it satisfies all of them.
+    """
+
+    def __init__(self, connection: WebSocketConnection, request: Dict) -> None:
+        """Initialises a subscription from the subscription message of the client."""
+        self.connection = connection
+        self.event_type = request.get("Type")
+        self.event_name = request.get("EventName")
+        self.debounce = (request.get("DebounceMs") or 0) / 1000
+        self.return_property = request.get("ReturnProperty")
+        self.conditions = request.get("EventConditions") or []
+        self.last_sent = 0.0
+        self.active = True
+
+    def matches(self, message: Dict) -> bool:
+        """Checks whether a message satisfies the event conditions of this subscription."""
+        for condition in self.conditions:
+            value = message.get(condition.get("Property"))
+            expected = condition.get("Value")
+            inequality = condition.get("Inequality", "=")
+            try:
+                if inequality in ("=", "==") and not value == expected:
+                    return False
+                if inequality == "!=" and not value != expected:
+                    return False
+                if inequality == ">" and not value > expected:
+                    return False
+                if inequality == ">=" and not value >= expected:
+                    return False
+                if inequality == "<" and not value < expected:
+                    return False
+                if inequality == "<=" and not value <= expected:
+                    return False
+            except TypeError:
+                return False
+        return True
+
+    def deliver(self, message: Any, ignore_debounce: bool = False) -> bool:
+        """Sends a message to the subscriber if it passes the debounce interval and the event conditions.
+
+        Returns:
+            bool: `True` if the message was sent.
+        """
+        if not self.active:
+            return False
+        if isinstance(message, dict):
+            if not self.matches(message):
+                return False
+            if self.return_property:
+                message = message.get(self.return_property)
+        now = time.perf_counter()
+        throttled = self.event_type in CONTINUOUS_EVENTS and not ignore_debounce
+        if throttled and now - self.last_sent < self.debounce:
+            return False
+        self.last_sent = now
+        sent = self.connection.send(
+            json.dumps({"eventName": self.event_name, "message": message})
+        )
+        if not sent:
+            self.active = False
+        return sent
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Handles the HTTP requests and WebSocket connections of a `MistySimulator`."""
+
+    protocol_version = "HTTP/1.1"
+    # the headers and the body are written separately, which would otherwise stall persistent connections on delayed ACKs
+    disable_nagle_algorithm = True
+    simulator = None
+
+    def log_message(self, format: str, *args) -> None:
+        """Silences the default logging to stderr."""
+        pass
+
+    def _handle(self, method: str) -> None:
+        """Handles a REST request."""
+        url = urlparse(self.path)
+        if method == "GET" and url.path == WS_PATH:
+            self._handle_websocket()
+            return
+
+        length = int(self.headers.get("Content-Length") or 0)
+        raw_body = self.rfile.read(length) if length > 0 else b""
+        try:
+            body = json.loads(raw_body) if raw_body else None
+        except ValueError:
+            body = None
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        request = SimulatedRequest(method, url.path.strip("/"), params, body)
+
+        code, response = self.simulator.handle_request(request)
+        content = json.dumps(response).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def _handle_websocket(self) -> None:
+        """Upgrades the connection to a WebSocket connection and serves it until it is closed."""
+        key = self.headers.get("Sec-WebSocket-Key", "")
+        accept = accept_key(key)
+        self.send_response(101, "Switching Protocols")
+        self.send_header("Upgrade", "websocket")
+        self.send_header("Connection", "Upgrade")
+        self.send_header("Sec-WebSocket-Accept", accept)
+        self.end_headers()
+        self.wfile.flush()
+
+        connection = WebSocketConnection(self.rfile, self.wfile)
+        self.simulator.serve_websocket(connection)
+        self.close_connection = True
+
+    def do_GET(self) -> None:
+        """Handles a GET request."""
+        self._handle("GET")
+
+    def do_POST(self) -> None:
+        """Handles a POST request."""
+        self._handle("POST")
+
+    def do_DELETE(self) -> None:
+        """Handles a DELETE request."""
+        self._handle("DELETE")
+
+    def do_PUT(self) -> None:
+        """Handles a PUT request."""
+        self._handle("PUT")
+
+    def do_PATCH(self) -> None:
+        """Handles a PATCH request."""
+        self._handle("PATCH")
+
+
+class MistySimulator:
+    """Simulates a Misty II robot's REST API and WebSocket API on a local port.
+
+    Attributes:
+        latency (float): The time (in seconds) the simulator waits before answering any REST request.
+        ws_latency (float): The time (in seconds) the simulator waits before pushing any event message.
+        capture_delay (float): The time (in seconds) between a speech capture request and the VoiceRecord event.
+        tts_delay (float): The time (in seconds) between a speaking request and the TextToSpeechComplete event.
+        training_delay (float): The time (in seconds) between two FaceTraining messages.
+        requests (List[SimulatedRequest]): All REST requests received.
+        utterances (List[str]): The texts Misty was requested to speak.
+        drives (List[Dict]): The bodies of the driving requests (`"api/drive"`, `"api/drive/time"` and `"api/drive/stop"`), each with the key `"_endpoint"`.
+        speech_queue (List[str]): The texts the simulated person says in response to the following speech captures, in order; see `say`.
+        faces (set): The names of the faces Misty knows.
+        audio_files (Dict[str, bytes]): The audio files on Misty's server.
+        audio_enabled (bool): Whether the audio service is enabled.
+        slam_enabled (bool): Whether the SLAM service is enabled.
+        volume (int): The volume.
+        battery (Dict): The message of the BatteryCharge event and the result of the battery status request.
+        periodic_events (Dict[str, Callable[[], Any]]): The event types sent periodically (every debounce interval) to their subscribers mapped to the functions returning the messages.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        ws_latency: float = 0.0,
+        capture_delay: float = 0.05,
+        tts_delay: float = 0.05,
+        training_delay: float = 0.05,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ) -> None:
+        """Initialises the simulator; the server starts with `start` or when used as a context manager.
+
+        Args:
+            latency (float, optional): The time (in seconds) the simulator waits before answering any REST request. Defaults to `0.0`.
+            ws_latency (float, optional): The time (in seconds) the simulator waits before pushing any event message. Defaults to `0.0`.
+            capture_delay (float, optional): The time (in seconds) between a speech capture request and the VoiceRecord event. Defaults to `0.05`.
+            tts_delay (float, optional): The time (in seconds) between a speaking request and the TextToSpeechComplete event. Defaults to `0.05`.
+            training_delay (float, optional): The time (in seconds) between two FaceTraining messages. Defaults to `0.05`.
+            host (str, optional): The host to listen on. Defaults to `"127.0.0.1"`.
+            port (int, optional): The port to listen on, `0` for any free port. Defaults to `0`.
+        """
+        self.latency = latency
+        self.ws_latency = ws_latency
+        self.capture_delay = capture_delay
+        self.tts_delay = tts_delay
+        self.training_delay = training_delay
+        self.host = host
+        self.port = port
+
+        self.lock = threading.RLock()
+        self.requests = []
+        self.utterances = []
+        self.drives = []
+        self.speech_queue = []
+        self.faces = set()
+        self.training_timers = []
+        self.audio_files = {}
+        self.audio_enabled = False
+        self.slam_enabled = True
+        self.volume = 50
+        self.battery = {
+            "chargePercent": 0.8,
+            "created": "2021-06-27T12:00:00.0000000Z",
+            "current": -0.5,
+            "healthPercent": 0.9,
+            "isCharging": False,
+            "sensorId": "charge",
+            "state": "Discharging",
+            "temperature": 30,
+            "trained": False,
+            "voltage": 7.8,
+        }
+        self.periodic_events = {"BatteryCharge": lambda: dict(self.battery)}
+
+        self.subscriptions = {}
+        self.connections = []
+        self.timers = []
+        self.request_hooks = []
+        self.routes = {}
+        self._register_default_routes()
+
+        self.server = None
+        self.server_thread = None
+        self.running = threading.Event()
+
+    # lifecycle
+
+    def start(self) -> "MistySimulator":
+        """Starts the server in a background thread."""
+        handler = type("Handler", (_Handler,), {"simulator": self})
+        self.server = ThreadingHTTPServer((self.host, self.port), handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self.running.set()
+        self.server_thread = threading.Thread(
+            target=self.server.serve_forever, daemon=True
+        )
+        self.server_thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stops the server, the scheduled events and closes all WebSocket connections."""
+        self.running.clear()
+        with self.lock:
+            timers = list(self.timers)
+            connections = list(self.connections)
+            self.timers = []
+        for timer in timers:
+            timer.cancel()
+        for connection in connections:
+            connection.close()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+        if self.server_thread is not None:
+            self.server_thread.join()
+            self.server_thread = None
+
+    def __enter__(self) -> "MistySimulator":
+        """Starts the server."""
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        """Stops the server."""
+        self.stop()
+
+    @property
+    def address(self) -> str:
+        """The address of the simulator in the form `host:port`, usable in place of Misty's IP address."""
+        return "%s:%d" % (self.host, self.port)
+
+    def get_misty(self, **kwargs) -> Misty:
+        """Returns a `Misty` connected to this simulator; keyword arguments are passed to `Misty`."""
+        return Misty(self.address, **kwargs)
+
+    # scripting
+
+    def route(
+        self, method: str, path: str, handler: Callable[[SimulatedRequest], Any]
+    ) -> None:
+        """Sets the handler of an endpoint, replacing the default one.
+
+        Args:
+            method (str): The HTTP method.
+            path (str): The endpoint without the leading slash, e.g. `"api/drive"`.
+            handler (Callable[[SimulatedRequest], Any]): Returns the response for a request: the value of `"result"` of a successful response or a tuple of the HTTP status code and the full response body.
+        """
+        self.routes[(method.upper(), path.strip("/"))] = handler
+
+    def on_request(
+        self,
+        method: str,
+        path: str,
+        callback: Callable[[SimulatedRequest], None],
+    ) -> None:
+        """Calls `callback` (after the response is prepared) whenever a request is made to the endpoint, e.g. to push events in reaction to the request."""
+        with self.lock:
+            self.request_hooks.append((method.upper(), path.strip("/"), callback))
+
+    def say(self, *texts: str) -> None:
+        """Queues what the simulated person says in response to the following speech captures."""
+        with self.lock:
+            self.speech_queue.extend(texts)
+
+    def emit(self, event_type: str, message: Any) -> int:
+        """Pushes an event message to the subscribers of `event_type`.
+
+        Args:
+            event_type (str): The event type, e.g. `"FaceRecognition"`.
+            message (Any): The message or a function returning the message.
+
+        Returns:
+            int: The number of subscribers the message was sent to.
+        """
+        if callable(message):
+            message = message()
+        if self.ws_latency > 0:
+            time.sleep(self.ws_latency)
+        with self.lock:
+            subscriptions = [
+                s for s in self.subscriptions.values() if s.event_type == event_type
+            ]
+        return sum(1 for s in subscriptions if s.deliver(message))
+
+    def later(self, delay: float, function: Callable, *args) -> threading.Timer:
+        """Calls `function` with `args` after `delay` seconds unless the simulator stops first."""
+        timer = threading.Timer(delay, function, args=args)
+        timer.daemon = True
+        with self.lock:
+            self.timers = [t for t in self.timers if t.is_alive()]
+            self.timers.append(timer)
+        timer.start()
+        return timer
+
+    def schedule(self, delay: float, event_type: str, message: Any) -> threading.Timer:
+        """Pushes an event message (or the result of a function returning it) after `delay` seconds."""
+        return self.later(delay, self.emit, event_type, message)
+
+    def timeline(self, events: Iterable[Tuple[float, str, Any]]) -> None:
+        """Schedules a timeline of events, each a tuple of the delay from now (in seconds), the event type and the message."""
+        for delay, event_type, message in events:
+            self.schedule(delay, event_type, message)
+
+    def wait_for_subscription(self, event_type: str, timeout: float = 5) -> bool:
+        """Blocks until a client subscribes to `event_type`; returns `False` on timeout."""
+        deadline = time.perf_counter() + timeout
+        while time.perf_counter() < deadline:
+            with self.lock:
+                if any(s.event_type == event_type for s in self.subscriptions.values()):
+                    return True
+            time.sleep(0.005)
+        return False
+
+    def requests_to(self, path: str, method: Optional[str] = None) -> List:
+        """Returns the requests received at an endpoint (optionally only those with `method`)."""
+        path = path.strip("/")
+        with self.lock:
+            return [
+                r
+                for r in self.requests
+                if r.path == path and (method is None or r.method == method.upper())
+            ]
+
+    # request handling
+
+    def handle_request(self, request: SimulatedRequest) -> Tuple[int, Dict]:
+        """Records and answers a REST request.
+
+        Returns:
+            Tuple[int, Dict]: The HTTP status code and the response body.
+        """
+        if self.latency > 0:
+            time.sleep(self.latency)
+        with self.lock:
+            self.requests.append(request)
+            handler = self.routes.get((request.method, request.path))
+            hooks = [
+                h
+                for m, p, h in self.request_hooks
+                if m == request.method and p == request.path
+            ]
+
+        if handler is None:
+            response = (200, {"result": True, "status": "Success"})
+        else:
+            result = handler(request)
+            if isinstance(result, tuple):
+                response = result
+            else:
+                response = (200, {"result": result, "status": "Success"})
+
+        for hook in hooks:
+            hook(request)
+        return response
+
+    @staticmethod
+    def failure(message: str, code: int = 400) -> Tuple[int, Dict]:
+        """Constructs the response of a failed request."""
+        return code, {"error": message, "status": "Failed"}
+
+    def serve_websocket(self, connection: WebSocketConnection) -> None:
+        """Serves a WebSocket connection until it is closed."""
+        with self.lock:
+            self.connections.append(connection)
+        try:
+            while self.running.is_set():
+                opcode, payload = connection.receive()
+                if opcode == OPCODE_CLOSE:
+                    break
+                if opcode == OPCODE_PING:
+                    connection.send(payload, opcode=OPCODE_PONG)
+                    continue
+                if opcode != OPCODE_TEXT or len(payload) == 0:
+                    continue
+                try:
+                    request = json.loads(payload)
+                except ValueError:
+                    continue
+                self._handle_ws_request(connection, request)
+        except (ConnectionError, OSError, ValueError):
+            pass
+        finally:
+            connection.close()
+            with self.lock:
+                for name, s in list(self.subscriptions.items()):
+                    if s.connection is connection:
+                        s.active = False
+                        self.subscriptions.pop(name)
+                if connection in self.connections:
+                    self.connections.remove(connection)
+
+    def _handle_ws_request(
+        self, connection: WebSocketConnection, request: Dict
+    ) -> None:
+        """Handles a subscription or unsubscription message."""
+        operation = request.get("Operation")
+        if operation == "subscribe":
+            subscription = Subscription(connection, request)
+            with self.lock:
+                self.subscriptions[subscription.event_name] = subscription
+            factory = self.periodic_events.get(subscription.event_type)
+            if factory is not None:
+                threading.Thread(
+                    target=self._send_periodically,
+                    args=(subscription, factory),
+                    daemon=True,
+                ).start()
+        elif operation == "unsubscribe":
+            with self.lock:
+                subscription = self.subscriptions.pop(request.get("EventName"), None)
+            if subscription is not None:
+                subscription.active = False
+
+    def _send_periodically(
+        self, subscription: Subscription, factory: Callable[[], Any]
+    ) -> None:
+        """Sends the messages of a periodic event to a subscriber every debounce interval."""
+        interval = subscription.debounce or 0.25
+        while subscription.active and self.running.is_set():
+            if self.ws_latency > 0:
+                time.sleep(self.ws_latency)
+            subscription.deliver(factory(), ignore_debounce=True)
+            time.sleep(interval)
+
+    # default endpoints
+
+    def _register_default_routes(self) -> None:
+        """Registers the handlers of the endpoints used by the skills."""
+        self.route("GET", "api/skills/running", lambda r: [])
+        self.route("GET", "api/services/audio", lambda r: self.audio_enabled)
+        self.route("POST", "api/services/audio/enable", self._set_audio(True))
+        self.route("POST", "api/services/audio/disable", self._set_audio(False))
+        self.route("POST", "api/audio/volume", self._set_volume)
+        self.route("GET", "api/audio/list", self._audio_list)
+        self.route("GET", "api/audio", self._audio_file)
+        self.route("POST", "api/audio/speech/capture", self._speech_capture)
+        self.route("POST", "api/tts/speak", self._speak)
+        self.route("GET", "api/faces", lambda r: sorted(self.faces))
+        self.route("DELETE", "api/faces", self._face_delete)
+        self.route("POST", "api/faces/training/start", self._face_train_start)
+        self.route("POST", "api/faces/training/cancel", self._face_train_cancel)
+        self.route("POST", "api/drive", self._drive("api/drive"))
+        self.route("POST", "api/drive/time", self._drive("api/drive/time"))
+        self.route("POST", "api/drive/stop", self._drive("api/drive/stop"))
+        self.route("GET", "api/services/slam", self._slam_enabled)
+        self.route("GET", "api/slam/status", lambda r: {"runMode": "Exploring"})
+        self.route("GET", "api/battery", lambda r: dict(self.battery))
+
+    def _set_audio(self, enabled: bool) -> Callable[[SimulatedRequest], bool]:
+        """Returns the handler enabling or disabling the audio service."""
+
+        def handler(request: SimulatedRequest) -> bool:
+            self.audio_enabled = enabled
+            return True
+
+        return handler
+
+    def _set_volume(self, request: SimulatedRequest) -> bool:
+        """Sets the volume."""
+        self.volume = int(request.arg("Volume", self.volume))
+        return True
+
+    def _audio_list(self, request: SimulatedRequest) -> List[Dict]:
+        """Lists the audio files."""
+        with self.lock:
+            return [{"name": name, "systemAsset": False} for name in self.audio_files]
+
+    def _audio_file(self, request: SimulatedRequest) -> Any:
+        """Returns an audio file, base64-encoded if requested."""
+        name = request.arg("FileName")
+        with self.lock:
+            content = self.audio_files.get(name)
+        if content is None:
+            return self.failure("Unable to find the file `%s`." % name, code=404)
+        if str(request.arg("Base64", "false")).lower() == "true":
+            return {"base64": base64.b64encode(content).decode(), "name": name}
+        return (200, {"result": None, "status": "Success"})
+
+    def _speech_capture(self, request: SimulatedRequest) -> Any:
+        """Records the next queued speech as `capture_Dialogue.wav` and pushes the VoiceRecord event; without any queued speech, no event is pushed."""
+        if not self.audio_enabled:
+            return self.failure("The audio service is disabled.")
+        with self.lock:
+            if len(self.speech_queue) == 0:
+                return True
+            text = self.speech_queue.pop(0)
+            self.audio_files["capture_Dialogue.wav"] = text_to_wav(text)
+        self.schedule(
+            self.capture_delay,
+            "VoiceRecord",
+            {
+                "errorCode": 0,
+                "errorMessage": "Success",
+                "filename": "capture_Dialogue.wav",
+                "success": True,
+            },
+        )
+        return True
+
+    def _speak(self, request: SimulatedRequest) -> bool:
+        """Records an utterance and pushes the TextToSpeechComplete event."""
+        with self.lock:
+            self.utterances.append(request.arg("Text"))
+        self.schedule(
+            self.tts_delay,
+            "TextToSpeechComplete",
+            {"utteranceId": request.arg("UtteranceId")},
+        )
+        return True
+
+    def _face_delete(self, request: SimulatedRequest) -> Any:
+        """Forgets a face."""
+        face_id = request.arg("FaceId")
+        with self.lock:
+            if face_id not in self.faces:
+                return self.failure("Unknown face `%s`." % face_id)
+            self.faces.discard(face_id)
+        return True
+
+    def _face_train_start(self, request: SimulatedRequest) -> bool:
+        """Pushes the FaceTraining messages and learns the face once the training completes."""
+        face_id = request.arg("FaceId")
+        timers = [
+            self.schedule(
+                self.training_delay * (i + 1),
+                "FaceTraining",
+                {"faceId": face_id, "message": message},
+            )
+            for i, message in enumerate(FACE_TRAINING_MESSAGES)
+        ]
+
+        def learn() -> None:
+            with self.lock:
+                self.faces.add(face_id)
+
+        timers.append(
+            self.later(self.training_delay * len(FACE_TRAINING_MESSAGES), learn)
+        )
+        with self.lock:
+            self.training_timers = timers
+        return True
+
+    def _face_train_cancel(self, request: SimulatedRequest) -> bool:
+        """Cancels the running face training, if any."""
+        with self.lock:
+            timers, self.training_timers = self.training_timers, []
+        for timer in timers:
+            timer.cancel()
+        return True
+
+    def _drive(self, endpoint: str) -> Callable[[SimulatedRequest], bool]:
+        """Returns the handler recording the driving requests to `endpoint`."""
+
+        def handler(request: SimulatedRequest) -> bool:
+            body = dict(request.body or {})
+            body["_endpoint"] = endpoint
+            with self.lock:
+                self.drives.append(body)
+            return True
+
+        return handler
+
+    def _slam_enabled(self, request: SimulatedRequest) -> Any:
+        """Returns whether the SLAM service is enabled."""
+        if self.slam_enabled:
+            return True
+        return self.failure("SLAM is disabled.")
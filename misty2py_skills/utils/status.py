@@ -0,0 +1,158 @@
+"""This module extends the status-tracking classes of `misty2py.utils.status` for skills that need to block until their status changes and for long-running skills whose action logs must not grow without bound.
+"""
+import collections
+import json
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+from misty2py.utils.status import ActionLog, Status
+
+ACTION_LOG_WINDOW = 100
+"""The default number of the latest actions kept in memory by a `StreamingActionLog`."""
+
+
+class ConditionStatus(Status):
+    """A `Status` whose changes can be waited for.
+
+    Every call to `set_` notifies the threads blocked in `wait_for_`, so a skill's main loop can sleep until an event listener moves it into a state that requires work instead of polling the status.
+    """
+
+    def __init__(
+        self,
+        init_status: Any = "initialised",
+        init_data: Any = "",
+        init_time: float = 0,
+    ) -> None:
+        """Initialises the ConditionStatus.
+
+        Args:
+            init_status (Any, optional): The initial status. Defaults to `"initialised"`.
+            init_data (Any, optional): The initial data. Defaults to `""`.
+            init_time (float, optional): The initial time. Defaults to `0`.
+        """
+        self.condition = threading.Condition()
+        super().__init__(
+            init_status=init_status, init_data=init_data, init_time=init_time
+        )
+
+    def set_(self, **content) -> None:
+        """Sets the parameter passed to the function to the value passed and wakes up the waiting threads.
+
+        Accepts parameters `"data"`, `"time"` and `"status"`.
+        """
+        with self.condition:
+            super().set_(**content)
+            self.condition.notify_all()
+
+    def get_(self, content_type: str) -> Any:
+        """Obtains the value of the specified parameter.
+
+        Args:
+            content_type (str): The parameter whose value to return. Accepts `"data"`, `"time"` and `"status"`.
+
+        Returns:
+            Any: The value of the requested parameter or `None` if the parameter does not exist.
+        """
+        with self.condition:
+            return super().get_(content_type)
+
+    def wait_for_(self, statuses: Iterable, timeout: Optional[float] = None) -> Any:
+        """Blocks until the status is one of `statuses` or until `timeout` seconds pass.
+
+        Args:
+            statuses (Iterable): The statuses to wait for.
+            timeout (Optional[float], optional): The maximum time to wait in seconds, `None` to wait indefinitely. Defaults to `None`.
+
+        Returns:
+            Any: The status at the time of waking up.
+        """
+        statuses = frozenset(statuses)
+        with self.condition:
+            self.condition.wait_for(lambda: self.status in statuses, timeout)
+            return self.status
+
+
+class StreamingActionLog(ActionLog):
+    """An `ActionLog` whose memory use and summary do not grow with the number of actions.
+
+    The overall success and the counts of the actions are aggregated as the actions are appended, only the latest `window` actions are kept in memory and all actions can be appended to a JSON Lines file, one `{name: dictionarised Misty2pyResponse}` object per line.
+    """
+
+    def __init__(
+        self, window: int = ACTION_LOG_WINDOW, spill_path: Optional[str] = None
+    ) -> None:
+        """Initialises an empty log.
+
+        Args:
+            window (int, optional): The number of the latest actions kept in memory. Defaults to `ACTION_LOG_WINDOW`.
+            spill_path (Optional[str], optional): The JSON Lines file to which every action is appended, or `None` to keep only the window. Defaults to `None`.
+        """
+        self.actions = collections.deque(maxlen=window)
+        self.spill_path = spill_path
+        self.overall_success = True
+        self.counts = {"total": 0, "failed": 0}
+        self.lock = threading.Lock()
+        self._spill = None
+
+    def append_(self, value: Dict[str, Dict]) -> None:
+        """Appends an action in the form `{name: dictionarised Misty2pyResponse}` (or several actions in one dictionary)."""
+        with self.lock:
+            for message in value.values():
+                self.counts["total"] += 1
+                if not isinstance(message, dict) or not message.get("overall_success"):
+                    self.counts["failed"] += 1
+                    self.overall_success = False
+            self.actions.append(value)
+            if self.spill_path is not None:
+                if self._spill is None:
+                    self._spill = open(self.spill_path, "a", encoding="utf-8")
+                self._spill.write(json.dumps(value, default=str) + "\n")
+
+    def get_(self) -> List:
+        """Returns the latest actions kept in memory."""
+        with self.lock:
+            return list(self.actions)
+
+    def summarise(self) -> Dict:
+        """Summarises the log like `misty2py.response.success_of_action_list` in time independent of the number of actions.
+
+        Returns:
+            Dict: The dictionary of the keys `"overall_success"` (bool), `"actions"` with the latest actions as tuples of the action name and the dictionarised Misty2pyResponse and `"action_counts"` with the numbers of all (`"total"`), unsuccessful (`"failed"`) and no longer kept (`"dropped"`) actions.
+        """
+        with self.lock:
+            if self._spill is not None:
+                self._spill.flush()
+            actions = [
+                (name, message)
+                for value in self.actions
+                for name, message in value.items()
+            ]
+            counts = dict(self.counts)
+            counts["dropped"] = counts["total"] - len(actions)
+            return {
+                "actions": actions,
+                "overall_success": self.overall_success,
+                "action_counts": counts,
+            }
+
+    def reset(self) -> None:
+        """Empties the log and its counts for a new run; the spill file, if any, is kept and appended to."""
+        with self.lock:
+            self.actions.clear()
+            self.overall_success = True
+            self.counts = {"total": 0, "failed": 0}
+
+    def close(self) -> None:
+        """Closes the spill file, if any; a later action reopens it."""
+        with self.lock:
+            if self._spill is not None:
+                self._spill.close()
+                self._spill = None
+
+    def __enter__(self) -> "StreamingActionLog":
+        """Returns the log."""
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """Closes the spill file, see `close`."""
+        self.close()
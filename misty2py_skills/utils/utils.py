@@ -0,0 +1,96 @@
+"""This module contains utility functions and classes that complement `misty2py.utils.utils`.
+"""
+import os
+import re
+import threading
+from typing import Optional
+
+
+def parse_file_number(f_name: str) -> Optional[int]:
+    """Returns the integer a file is named with (e.g. `12` for `"0012.wav"`) or `None` if the file name without the extension is not a number."""
+    base = os.path.splitext(os.path.basename(f_name))[0]
+    if re.fullmatch(r"\d+", base, re.ASCII):
+        return int(base)
+    return None
+
+
+class SequentialFileNames:
+    """Allocates file names in a directory whose files are named incrementally with strings representing integers, zero-padded to at least `width` characters.
+
+    The next number is kept in an index file inside the directory, so allocating a name takes constant time regardless of the number of files. The directory is only scanned when the index is missing or unreadable. The index is updated before the allocated name is returned, so a crash can at worst leave a gap in the numbering and never leads to a file being overwritten.
+    """
+
+    def __init__(
+        self, dir_: str, ext: str = ".wav", width: int = 4, index_name: str = ".index"
+    ) -> None:
+        """Initialises the allocator. The directory is created and the index recovered upon the first allocation.
+
+        Args:
+            dir_ (str): The absolute path to the directory.
+            ext (str, optional): The extension of the allocated file names. Defaults to `".wav"`.
+            width (int, optional): The minimal number of digits of a file name, numbers above this width are not truncated. Defaults to `4`.
+            index_name (str, optional): The name of the index file. Defaults to `".index"`.
+        """
+        self.dir = dir_
+        self.ext = ext
+        self.width = width
+        self.index_path = os.path.join(dir_, index_name)
+        self.lock = threading.Lock()
+        self.next_number = None
+
+    def _scan(self) -> int:
+        """Returns the number following the highest number used as a file name in the directory, ignoring files that are not named with a number."""
+        highest = 0
+        for f_name in os.listdir(self.dir):
+            if not f_name.endswith(self.ext):
+                continue
+            number = parse_file_number(f_name)
+            if number is not None and number > highest:
+                highest = number
+        return highest + 1
+
+    def _recover(self) -> int:
+        """Reads the next number from the index file, falling back to scanning the directory."""
+        os.makedirs(self.dir, exist_ok=True)
+        try:
+            with open(self.index_path, "r") as f:
+                return int(f.read().strip())
+        except (OSError, ValueError):
+            return self._scan()
+
+    def _persist(self) -> None:
+        """Atomically replaces the index file with the current next number."""
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(str(self.next_number))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.index_path)
+
+    def _path(self, number: int) -> str:
+        """Constructs the path of the file named with `number`."""
+        return os.path.join(
+            self.dir, "%s%s" % (str(number).zfill(self.width), self.ext)
+        )
+
+    def allocate(self) -> str:
+        """Reserves and returns the absolute path of the next file."""
+        with self.lock:
+            if self.next_number is None:
+                self.next_number = self._recover()
+            path = self._path(self.next_number)
+            # guards against an index left behind by a crash or by another writer
+            while os.path.exists(path):
+                self.next_number += 1
+                path = self._path(self.next_number)
+            self.next_number += 1
+            self._persist()
+            return path
+
+
+def get_next_file_name(dir_: str) -> str:
+    """Generates the next file name in a directory whose files are named incrementally with strings representing integers, zero-padded to at least four characters.
+
+    A thin wrapper over `SequentialFileNames`, so the name is reserved in the index file of the directory.
+    """
+    return SequentialFileNames(dir_).allocate()
@@ -0,0 +1,168 @@
+"""This module implements the subset of the WebSocket protocol (RFC 6455) shared by the WebSocket client of `misty2py_skills.aio.client` and the WebSocket server of `misty2py_skills.utils.simulator`: the opening handshake keys, the encoding and decoding of frames and the reassembly of fragmented messages.
+
+The frames are decoded by `frame_parser`, which does no I/O itself, so the same parser serves blocking streams (`read_frame`) and asyncio streams (`read_frame_async`).
+"""
+import base64
+import hashlib
+import os
+import struct
+from typing import Awaitable, Callable, Generator, Optional, Tuple, Union
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+"""The GUID used to compute the WebSocket handshake response."""
+OPCODE_CONTINUATION = 0x0
+"""The opcode of a frame continuing a fragmented message."""
+OPCODE_TEXT = 0x1
+"""The opcode of a text message."""
+OPCODE_BINARY = 0x2
+"""The opcode of a binary message."""
+OPCODE_CLOSE = 0x8
+"""The opcode of the closing frame."""
+OPCODE_PING = 0x9
+"""The opcode of a ping."""
+OPCODE_PONG = 0xA
+"""The opcode of a pong."""
+
+Frame = Tuple[bool, int, bytes]
+"""A decoded frame: whether it is the final fragment of its message, its opcode and its unmasked payload."""
+
+
+def handshake_key() -> str:
+    """Returns a random `Sec-WebSocket-Key` for the opening handshake of a client."""
+    return base64.b64encode(os.urandom(16)).decode("ascii")
+
+
+def accept_key(key: str) -> str:
+    """Returns the `Sec-WebSocket-Accept` value of the server's handshake response to `key`."""
+    return base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+
+
+def mask_payload(payload: bytes, mask: bytes) -> bytes:
+    """XORs `payload` with the repeated 4-byte `mask`; masking and unmasking are the same operation."""
+    length = len(payload)
+    if not mask or length == 0:
+        return payload
+    repeated = (mask * (length // 4 + 1))[:length]
+    return (int.from_bytes(payload, "big") ^ int.from_bytes(repeated, "big")).to_bytes(
+        length, "big"
+    )
+
+
+def encode_frame(
+    payload: Union[str, bytes],
+    opcode: int = OPCODE_TEXT,
+    masked: bool = False,
+    final: bool = True,
+) -> bytes:
+    """Encodes a frame.
+
+    Args:
+        payload (Union[str, bytes]): The payload; a string is encoded in UTF-8.
+        opcode (int, optional): The opcode. Defaults to `OPCODE_TEXT`.
+        masked (bool, optional): Whether to mask the payload with a random mask, as clients must. Defaults to `False`.
+        final (bool, optional): Whether the frame is the final fragment of its message. Defaults to `True`.
+
+    Returns:
+        bytes: The frame.
+    """
+    if isinstance(payload, str):
+        payload = payload.encode("utf-8")
+    header = bytes([(0x80 if final else 0) | opcode])
+    mask_bit = 0x80 if masked else 0
+    length = len(payload)
+    if length < 126:
+        header += bytes([mask_bit | length])
+    elif length < 2**16:
+        header += bytes([mask_bit | 126]) + struct.pack(">H", length)
+    else:
+        header += bytes([mask_bit | 127]) + struct.pack(">Q", length)
+    if masked:
+        mask = os.urandom(4)
+        return header + mask + mask_payload(payload, mask)
+    return header + payload
+
+
+def frame_parser() -> Generator[int, bytes, Frame]:
+    """Decodes one frame: yields the number of bytes it needs next, is sent exactly these bytes and returns the decoded frame (see `Frame`) via `StopIteration`."""
+    first, second = yield 2
+    length = second & 0x7F
+    if length == 126:
+        length = struct.unpack(">H", (yield 2))[0]
+    elif length == 127:
+        length = struct.unpack(">Q", (yield 8))[0]
+    mask = (yield 4) if second & 0x80 else b""
+    payload = (yield length) if length > 0 else b""
+    return bool(first & 0x80), first & 0x0F, mask_payload(payload, mask)
+
+
+def read_frame(read_exactly: Callable[[int], bytes]) -> Frame:
+    """Reads a frame from a blocking stream.
+
+    Args:
+        read_exactly (Callable[[int], bytes]): Returns exactly the given number of bytes of the stream or raises.
+
+    Returns:
+        Frame: The decoded frame.
+    """
+    parser = frame_parser()
+    try:
+        needed = next(parser)
+        while True:
+            needed = parser.send(read_exactly(needed))
+    except StopIteration as e:
+        return e.value
+
+
+async def read_frame_async(read_exactly: Callable[[int], Awaitable[bytes]]) -> Frame:
+    """Reads a frame from an asyncio stream, e.g. with `asyncio.StreamReader.readexactly`.
+
+    Args:
+        read_exactly (Callable[[int], Awaitable[bytes]]): Returns exactly the given number of bytes of the stream or raises.
+
+    Returns:
+        Frame: The decoded frame.
+    """
+    parser = frame_parser()
+    try:
+        needed = next(parser)
+        while True:
+            needed = parser.send(await read_exactly(needed))
+    except StopIteration as e:
+        return e.value
+
+
+class MessageAssembler:
+    """Reassembles the messages fragmented into several frames.
+
+    Control frames (close, ping and pong) may arrive between the fragments of a message and are passed through unchanged.
+    """
+
+    def __init__(self) -> None:
+        """Initialises an assembler with no message in progress."""
+        self.opcode = None
+        self.fragments = []
+
+    def add(self, frame: Frame) -> Optional[Tuple[int, bytes]]:
+        """Adds a frame.
+
+        Args:
+            frame (Frame): The decoded frame.
+
+        Returns:
+            Optional[Tuple[int, bytes]]: The opcode and the payload of the control frame or of the message completed by the frame; `None` if the message is incomplete or the frame continues no message.
+        """
+        final, opcode, payload = frame
+        if opcode >= OPCODE_CLOSE:
+            return opcode, payload
+        if opcode != OPCODE_CONTINUATION:
+            self.opcode = opcode
+            self.fragments = []
+        elif self.opcode is None:
+            return None
+        self.fragments.append(payload)
+        if not final:
+            return None
+        message = (self.opcode, b"".join(self.fragments))
+        self.opcode = None
+        self.fragments = []
+        return message
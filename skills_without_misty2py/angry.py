@@ -1,7 +1,7 @@
 import time
 from typing import Dict, Union
 
-import requests
+from misty_client import session
 
 
 def angry_expression(
@@ -21,19 +21,19 @@ def angry_expression(
         "TimeMS": 200,
     },
 ) -> None:
-    requests.post("http://%s/api/images/display" % misty_ip, json=expression)
+    session.post("http://%s/api/images/display" % misty_ip, json=expression)
 
     time.sleep(led_offset)
 
-    requests.post("http://%s/api/led/transition" % misty_ip, json=colours)
-    requests.post("http://%s/api/audio/play" % misty_ip, json=sound)
+    session.post("http://%s/api/led/transition" % misty_ip, json=colours)
+    session.post("http://%s/api/audio/play" % misty_ip, json=sound)
 
     time.sleep(duration)
 
-    requests.post(
+    session.post(
         "http://%s/api/led" % misty_ip, json={"red": "0", "green": "0", "blue": "0"}
     )
-    requests.post(
+    session.post(
         "http://%s/images/display" % misty_ip, json={"FileName": "e_DefaultContent.jpg"}
     )
 
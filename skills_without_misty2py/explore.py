@@ -1,8 +1,9 @@
 from typing import Union
 
-import requests
 from pynput import keyboard
 
+from misty_client import session
+
 
 misty_ip = "192.168.0.103"
 INFO_KEY = keyboard.KeyCode.from_char("i")
@@ -12,14 +13,14 @@ HELP_KEY = keyboard.KeyCode.from_char("h")
 
 
 def get_slam_info() -> None:
-    enabled = requests.get("http://%s/api/services/slam" % misty_ip)
+    enabled = session.get("http://%s/api/services/slam" % misty_ip)
     if enabled.json().get("result"):
         print("SLAM enabled.")
     else:
         print("SLAM disabled.")
         return
 
-    status = requests.get("http://%s/api/slam/status" % misty_ip)
+    status = session.get("http://%s/api/slam/status" % misty_ip)
     result = status.json().get("status")
     if result == "Success":
         info = status.json().get("result")
@@ -41,14 +42,14 @@ def get_instructions() -> None:
 
 def handle_press(key: Union[keyboard.Key, keyboard.KeyCode]) -> None:
     print(f"{key} registered.")
-    stat = requests.get("http://%s/api/services/slam" % misty_ip)
+    stat = session.get("http://%s/api/services/slam" % misty_ip)
 
     if stat.json().get("status") == "Failed":
         print("SLAM disabled, terminating the program.")
         return False
 
     if key == START_KEY:
-        resp = requests.post("http://%s/api/slam/map/start" % misty_ip, json={})
+        resp = session.post("http://%s/api/slam/map/start" % misty_ip, json={})
         print(resp.json())
         print(f"{key} processed.")
 
@@ -61,7 +62,7 @@ def handle_press(key: Union[keyboard.Key, keyboard.KeyCode]) -> None:
         print(f"{key} processed.")
 
     elif key == TERM_KEY:
-        resp = requests.post("http://%s/api/slam/map/stop" % misty_ip, json={})
+        resp = session.post("http://%s/api/slam/map/stop" % misty_ip, json={})
         print(resp.json())
         print(f"{key} processed.")
         return False
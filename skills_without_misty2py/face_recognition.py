@@ -1,103 +1,13 @@
-import json
 import random
 import string
-import threading
 import time
 from enum import Enum
-from typing import Any, Callable, Dict, List, Union
+from typing import Any, Dict, List
 
-import requests
-import websocket
 from pymitter import EventEmitter
 
-
-class MistyEvent:
-    def __init__(
-        self,
-        ip: str,
-        type_str: str,
-        event_name: str,
-        return_property: str,
-        debounce: int,
-        len_data_entries: int,
-        event_emitter: Union[Callable, None],
-    ) -> None:
-        self.server = "ws://%s/pubsub" % ip
-        self.data = []
-        self.type_str = type_str
-        self.event_name = event_name
-        self.return_property = return_property
-        self.debounce = debounce
-        self.log = []
-        self.len_data_entries = len_data_entries
-        event_thread = threading.Thread(target=self.run, daemon=True)
-        event_thread.start()
-        if event_emitter:
-            self.ee = event_emitter
-        else:
-            self.ee = False
-
-    def run(self) -> None:
-        self.ws = websocket.WebSocketApp(
-            self.server,
-            on_open=self.on_open,
-            on_message=self.on_message,
-            on_error=self.on_error,
-            on_close=self.on_close,
-        )
-        self.ws.run_forever()
-
-    def on_message(self, ws, message) -> None:
-        message = json.loads(message)
-        mes = message["message"]
-        if len(self.data) > self.len_data_entries:
-            self.data = self.data[1:-1]
-        self.data.append(mes)
-
-        if self.ee:
-            self.ee.emit(self.event_name, mes)
-
-    def on_error(self, ws, error) -> None:
-        if len(self.log) > self.len_data_entries:
-            self.log = self.log[1:-1]
-        self.log.append(error)
-
-        if self.ee:
-            self.ee.emit("error_%s" % self.event_name, error)
-
-    def on_close(self, ws) -> None:
-        mes = "Closed"
-        if len(self.log) > self.len_data_entries:
-            self.log = self.log[1:-1]
-        self.log.append(mes)
-
-        if self.ee:
-            self.ee.emit("close_%s" % self.event_name, mes)
-
-    def on_open(self, ws) -> None:
-        self.log.append("Opened")
-        self.subscribe()
-        ws.send("")
-
-        if self.ee:
-            self.ee.emit("open_%s" % self.event_name)
-
-    def subscribe(self) -> None:
-        msg = {
-            "Operation": "subscribe",
-            "Type": self.type_str,
-            "DebounceMs": self.debounce,
-            "EventName": self.event_name,
-            "ReturnProperty": self.return_property,
-        }
-        msg_str = json.dumps(msg, separators=(",", ":"))
-        self.ws.send(msg_str)
-
-    def unsubscribe(self) -> None:
-        msg = {"Operation": "unsubscribe", "EventName": self.event_name, "Message": ""}
-        msg_str = json.dumps(msg, separators=(",", ":"))
-        self.ws.send(msg_str)
-        self.ws.close()
+from misty_client import session
+from misty_event_hub import MistyEvent
 
 
 class Status:
@@ -204,7 +114,7 @@ def listener(data: Dict) -> None:
 
 def speak(misty_ip: str, utterance: str) -> None:
     print(utterance)
-    requests.post(
+    session.post(
         "http://%s/api/tts/speak" % misty_ip,
         json={"Text": utterance, "UtteranceId": "utterance_" + get_random_string(6)},
     )
@@ -257,7 +167,7 @@ def initialise_training(misty_ip: str) -> None:
 def perform_training(misty_ip: str, name: str) -> None:
     global event_face_train
     status.set_(status=StatusLabels.TRAIN)
-    d = requests.get("http://%s/api/faces" % misty_ip).json()
+    d = session.get("http://%s/api/faces" % misty_ip).json()
     new_name = name
     if not d.get("result") is None:
         while new_name in d.get("result"):
@@ -268,7 +178,7 @@ def perform_training(misty_ip: str, name: str) -> None:
         new_name = get_random_string(6)
         print(f"The name {name} is invalid, using {new_name} instead.")
 
-    d = requests.post(
+    d = session.post(
         "http://%s/api/faces/training/start" % misty_ip, json={"FaceId": new_name}
     ).json()
     speak_wrapper(misty_ip, "The training has commenced, please do not look away now.")
@@ -290,13 +200,13 @@ def handle_user_input(misty_ip: str, user_input: str) -> None:
     elif (
         status.get_("status") == StatusLabels.INIT and user_input in UserResponses.STOP
     ):
-        requests.post("http://%s/api/faces/training/cancel" % misty_ip, json={})
+        session.post("http://%s/api/faces/training/cancel" % misty_ip, json={})
         status.set_(status=StatusLabels.MAIN)
 
     elif (
         status.get_("status") == StatusLabels.TALK and user_input in UserResponses.STOP
     ):
-        requests.post("http://%s/api/tts/stop" % misty_ip, json={})
+        session.post("http://%s/api/tts/stop" % misty_ip, json={})
         status.set_(status=StatusLabels.MAIN)
 
     elif status.get_("status") == StatusLabels.PROMPT:
@@ -307,11 +217,11 @@ def handle_user_input(misty_ip: str, user_input: str) -> None:
 def purge_testing_faces(misty_ip: str, known_faces: List) -> None:
     for face in known_faces:
         if face.startswith(TESTING_NAME):
-            requests.delete("http://%s/api/faces?FaceId=%s" % (misty_ip, face))
+            session.delete("http://%s/api/faces?FaceId=%s" % (misty_ip, face))
 
 
 def cancel_skills(misty_ip: str) -> None:
-    data = requests.get("http://%s/api/skills/running" % misty_ip).json()
+    data = session.get("http://%s/api/skills/running" % misty_ip).json()
     result = data.get("result", [])
     to_cancel = []
     for dct in result:
@@ -319,14 +229,14 @@ def cancel_skills(misty_ip: str) -> None:
         if len(uid) > 0:
             to_cancel.append(uid)
     for skill in to_cancel:
-        requests.post("http://%s/api/skills/cancel" % misty_ip, json={"Skill": skill})
+        session.post("http://%s/api/skills/cancel" % misty_ip, json={"Skill": skill})
 
 
 def face_recognition(misty_ip: str) -> None:
     cancel_skills(misty_ip)
-    requests.post("http://%s/api/audio/volume" % misty_ip, json={"Volume": "5"})
+    session.post("http://%s/api/audio/volume" % misty_ip, json={"Volume": "5"})
 
-    get_faces_known = requests.get("http://%s/api/faces" % misty_ip).json()
+    get_faces_known = session.get("http://%s/api/faces" % misty_ip).json()
     known_faces = get_faces_known.get("result")
     if not known_faces is None:
         print("Your misty currently knows these faces: %s." % ", ".join(known_faces))
@@ -334,7 +244,7 @@ def face_recognition(misty_ip: str) -> None:
     else:
         print("Your Misty currently does not know any faces.")
 
-    requests.post("http://%s/api/faces/recognition/start" % misty_ip, json={})
+    session.post("http://%s/api/faces/recognition/start" % misty_ip, json={})
 
     face_rec = MistyEvent(
         misty_ip, "FaceRecognition", event_face_rec_name, None, 250, 10, ee
@@ -351,7 +261,7 @@ def face_recognition(misty_ip: str) -> None:
 
     face_rec.unsubscribe()
 
-    requests.post("http://%s/api/faces/recognition/stop" % misty_ip, json={})
+    session.post("http://%s/api/faces/recognition/stop" % misty_ip, json={})
 
     speak_wrapper(misty_ip, "Bye!")
 
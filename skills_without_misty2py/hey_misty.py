@@ -1,14 +1,13 @@
-import json
 import random
 import string
-import threading
 import time
 from typing import Any, Callable, Dict, Union
 
-import requests
-import websocket
 from pymitter import EventEmitter
 
+from misty_client import session
+from misty_event_hub import MistyEvent
+
 
 class Status:
     def __init__(
@@ -56,95 +55,6 @@ class Status:
         return message
 
 
-class MistyEvent:
-    def __init__(
-        self,
-        ip: str,
-        type_str: str,
-        event_name: str,
-        return_property: str,
-        debounce: int,
-        len_data_entries: int,
-        event_emitter: Union[Callable, None],
-    ) -> None:
-        self.server = "ws://%s/pubsub" % ip
-        self.data = []
-        self.type_str = type_str
-        self.event_name = event_name
-        self.return_property = return_property
-        self.debounce = debounce
-        self.log = []
-        self.len_data_entries = len_data_entries
-        event_thread = threading.Thread(target=self.run, daemon=True)
-        event_thread.start()
-        if event_emitter:
-            self.ee = event_emitter
-        else:
-            self.ee = False
-
-    def run(self) -> None:
-        self.ws = websocket.WebSocketApp(
-            self.server,
-            on_open=self.on_open,
-            on_message=self.on_message,
-            on_error=self.on_error,
-            on_close=self.on_close,
-        )
-        self.ws.run_forever()
-
-    def on_message(self, ws, message) -> None:
-        message = json.loads(message)
-        mes = message["message"]
-        if len(self.data) > self.len_data_entries:
-            self.data = self.data[1:-1]
-        self.data.append(mes)
-
-        if self.ee:
-            self.ee.emit(self.event_name, mes)
-
-    def on_error(self, ws, error):
-        if len(self.log) > self.len_data_entries:
-            self.log = self.log[1:-1]
-        self.log.append(error)
-
-        if self.ee:
-            self.ee.emit("error_%s" % self.event_name, error)
-
-    def on_close(self, ws) -> None:
-        mes = "Closed"
-        if len(self.log) > self.len_data_entries:
-            self.log = self.log[1:-1]
-        self.log.append(mes)
-
-        if self.ee:
-            self.ee.emit("close_%s" % self.event_name, mes)
-
-    def on_open(self, ws) -> None:
-        self.log.append("Opened")
-        self.subscribe()
-        ws.send("")
-
-        if self.ee:
-            self.ee.emit("open_%s" % self.event_name)
-
-    def subscribe(self) -> None:
-        msg = {
-            "Operation": "subscribe",
-            "Type": self.type_str,
-            "DebounceMs": self.debounce,
-            "EventName": self.event_name,
-            "ReturnProperty": self.return_property,
-        }
-        msg_str = json.dumps(msg, separators=(",", ":"))
-        self.ws.send(msg_str)
-
-    def unsubscribe(self) -> None:
-        msg = {"Operation": "unsubscribe", "EventName": self.event_name, "Message": ""}
-        msg_str = json.dumps(msg, separators=(",", ":"))
-        self.ws.send(msg_str)
-        self.ws.close()
-
-
 ee = EventEmitter()
 event_name = "keyphrase_greeting_%s" % "".join(
     random.SystemRandom().choice(string.ascii_letters + string.digits) for _ in range(6)
@@ -184,7 +94,7 @@ def listener(data: Dict) -> None:
 
 
 def cancel_skills(misty_ip: str) -> None:
-    data = requests.get("http://%s/api/skills/running" % misty_ip).json()
+    data = session.get("http://%s/api/skills/running" % misty_ip).json()
     result = data.get("result", [])
     to_cancel = []
     for dct in result:
@@ -192,14 +102,14 @@ def cancel_skills(misty_ip: str) -> None:
         if len(uid) > 0:
             to_cancel.append(uid)
     for skill in to_cancel:
-        requests.post("http://%s/api/skills/cancel" % misty_ip, json={"Skill": skill})
+        session.post("http://%s/api/skills/cancel" % misty_ip, json={"Skill": skill})
 
 
 def greet() -> None:
     cancel_skills(misty_ip)
-    requests.post("http://%s/api/services/audio/enable" % misty_ip, json={})
+    session.post("http://%s/api/services/audio/enable" % misty_ip, json={})
 
-    keyphrase_start = requests.post(
+    keyphrase_start = session.post(
         "http://%s/api/audio/keyphrase/start" % misty_ip,
         json={"CaptureSpeech": "false"},
     ).json()
@@ -218,8 +128,8 @@ def greet() -> None:
 
     print("Keyphrase recognition ended.")
     keyphrase.unsubscribe()
-    requests.post("http://%s/api/audio/keyphrase/stop" % misty_ip, json={}).json()
-    requests.post("http://%s/api/services/audio/disable" % misty_ip, json={})
+    session.post("http://%s/api/audio/keyphrase/stop" % misty_ip, json={}).json()
+    session.post("http://%s/api/services/audio/disable" % misty_ip, json={})
 
 
 if __name__ == "__main__":
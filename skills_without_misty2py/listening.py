@@ -1,7 +1,7 @@
 import time
 from typing import Dict, Union
 
-import requests
+from misty_client import session
 
 
 def listening_expression(
@@ -10,12 +10,12 @@ def listening_expression(
     sound: Dict = {"FileName": "s_SystemWakeWord.wav"},
     duration: Union[float, int] = 1.5,
 ) -> None:
-    requests.post("http://%s/api/led" % misty_ip, json=colour)
-    requests.post("http://%s/api/audio/play" % misty_ip, json=sound)
+    session.post("http://%s/api/led" % misty_ip, json=colour)
+    session.post("http://%s/api/audio/play" % misty_ip, json=sound)
 
     time.sleep(duration)
 
-    requests.post(
+    session.post(
         "http://%s/api/led" % misty_ip, json={"red": "0", "green": "0", "blue": "0"}
     )
 
@@ -0,0 +1,119 @@
+"""A shared HTTP client for Misty's REST API which keeps the connections to Misty alive, applies a default timeout to every request and retries failed requests. Requests of any method are retried if they could not connect to Misty, only the idempotent ones (GET and DELETE) are retried after the connection broke or Misty answered 502, 503 or 504. A request which timed out is reported and answered with a failed response, so that the script goes on and still cleans up.
+
+Running this module benchmarks a burst of drive commands sent with and without the shared client against `misty2py_skills.utils.simulator.MistySimulator`.
+"""
+import json
+import statistics
+import time
+from typing import Callable, Dict, List
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+TIMEOUT = (3.05, 10)
+RETRIES = 3
+BACKOFF_FACTOR = 0.1
+POOL_SIZE = 10
+
+
+def timed_out_response(url: str, error: requests.Timeout) -> requests.Response:
+    response = requests.Response()
+    response.status_code = 504
+    response.reason = "Gateway Timeout"
+    response.url = url
+    response.request = error.request
+    response.headers["Content-Type"] = "application/json"
+    response._content = json.dumps(
+        {"status": "Failed", "error": "Misty did not respond in time: %s" % error}
+    ).encode()
+    return response
+
+
+class MistySession(requests.Session):
+    def __init__(
+        self,
+        timeout=TIMEOUT,
+        retries: int = RETRIES,
+        backoff_factor: float = BACKOFF_FACTOR,
+        pool_size: int = POOL_SIZE,
+    ) -> None:
+        super().__init__()
+        self.timeout = timeout
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset(["GET", "DELETE"]),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry
+        )
+        self.mount("http://", adapter)
+        self.mount("https://", adapter)
+
+    def request(self, method, url, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        try:
+            return super().request(method, url, **kwargs)
+        except requests.Timeout as e:
+            print("Misty did not respond in time: %s %s" % (method, url))
+            return timed_out_response(url, e)
+
+
+session = MistySession()
+
+
+def time_requests(send: Callable[[], object], n: int) -> List[float]:
+    latencies = []
+    for _ in range(n):
+        start = time.perf_counter()
+        send()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def summarise(latencies: List[float]) -> Dict[str, float]:
+    ordered = sorted(latencies)
+    return {
+        "total_ms": sum(latencies) * 1000,
+        "mean_ms": statistics.mean(latencies) * 1000,
+        "p50_ms": ordered[len(ordered) // 2] * 1000,
+        "p95_ms": ordered[int(len(ordered) * 0.95) - 1] * 1000,
+    }
+
+
+def benchmark_drive(misty_ip: str, n: int = 100) -> Dict[str, Dict[str, float]]:
+    url = "http://%s/api/drive" % misty_ip
+    command = {"LinearVelocity": 20, "AngularVelocity": 0}
+    pooled = MistySession()
+    results = {
+        "requests": summarise(
+            time_requests(lambda: requests.post(url, json=command), n)
+        ),
+        "session": summarise(time_requests(lambda: pooled.post(url, json=command), n)),
+    }
+    pooled.close()
+    return results
+
+
+if __name__ == "__main__":
+    import os
+    import sys
+
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from misty2py_skills.utils.simulator import MistySimulator
+
+    with MistySimulator() as sim:
+        for client, summary in benchmark_drive(sim.address).items():
+            print(
+                "%-8s %s"
+                % (
+                    client,
+                    ", ".join("%s=%.2f" % (key, val) for key, val in summary.items()),
+                )
+            )
@@ -0,0 +1,196 @@
+"""A shared WebSocket connection per Misty which carries all event subscriptions of the scripts in this directory, reconnects automatically and resubscribes after a reconnect.
+"""
+import collections
+import json
+import threading
+from typing import Callable, Dict, Union
+
+import websocket
+
+RECONNECT_DELAY = 0.5
+MAX_RECONNECT_DELAY = 8
+
+
+class MistyEventHub:
+    def __init__(self, ip: str) -> None:
+        self.ip = ip
+        self.server = "ws://%s/pubsub" % ip
+        self.events = {}
+        # re-entrant, as a failed send reports the error to the events while holding it
+        self.lock = threading.RLock()
+        self.connected = False
+        self.opened = False
+        self.stopped = threading.Event()
+        self.ws = None
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self) -> None:
+        delay = RECONNECT_DELAY
+        while True:
+            with self.lock:
+                if self.stopped.is_set():
+                    break
+                self.ws = websocket.WebSocketApp(
+                    self.server,
+                    on_open=self.on_open,
+                    on_message=self.on_message,
+                    on_error=self.on_error,
+                    on_close=self.on_close,
+                )
+                self.opened = False
+                ws = self.ws
+            ws.run_forever()
+            if self.opened:
+                delay = RECONNECT_DELAY
+            else:
+                delay = min(delay * 2, MAX_RECONNECT_DELAY)
+            if self.stopped.wait(delay):
+                break
+
+    def send(self, msg: Dict) -> None:
+        try:
+            self.ws.send(json.dumps(msg, separators=(",", ":")))
+        except (websocket.WebSocketException, OSError) as e:
+            self.on_error(self.ws, e)
+
+    def subscribe(self, event: "MistyEvent") -> None:
+        with self.lock:
+            self.events[event.event_name] = event
+            if self.connected:
+                self.send(event.subscribe_message())
+
+    def unsubscribe(self, event: "MistyEvent") -> None:
+        with self.lock:
+            self.events.pop(event.event_name, None)
+            if self.connected:
+                self.send(
+                    {
+                        "Operation": "unsubscribe",
+                        "EventName": event.event_name,
+                        "Message": "",
+                    }
+                )
+            last = not self.events
+        if last:
+            self.stop()
+
+    def stop(self) -> None:
+        with self.lock:
+            self.stopped.set()
+            ws = self.ws
+        with hubs_lock:
+            if hubs.get(self.ip) is self:
+                hubs.pop(self.ip)
+        if ws is not None:
+            ws.close()
+
+    def on_open(self, ws) -> None:
+        with self.lock:
+            # a stop between creating the app and connecting is only seen here
+            if self.stopped.is_set():
+                ws.close()
+                return
+            self.connected = True
+            self.opened = True
+            events = list(self.events.values())
+            for event in events:
+                self.send(event.subscribe_message())
+        for event in events:
+            event.on_open()
+
+    def on_message(self, ws, message) -> None:
+        message = json.loads(message)
+        with self.lock:
+            event = self.events.get(message.get("eventName"))
+        if event is not None:
+            event.on_message(message.get("message"))
+
+    def on_error(self, ws, error) -> None:
+        with self.lock:
+            events = list(self.events.values())
+        for event in events:
+            event.on_error(error)
+
+    def on_close(self, ws, *args) -> None:
+        with self.lock:
+            self.connected = False
+            events = list(self.events.values())
+        for event in events:
+            event.on_close()
+
+
+hubs = {}
+hubs_lock = threading.Lock()
+
+
+def get_hub(ip: str) -> MistyEventHub:
+    with hubs_lock:
+        hub = hubs.get(ip)
+        if hub is None or hub.stopped.is_set():
+            hub = MistyEventHub(ip)
+            hubs[ip] = hub
+        return hub
+
+
+class MistyEvent:
+    def __init__(
+        self,
+        ip: str,
+        type_str: str,
+        event_name: str,
+        return_property: str,
+        debounce: int,
+        len_data_entries: int,
+        event_emitter: Union[Callable, None],
+    ) -> None:
+        self.data = collections.deque(maxlen=len_data_entries)
+        self.type_str = type_str
+        self.event_name = event_name
+        self.return_property = return_property
+        self.debounce = debounce
+        self.log = collections.deque(maxlen=len_data_entries)
+        self.len_data_entries = len_data_entries
+        if event_emitter:
+            self.ee = event_emitter
+        else:
+            self.ee = False
+        self.hub = get_hub(ip)
+        self.hub.subscribe(self)
+
+    def subscribe_message(self) -> Dict:
+        return {
+            "Operation": "subscribe",
+            "Type": self.type_str,
+            "DebounceMs": self.debounce,
+            "EventName": self.event_name,
+            "ReturnProperty": self.return_property,
+        }
+
+    def on_message(self, mes) -> None:
+        self.data.append(mes)
+
+        if self.ee:
+            self.ee.emit(self.event_name, mes)
+
+    def on_error(self, error) -> None:
+        self.log.append(error)
+
+        if self.ee:
+            self.ee.emit("error_%s" % self.event_name, error)
+
+    def on_close(self) -> None:
+        mes = "Closed"
+        self.log.append(mes)
+
+        if self.ee:
+            self.ee.emit("close_%s" % self.event_name, mes)
+
+    def on_open(self) -> None:
+        self.log.append("Opened")
+
+        if self.ee:
+            self.ee.emit("open_%s" % self.event_name)
+
+    def unsubscribe(self) -> None:
+        self.hub.unsubscribe(self)
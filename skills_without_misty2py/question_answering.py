@@ -1,108 +1,18 @@
 import base64
 import datetime
-import json
 import os
 import random
 import string
-import threading
 from enum import Enum
-from typing import Any, Callable, Dict, List, Tuple, Union
+from typing import Any, Dict, List, Tuple, Union
 
-import requests
 import speech_recognition as sr
-import websocket
 from dotenv import dotenv_values
 from num2words import num2words
 from pymitter import EventEmitter
 
-
-class MistyEvent:
-    def __init__(
-        self,
-        ip: str,
-        type_str: str,
-        event_name: str,
-        return_property: str,
-        debounce: int,
-        len_data_entries: int,
-        event_emitter: Union[Callable, None],
-    ) -> None:
-        self.server = "ws://%s/pubsub" % ip
-        self.data = []
-        self.type_str = type_str
-        self.event_name = event_name
-        self.return_property = return_property
-        self.debounce = debounce
-        self.log = []
-        self.len_data_entries = len_data_entries
-        event_thread = threading.Thread(target=self.run, daemon=True)
-        event_thread.start()
-        if event_emitter:
-            self.ee = event_emitter
-        else:
-            self.ee = False
-
-    def run(self) -> None:
-        self.ws = websocket.WebSocketApp(
-            self.server,
-            on_open=self.on_open,
-            on_message=self.on_message,
-            on_error=self.on_error,
-            on_close=self.on_close,
-        )
-        self.ws.run_forever()
-
-    def on_message(self, ws, message) -> None:
-        message = json.loads(message)
-        mes = message["message"]
-        if len(self.data) > self.len_data_entries:
-            self.data = self.data[1:-1]
-        self.data.append(mes)
-
-        if self.ee:
-            self.ee.emit(self.event_name, mes)
-
-    def on_error(self, ws, error) -> None:
-        if len(self.log) > self.len_data_entries:
-            self.log = self.log[1:-1]
-        self.log.append(error)
-
-        if self.ee:
-            self.ee.emit("error_%s" % self.event_name, error)
-
-    def on_close(self, ws) -> None:
-        mes = "Closed"
-        if len(self.log) > self.len_data_entries:
-            self.log = self.log[1:-1]
-        self.log.append(mes)
-
-        if self.ee:
-            self.ee.emit("close_%s" % self.event_name, mes)
-
-    def on_open(self, ws) -> None:
-        self.log.append("Opened")
-        self.subscribe()
-        ws.send("")
-
-        if self.ee:
-            self.ee.emit("open_%s" % self.event_name)
-
-    def subscribe(self) -> None:
-        msg = {
-            "Operation": "subscribe",
-            "Type": self.type_str,
-            "DebounceMs": self.debounce,
-            "EventName": self.event_name,
-            "ReturnProperty": self.return_property,
-        }
-        msg_str = json.dumps(msg, separators=(",", ":"))
-        self.ws.send(msg_str)
-
-    def unsubscribe(self) -> None:
-        msg = {"Operation": "unsubscribe", "EventName": self.event_name, "Message": ""}
-        msg_str = json.dumps(msg, separators=(",", ":"))
-        self.ws.send(msg_str)
-        self.ws.close()
+from misty_client import session
+from misty_event_hub import MistyEvent
 
 
 class Status:
@@ -233,7 +143,7 @@ def get_next_file_name(dir_: str) -> str:
 
 def get_all_audio_file_names() -> List[str]:
     dict_list = (
-        requests.get("http://%s/api/audio/list" % misty_ip).json().get("result", [])
+        session.get("http://%s/api/audio/list" % misty_ip).json().get("result", [])
     )
     audio_list = []
     for d in dict_list:
@@ -244,19 +154,19 @@ def get_all_audio_file_names() -> List[str]:
 def speech_capture() -> None:
     print("Listening")
 
-    audio_status = requests.get("http://%s/api/services/audio" % misty_ip).json()
+    audio_status = session.get("http://%s/api/services/audio" % misty_ip).json()
 
     if not audio_status.get("result"):
-        enable_audio = requests.post(
+        enable_audio = session.post(
             "http://%s/api/services/audio/enable" % misty_ip, json={}
         ).json()
         if not enable_audio.get("result"):
             status.set_(status=StatusLabels.STOP)
             return
 
-    requests.post("http://%s/api/audio/volume" % misty_ip, json={"Volume": "5"}).json()
+    session.post("http://%s/api/audio/volume" % misty_ip, json={"Volume": "5"}).json()
 
-    requests.post(
+    session.post(
         "http://%s/api/audio/speech/capture" % misty_ip,
         json={"RequireKeyPhrase": False},
     ).json()
@@ -290,7 +200,7 @@ def perform_inference() -> None:
     data = ""
 
     if SPEECH_FILE in get_all_audio_file_names():
-        speech_json = requests.get(
+        speech_json = session.get(
             "http://%s/api/audio?FileName=%s&Base64=%s"
             % (misty_ip, SPEECH_FILE, "true")
         ).json()
@@ -356,7 +266,7 @@ def choose_reply() -> None:
 def speak(utterance: str) -> None:
     print(utterance)
 
-    requests.post(
+    session.post(
         "http://%s/api/tts/speak" % misty_ip, json={"Text": utterance, "Flush": "true"}
     ).json()
 
@@ -415,7 +325,7 @@ def unsubscribe() -> None:
 
 
 def cancel_skills(misty_ip: str) -> None:
-    data = requests.get("http://%s/api/skills/running" % misty_ip).json()
+    data = session.get("http://%s/api/skills/running" % misty_ip).json()
     result = data.get("result", [])
     to_cancel = []
     for dct in result:
@@ -423,7 +333,7 @@ def cancel_skills(misty_ip: str) -> None:
         if len(uid) > 0:
             to_cancel.append(uid)
     for skill in to_cancel:
-        requests.post("http://%s/api/skills/cancel" % misty_ip, json={"Skill": skill})
+        session.post("http://%s/api/skills/cancel" % misty_ip, json={"Skill": skill})
 
 
 def question_answering() -> None:
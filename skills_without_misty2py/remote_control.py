@@ -1,8 +1,9 @@
 from typing import Union
 
-import requests
 from pynput import keyboard
 
+from misty_client import session
+
 
 misty_ip = "192.168.0.103"
 
@@ -23,38 +24,38 @@ def handle_input(key: Union[keyboard.Key, keyboard.KeyCode]) -> None:
             "LinearVelocity": TURN_VELOCITY,
             "AngularVelocity": BASE_ANGLE,
         }
-        requests.post("http://%s/api/drive" % misty_ip, json=left)
+        session.post("http://%s/api/drive" % misty_ip, json=left)
 
     elif key == R_KEY:
         right = {
             "LinearVelocity": TURN_VELOCITY,
             "AngularVelocity": BASE_ANGLE * (-1),
         }
-        requests.post("http://%s/api/drive" % misty_ip, json=right)
+        session.post("http://%s/api/drive" % misty_ip, json=right)
 
     elif key == FORW_KEY:
         forw = {
             "LinearVelocity": BASE_VELOCITY,
             "AngularVelocity": 0,
         }
-        requests.post("http://%s/api/drive" % misty_ip, json=forw)
+        session.post("http://%s/api/drive" % misty_ip, json=forw)
 
     elif key == BACK_KEY:
         back = {
             "LinearVelocity": BASE_VELOCITY * (-1),
             "AngularVelocity": 0,
         }
-        requests.post("http://%s/api/drive" % misty_ip, json=back)
+        session.post("http://%s/api/drive" % misty_ip, json=back)
 
     elif key == STOP_KEY:
-        requests.post("http://%s/api/drive/stop" % misty_ip, json={})
+        session.post("http://%s/api/drive/stop" % misty_ip, json={})
 
     elif key == TERM_KEY:
         return False
 
 
 def cancel_skills(misty_ip: str) -> None:
-    data = requests.get("http://%s/api/skills/running" % misty_ip).json()
+    data = session.get("http://%s/api/skills/running" % misty_ip).json()
     result = data.get("result", [])
     to_cancel = []
     for dct in result:
@@ -62,7 +63,7 @@ def cancel_skills(misty_ip: str) -> None:
         if len(uid) > 0:
             to_cancel.append(uid)
     for skill in to_cancel:
-        requests.post("http://%s/api/skills/cancel" % misty_ip, json={"Skill": skill})
+        session.post("http://%s/api/skills/cancel" % misty_ip, json={"Skill": skill})
 
 
 def handle_release(key: keyboard.Key) -> None:
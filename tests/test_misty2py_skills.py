@@ -1,3 +1,4 @@
+import pytest
 from misty2py.utils.utils import get_misty
 
 
@@ -80,3 +81,383 @@ def test_question_answering(capsys):
         result = question_answering.question_answering()
         print(result)
         assert result.get("overall_success")
+
+
+def test_condition_status_wakes_waiting_thread():
+    import threading
+
+    from misty2py_skills.utils.status import ConditionStatus
+
+    status = ConditionStatus(init_status="waiting")
+    threading.Timer(0.05, status.set_, kwargs={"status": "done"}).start()
+    assert status.wait_for_(["done"], timeout=5) == "done"
+    assert status.wait_for_(["never"], timeout=0.01) == "done"
+
+
+def test_sequential_file_names(tmp_path):
+    from misty2py_skills.utils.utils import SequentialFileNames
+
+    for name in ["0001.wav", "9999.wav", "notes.wav", "0000.wav", "².wav"]:
+        (tmp_path / name).touch()
+
+    names = SequentialFileNames(str(tmp_path))
+    assert names.allocate().endswith("10000.wav")
+
+    (tmp_path / "10001.wav").touch()
+    assert names.allocate().endswith("10002.wav")
+
+    # a new allocator recovers from the index without re-using any number
+    assert SequentialFileNames(str(tmp_path)).allocate().endswith("10003.wav")
+
+    from misty2py_skills.utils.utils import get_next_file_name
+
+    assert get_next_file_name(str(tmp_path)).endswith("10004.wav")
+
+
+def test_extract_entities():
+    from misty2py_skills.essentials.speech_transcripter import extract_entities
+
+    entities = extract_entities("Good morning, which year is it")
+    assert [d.get("value") for d in entities.get("intent")] == ["greet", "datetime"]
+    assert "hello" in entities and "year" in entities
+    assert extract_entities("nothing to see") == {}
+
+
+def test_transcription_cache(tmp_path):
+    import speech_recognition as sr
+
+    from misty2py_skills.essentials.speech_transcripter import (
+        SpeechTranscripter,
+        TranscriptionBackend,
+        TranscriptionCache,
+    )
+
+    class CountingBackend(TranscriptionBackend):
+        name = "counting"
+        calls = 0
+
+        def transcribe(self, audio, show_all=False):
+            self.calls += 1
+            return "hello"
+
+    audio = sr.AudioData(b"\x00\x01" * 800, 16000, 2)
+    backend = CountingBackend()
+    transcripter = SpeechTranscripter(
+        backend=backend,
+        cache=TranscriptionCache(max_entries=1, cache_dir=str(tmp_path)),
+    )
+    assert transcripter.audio_to_text(audio) == {"success": True, "content": "hello"}
+    assert transcripter.audio_to_text(audio).get("content") == "hello"
+    transcripter.audio_to_text(sr.AudioData(b"\x00\x02" * 800, 16000, 2))
+    transcripter.audio_to_text(audio)
+    assert backend.calls == 2
+    assert transcripter.cache.stats() == {
+        "hits": 1,
+        "disk_hits": 1,
+        "misses": 2,
+        "entries": 1,
+        "disk_entries": 2,
+    }
+
+
+def test_transcription_cache_bounds_disk_and_skips_unknown(tmp_path):
+    import os
+    import time
+
+    import speech_recognition as sr
+
+    from misty2py_skills.essentials.speech_transcripter import (
+        SpeechTranscripter,
+        TranscriptionBackend,
+        TranscriptionCache,
+    )
+
+    class UnrecognisingBackend(TranscriptionBackend):
+        name = "unrecognising"
+
+        def transcribe(self, audio, show_all=False):
+            raise sr.UnknownValueError()
+
+    audio = sr.AudioData(b"\x00\x01" * 800, 16000, 2)
+    transcripter = SpeechTranscripter(
+        backend=UnrecognisingBackend(),
+        cache=TranscriptionCache(cache_dir=str(tmp_path)),
+    )
+    assert transcripter.audio_to_text(audio).get("content") == "unknown"
+    assert transcripter.cache.stats().get("entries") == 0
+    assert os.listdir(str(tmp_path)) == []
+
+    cache = TranscriptionCache(
+        max_entries=1, cache_dir=str(tmp_path), max_disk_entries=2
+    )
+    for key in ["a", "b", "c"]:
+        cache.set_(key, {"success": True, "content": key})
+    assert sorted(os.listdir(str(tmp_path))) == ["b.json", "c.json"]
+
+    # a restarted cache recovers the recency from the modification times
+    old = time.time() - 60
+    os.utime(str(tmp_path / "c.json"), (old, old))
+    restarted = TranscriptionCache(cache_dir=str(tmp_path), max_disk_entries=1)
+    assert os.listdir(str(tmp_path)) == ["b.json"]
+    assert restarted.get_("b") == {"success": True, "content": "b"}
+    assert restarted.stats().get("disk_entries") == 1
+
+
+def test_transcription_cache_size_falls_back_to_default(tmp_path):
+    from misty2py_skills.essentials.speech_transcripter import (
+        DEFAULT_CACHE_SIZE,
+        get_speech_transcripter,
+    )
+
+    for value in ["", "many", "16"]:
+        env_path = tmp_path / ".env"
+        env_path.write_text("TRANSCRIPTION_CACHE_SIZE=%s\n" % value)
+        cache = get_speech_transcripter(str(env_path)).cache
+        assert cache.max_entries == (
+            int(value) if value.isdecimal() else DEFAULT_CACHE_SIZE
+        )
+
+
+def test_intent_router():
+    from misty2py_skills.utils.dialogue import IntentRouter
+
+    router = IntentRouter()
+    router.add_route("greet", "hello", keyword="hello")
+    router.add_route("greet", "goodbye", keyword="goodbye")
+    router.add_route("greet", "hello")
+    router.add_route("datetime", "year", keyword="year")
+
+    assert router.route({"greet"}, {"goodbye", "hello"}) == "hello"
+    assert router.route({"greet"}, set()) == "hello"
+    assert router.route({"datetime", "greet"}, {"year"}) == "hello"
+    assert router.route({"datetime"}, {"year"}) == "year"
+    assert router.route({"datetime"}, set()) == "unknown"
+    assert router.route({"weather"}, {"rain"}) == "unknown"
+
+
+def test_date_renderer_snapshot():
+    import datetime
+
+    from num2words import num2words
+
+    from misty2py_skills.utils.dialogue import DateRenderer
+
+    renderer = DateRenderer()
+    renderer.warm()
+    # a stale rendering is replaced as a whole by the next snapshot
+    renderer.today = datetime.date(1999, 12, 31)
+    renderer.spoken = {"day": "thirty-first", "month": "December", "year": "?"}
+    day, month, year = renderer.date()
+    today = datetime.date.today()
+    assert (day, month) == (num2words(today.day, to="ordinal"), today.strftime("%B"))
+    assert year == num2words(today.year)
+
+
+def test_face_recognition_queue_coalesces_stale_events():
+    import time
+
+    from misty2py_skills import face_recognition
+
+    def recognise(label):
+        face_recognition.ee.emit(face_recognition.event_face_rec, {"label": label})
+
+    face_recognition.recognitions.put((time.time() - 10, "alice", None))
+    for _ in range(5):
+        recognise("bob")
+    recognise("carol")
+    taken = face_recognition.take_recognitions(timeout=0.1)
+    assert [label for _, label, _ in taken] == ["bob", "carol"]
+
+    for _ in range(40):
+        recognise("bob")
+    assert face_recognition.recognitions.full()
+    assert len(face_recognition.take_recognitions(timeout=0.1)) == 1
+    assert face_recognition.recognitions.empty()
+
+
+def test_greeting_cooldowns_are_per_label():
+    from misty2py_skills.utils.faces import GreetingCooldowns
+
+    cooldowns = GreetingCooldowns(1)
+    assert cooldowns.check_and_renew("alice", 0.0)
+    assert cooldowns.check_and_renew("bob", 0.1)
+    for t in (0.2, 0.4, 0.6, 0.8):
+        assert not cooldowns.check_and_renew("alice", t)
+        assert not cooldowns.check_and_renew("bob", t + 0.1)
+    assert not cooldowns.check_and_renew("alice", 1.7)
+    assert cooldowns.check_and_renew("bob", 2.0)
+    assert cooldowns.check_and_renew("alice", 2.8)
+
+
+def test_input_multiplexer():
+    import socket
+
+    from misty2py_skills.utils.inputs import InputMultiplexer
+
+    with InputMultiplexer(stdin=False, address=("127.0.0.1", 0)) as inputs:
+        assert inputs.read_line(timeout=0.05) is None
+        inputs.put("yes")
+        with socket.create_connection(inputs.address) as conn:
+            conn.sendall(b"chris\r\nst")
+            assert inputs.read_line(timeout=1) == "yes"
+            assert inputs.read_line(timeout=1) == "chris"
+            conn.sendall(b"op")
+        assert inputs.read_line(timeout=1) == "stop"
+
+
+def test_input_multiplexer_timeout_and_eof(monkeypatch):
+    import os
+    import socket
+    import sys
+    import threading
+    import time
+
+    from misty2py_skills.utils.inputs import InputMultiplexer
+
+    with InputMultiplexer(stdin=False, address=("127.0.0.1", 0)) as inputs:
+        with socket.create_connection(inputs.address) as conn:
+
+            def trickle():
+                for _ in range(10):
+                    conn.sendall(b"x")
+                    time.sleep(0.05)
+
+            sender = threading.Thread(target=trickle)
+            sender.start()
+            start = time.monotonic()
+            # data without a newline must not extend the timeout
+            assert inputs.read_line(timeout=0.2) is None
+            assert time.monotonic() - start < 0.4
+            sender.join()
+
+    read_fd, write_fd = os.pipe()
+    os.write(write_fd, b"yes\nstop")
+    os.close(write_fd)
+    with open(read_fd, "r") as stdin:
+        monkeypatch.setattr(sys, "stdin", stdin)
+        with InputMultiplexer() as inputs:
+            assert inputs.read_line(timeout=1) == "yes"
+            assert inputs.read_line(timeout=1) == "stop"
+            assert inputs.read_line() is None
+
+
+def test_recognition_filter():
+    from misty2py_skills.utils.faces import RecognitionFilter
+
+    recognition_filter = RecognitionFilter(0.5, 3, 1)
+    assert not recognition_filter.accept("bob", 0.9, 0.0)
+    assert not recognition_filter.accept("bob", 0.2, 0.1)
+    assert not recognition_filter.accept("bob", 0.9, 0.2)
+    assert recognition_filter.accept("bob", None, 0.3)
+    assert not recognition_filter.accept("bob", 0.9, 2.0)
+
+
+def test_streaming_action_log(tmp_path):
+    import json
+
+    from misty2py_skills.utils.status import StreamingActionLog
+
+    spill = tmp_path / "actions.jsonl"
+    with StreamingActionLog(window=3, spill_path=str(spill)) as log:
+        for i in range(10):
+            log.append_({"drive_%d" % i: {"overall_success": i != 4}})
+        summary = log.summarise()
+
+    assert not summary["overall_success"]
+    assert summary["action_counts"] == {"total": 10, "failed": 1, "dropped": 7}
+    assert [name for name, _ in summary["actions"]] == ["drive_7", "drive_8", "drive_9"]
+    lines = spill.read_text().splitlines()
+    assert len(lines) == 10
+    assert json.loads(lines[4]) == {"drive_4": {"overall_success": False}}
+
+    log.reset()
+    log.append_({"drive_10": {"overall_success": True}})
+    summary = log.summarise()
+    assert summary["overall_success"]
+    assert summary["action_counts"] == {"total": 1, "failed": 0, "dropped": 0}
+    log.close()
+    assert len(spill.read_text().splitlines()) == 11
+
+
+def test_websocket_frames_and_fragments():
+    import io
+
+    from misty2py_skills.utils.websocket import (
+        OPCODE_CONTINUATION,
+        OPCODE_PING,
+        OPCODE_TEXT,
+        MessageAssembler,
+        accept_key,
+        encode_frame,
+        read_frame,
+    )
+
+    # the example of RFC 6455, section 1.3
+    assert accept_key("dGhlIHNhbXBsZSBub25jZQ==") == "s3pPLMBiTxaQ9kYGzzhZRbK+xOo="
+    long_payload = "x" * 70000
+    stream = io.BytesIO(
+        encode_frame('{"event":', masked=True, final=False)
+        + encode_frame(b"ping", OPCODE_PING)
+        + encode_frame(b' "bob"}', OPCODE_CONTINUATION, masked=True)
+        + encode_frame(long_payload)
+        + encode_frame(b"stray", OPCODE_CONTINUATION)
+    )
+    assembler = MessageAssembler()
+    messages = []
+    while stream.tell() < len(stream.getvalue()):
+        message = assembler.add(read_frame(stream.read))
+        if message is not None:
+            messages.append(message)
+    assert messages == [
+        (OPCODE_PING, b"ping"),
+        (OPCODE_TEXT, b'{"event": "bob"}'),
+        (OPCODE_TEXT, long_payload.encode()),
+    ]
+
+
+def test_battery_analysis(tmp_path):
+    pytest.importorskip("numpy")
+    from misty2py_skills.demonstrations.battery_analysis import (
+        analyse,
+        load_telemetry,
+        time_to_empty,
+    )
+    from misty2py_skills.demonstrations.battery_printer import BatteryTelemetry
+
+    path = tmp_path / "battery.bin"
+    with BatteryTelemetry(str(path), batch_size=64) as telemetry:
+        charge = 0.9
+        for i in range(600):
+            charging = 300 <= i < 400
+            charge += (0.5 if charging else -0.1) * 10 / 3600
+            message = {
+                "chargePercent": charge,
+                "current": 1.0 if charging else -0.5,
+                "voltage": 8.0,
+                "temperature": 60 if 100 <= i < 150 else 30,
+                "isCharging": charging,
+            }
+            telemetry.record(message, received=1000.0 + i * 10)
+    with open(path, "ab") as f:
+        f.write(b"\0" * 5)
+
+    records = load_telemetry(str(path))
+    assert len(records) == 600
+    result = analyse(records, window=20, temperature_limit=45)
+    assert result["records"] == 600
+    assert result["duration"] == 5990
+    assert result["discharge_rate"]["mean"] == pytest.approx(-0.1)
+    assert result["discharge_rate"]["latest"] == pytest.approx(-0.1)
+    assert result["time_to_empty"] == pytest.approx(
+        records["chargePercent"][-1] * 36000
+    )
+    assert time_to_empty(records, 20)[300] == float("inf")
+    assert [(cycle["start"], cycle["end"]) for cycle in result["charge_cycles"]] == [
+        (4000, 4990)
+    ]
+    [excursion] = result["temperature_excursions"]
+    assert (excursion["start"], excursion["end"], excursion["peak"]) == (
+        1000 + 110 * 10,
+        1000 + 158 * 10,
+        60,
+    )
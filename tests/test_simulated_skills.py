@@ -0,0 +1,962 @@
+"""Runs the skills end-to-end against `misty2py_skills.utils.simulator.MistySimulator`, i.e. without a robot."""
+import time
+
+import pytest
+
+from misty2py_skills.utils.simulator import MistySimulator
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+@pytest.fixture
+def simulator():
+    with MistySimulator() as sim:
+        yield sim
+
+
+def test_question_answering(monkeypatch, simulator):
+    from misty2py_skills import question_answering
+    from misty2py_skills.essentials.speech_transcripter import SpeechTranscripter
+    from misty2py_skills.utils.simulator import SimulatedSpeechBackend
+
+    monkeypatch.setattr(question_answering, "misty", simulator.get_misty())
+    monkeypatch.setattr(
+        question_answering,
+        "speech_transcripter",
+        SpeechTranscripter(backend=SimulatedSpeechBackend()),
+    )
+    monkeypatch.setattr(question_answering, "ARCHIVE_SPEECH", False)
+    simulator.say("hello Misty", "this is a test", "mumble", "goodbye")
+
+    result = question_answering.question_answering()
+    assert result.get("overall_success")
+    assert simulator.utterances == [
+        "Hello!",
+        "I received your test.",
+        "I am sorry, I do not understand.",
+        "Goodbye!",
+    ]
+    # the audio is only prepared before the first capture
+    assert len(simulator.requests_to("api/audio/volume")) == 1
+    assert len(simulator.requests_to("api/audio/speech/capture")) == 4
+
+
+def test_hey_misty(monkeypatch, simulator):
+    from misty2py_skills import hey_misty
+
+    monkeypatch.setattr(hey_misty, "misty", simulator.get_misty())
+
+    def press_enter(prompt=""):
+        assert simulator.wait_for_subscription("KeyPhraseRecognized")
+        simulator.emit("KeyPhraseRecognized", {"confidence": 80})
+        assert wait_until(lambda: hey_misty.status.get_("status") is True)
+        return ""
+
+    monkeypatch.setattr("builtins.input", press_enter)
+    result = hey_misty.greet()
+    assert result.get("overall_success")
+    assert len(simulator.requests_to("api/audio/keyphrase/stop")) == 1
+
+
+def test_face_recognition(monkeypatch, simulator):
+    import threading
+
+    from misty2py_skills import face_recognition
+    from misty2py_skills.utils.inputs import InputMultiplexer
+
+    misty = simulator.get_misty()
+    monkeypatch.setattr(face_recognition, "misty_glob", misty)
+    monkeypatch.setattr(face_recognition, "UPDATE_TIME", 0.5)
+    simulator.faces.update(["chris_test", "bob"])
+
+    def in_state(label):
+        return wait_until(lambda: face_recognition.status.get_("status") == label)
+
+    def greet_bob_train_dana_then_stop(inputs):
+        try:
+            assert simulator.wait_for_subscription("FaceRecognition")
+            simulator.emit("FaceRecognition", {"label": "bob"})
+            assert wait_until(lambda: "Hello, Bob!" in simulator.utterances)
+            assert in_state(face_recognition.StatusLabels.MAIN)
+            time.sleep(0.3)
+            simulator.emit("FaceRecognition", {"label": "unknown person"})
+            assert in_state(face_recognition.StatusLabels.PROMPT)
+            inputs.put("yes")
+            assert in_state(face_recognition.StatusLabels.INIT)
+            inputs.put("dana")
+            assert wait_until(
+                lambda: "Thank you, the training is complete now."
+                in simulator.utterances
+            )
+            assert in_state(face_recognition.StatusLabels.MAIN)
+        finally:
+            inputs.put("stop")
+
+    with InputMultiplexer(stdin=False) as inputs:
+        threading.Thread(target=greet_bob_train_dana_then_stop, args=(inputs,)).start()
+        result = face_recognition.face_recognition(misty, inputs, measure=True)
+    assert result.get("overall_success")
+    assert result["recognition_rates"]["counts"]["acted_on"] == 2
+    assert simulator.faces == {"bob", "dana"}
+    assert "dana" in face_recognition.faces_registry
+    assert "chris_test" not in face_recognition.faces_registry
+    # the filter and the cooldowns are built from the settings of the run
+    assert face_recognition.recognition_filter.max_gap == 0.5
+    assert face_recognition.greeting_cooldowns.duration == 0.5
+
+
+def test_purge_testing_faces_concurrently():
+    from misty2py_skills.face_recognition import TESTING_NAME, FacesRegistry
+
+    latency = 0.05
+    with MistySimulator(latency=latency) as sim:
+        misty = sim.get_misty()
+        testing_faces = ["%s_%d" % (TESTING_NAME, i) for i in range(40)]
+        sim.faces.update(testing_faces + ["bob"])
+        registry = FacesRegistry()
+        assert registry.get_(misty) == sim.faces
+
+        start = time.perf_counter()
+        registry.delete(misty, testing_faces)
+        elapsed = time.perf_counter() - start
+
+        assert sim.faces == {"bob"}
+        assert registry.get_(misty) == {"bob"}
+        assert registry.unique_name(misty, "alice") == "alice"
+        assert registry.unique_name(misty, "bob") != "bob"
+        assert elapsed < latency * len(testing_faces) / 2
+
+
+def test_battery_printer(simulator):
+    from misty2py_skills.demonstrations.battery_printer import battery_printer
+
+    result = battery_printer(simulator.get_misty(), 0.6)
+    assert result.get("overall_success")
+    assert any(name == "battery_status" for name, _ in result.get("actions"))
+    # a later run starts with an empty log
+    simulator.battery["voltage"] = None
+    again = battery_printer(simulator.get_misty(), 0.6)
+    assert not again.get("overall_success")
+    assert again["action_counts"]["total"] < result["action_counts"]["total"] * 2
+    simulator.battery["voltage"] = 7.8
+    assert battery_printer(simulator.get_misty(), 0.6).get("overall_success")
+
+
+def test_battery_recorder(simulator, tmp_path):
+    import csv
+
+    from misty2py_skills.demonstrations.battery_printer import (
+        TELEMETRY_FIELDS,
+        TELEMETRY_RECORD,
+        battery_recorder,
+    )
+
+    path = tmp_path / "battery.bin"
+    result = battery_recorder(
+        simulator.get_misty(), str(path), 0.5, debounce=10, batch_size=8
+    )
+    assert result.get("overall_success")
+    telemetry = result["telemetry"]
+    assert telemetry["recorded"] > 8 and telemetry["invalid"] == 0
+    assert telemetry["flushes"] >= 2
+    records = list(TELEMETRY_RECORD.iter_unpack(path.read_bytes()))
+    assert len(records) == telemetry["recorded"]
+    battery = simulator.battery
+    expected = tuple(battery[field] for field in TELEMETRY_FIELDS[1:])
+    assert all(record[1:] == expected for record in records)
+    assert all(a[0] <= b[0] for a, b in zip(records, records[1:]))
+
+    path = tmp_path / "battery.csv"
+    result = battery_recorder(
+        simulator.get_misty(), str(path), 0.3, file_format="csv", batch_size=4
+    )
+    with open(path, newline="") as f:
+        rows = list(csv.reader(f))
+    assert tuple(rows[0]) == TELEMETRY_FIELDS
+    assert len(rows) - 1 == result["telemetry"]["recorded"] > 0
+
+
+def test_battery_telemetry_skips_invalid_messages(tmp_path):
+    from misty2py_skills.demonstrations.battery_printer import (
+        TELEMETRY_RECORD,
+        BatteryTelemetry,
+    )
+
+    message = {
+        "chargePercent": 0.5,
+        "current": -0.2,
+        "voltage": 8,
+        "temperature": 31,
+        "isCharging": False,
+    }
+    path = tmp_path / "battery.bin"
+    with BatteryTelemetry(str(path), batch_size=2) as telemetry:
+        assert telemetry.record(message, received=1.0)
+        assert not telemetry.record(dict(message, voltage=None))
+        assert not telemetry.record(dict(message, current="-0.2"))
+        assert not telemetry.record({"chargePercent": 0.5})
+        assert telemetry.record(dict(message, isCharging=True), received=2.0)
+        assert telemetry.record(message, received=3.0)
+        assert len(telemetry.columns[0]) == 1
+    assert telemetry.report()["recorded"] == 3
+    assert telemetry.report()["invalid"] == 3
+    assert list(TELEMETRY_RECORD.iter_unpack(path.read_bytes())) == [
+        (1.0, 0.5, -0.2, 8.0, 31.0, 0),
+        (2.0, 0.5, -0.2, 8.0, 31.0, 1),
+        (3.0, 0.5, -0.2, 8.0, 31.0, 0),
+    ]
+
+
+def test_training_session(simulator):
+    from misty2py_skills.face_recognition import TrainingSession
+    from misty2py_skills.utils.simulator import FACE_TRAINING_MESSAGES
+
+    session = TrainingSession(simulator.get_misty(), "dana", timeout=5)
+    assert session.start().get("overall_success")
+    assert session.wait(5)
+    assert session.outcome == "complete"
+    assert [message for _, message in session.messages] == FACE_TRAINING_MESSAGES
+    assert list(session.report()["phases"]) == FACE_TRAINING_MESSAGES
+    assert wait_until(lambda: "dana" in simulator.faces)
+
+
+def test_training_session_times_out(simulator):
+    from misty2py_skills.face_recognition import TrainingSession
+
+    simulator.training_delay = 0.5
+    ended = []
+    session = TrainingSession(
+        simulator.get_misty(), "erin", timeout=0.2, on_finish=ended.append
+    )
+    session.start()
+    assert session.wait(5)
+    assert ended == [session]
+    assert session.outcome == "timeout"
+    assert session.messages == []
+    assert len(simulator.requests_to("api/faces/training/cancel")) == 1
+    time.sleep(1.6)
+    assert "erin" not in simulator.faces
+
+
+def test_training_session_ends_on_failure_messages_of_its_face(simulator):
+    import threading
+
+    from misty2py_skills.face_recognition import TrainingSession
+
+    simulator.training_delay = 5
+    session = TrainingSession(simulator.get_misty(), "fay", timeout=5)
+    session.start()
+    assert simulator.wait_for_subscription("FaceTraining")
+    simulator.emit("FaceTraining", {"faceId": "fay", "message": "Frame failed."})
+    simulator.emit(
+        "FaceTraining", {"faceId": "gus", "message": "Face training failed."}
+    )
+    assert not session.wait(0.3)
+    simulator.emit(
+        "FaceTraining", {"faceId": "fay", "message": "Face training failed."}
+    )
+    assert session.wait(5)
+    assert session.outcome == "failed"
+    assert [message for _, message in session.messages] == [
+        "Frame failed.",
+        "Face training failed.",
+    ]
+
+    # concurrent cancellations cancel the training on Misty only once
+    session = TrainingSession(simulator.get_misty(), "hal", timeout=5)
+    session.start()
+    cancellations = [threading.Thread(target=session.cancel) for _ in range(4)]
+    for thread in cancellations:
+        thread.start()
+    for thread in cancellations:
+        thread.join()
+    assert session.outcome == "cancelled"
+    assert len(simulator.requests_to("api/faces/training/cancel")) == 1
+
+
+def test_subscribe_event_with_conditions(simulator):
+    from pymitter import EventEmitter
+
+    from misty2py_skills.utils.events import event_condition, subscribe_event
+
+    misty = simulator.get_misty()
+    ee = EventEmitter()
+    received = []
+    ee.on("faces", received.append)
+    response = subscribe_event(
+        misty,
+        "FaceRecognition",
+        name="faces",
+        event_emitter=ee,
+        debounce=1,
+        return_property="label",
+        event_conditions=[event_condition("confidence", ">=", 0.5)],
+    ).parse_to_dict()
+    assert response.get("overall_success")
+    assert simulator.wait_for_subscription("FaceRecognition")
+    simulator.emit("FaceRecognition", {"label": "bob", "confidence": 0.2})
+    time.sleep(0.01)
+    simulator.emit("FaceRecognition", {"label": "carol", "confidence": 0.9})
+    assert wait_until(lambda: received == ["carol"])
+    assert (
+        misty.event("unsubscribe", name="faces").parse_to_dict().get("overall_success")
+    )
+
+
+def test_lobby_face_recognition():
+    import contextlib
+    import threading
+
+    from misty2py_skills import face_recognition
+    from misty2py_skills.utils.inputs import InputMultiplexer
+
+    with contextlib.ExitStack() as stack:
+        sims = [stack.enter_context(MistySimulator()) for _ in range(10)]
+        sims[0].faces.add("bob")
+        sims[7].faces.add("carol")
+        robots = {"robot%d" % i: sim.get_misty() for i, sim in enumerate(sims)}
+        inputs = stack.enter_context(InputMultiplexer(stdin=False))
+        greetings = lambda: sum(len(sim.utterances) for sim in sims)
+
+        def visit(inputs):
+            try:
+                assert all(sim.wait_for_subscription("FaceRecognition") for sim in sims)
+                for sim in sims:
+                    sim.emit("FaceRecognition", {"label": "bob"})
+                assert wait_until(lambda: greetings() == 1)
+                # outside of the debounce interval of the subscriptions
+                time.sleep(0.3)
+                sims[7].emit("FaceRecognition", {"label": "carol"})
+                sims[3].emit("FaceRecognition", {"label": "unknown person"})
+                assert wait_until(lambda: "Hello, Carol!" in sims[7].utterances)
+                time.sleep(0.2)
+            finally:
+                inputs.put("stop")
+
+        visitor = threading.Thread(target=visit, args=(inputs,))
+        visitor.start()
+        result = face_recognition.lobby_face_recognition(robots, inputs)
+        visitor.join()
+        assert result.get("overall_success")
+        assert greetings() == 2
+        assert face_recognition.faces_registry.get_(robots["robot0"]) == {
+            "bob",
+            "carol",
+        }
+
+    with pytest.raises(ValueError):
+        face_recognition.lobby_face_recognition({})
+
+
+def test_event_fan_in_restores_lost_connection():
+    from misty2py_skills.utils.events import EventFanIn
+
+    received = []
+    fan_in = EventFanIn(lambda key, name, data: received.append((key, data["label"])))
+    with MistySimulator() as sim:
+        port = sim.port
+        response = fan_in.subscribe("lobby", sim.get_misty(), "FaceRecognition")
+        assert response.parse_to_dict().get("overall_success")
+        fan_in.start()
+        assert sim.wait_for_subscription("FaceRecognition")
+        sim.emit("FaceRecognition", {"label": "bob"})
+        assert wait_until(lambda: ("lobby", "bob") in received)
+
+    with MistySimulator(port=port) as sim:
+        assert sim.wait_for_subscription("FaceRecognition")
+        sim.emit("FaceRecognition", {"label": "carol"})
+        assert wait_until(lambda: ("lobby", "carol") in received)
+        assert fan_in.reconnections >= 1
+        fan_in.stop()
+    assert not fan_in.connections and not fan_in.subscriptions
+
+
+def test_event_fan_in_is_not_stalled_by_a_partial_frame():
+    import json
+    import socket
+    import threading
+    from types import SimpleNamespace
+
+    from misty2py_skills.utils.events import EventFanIn
+    from misty2py_skills.utils.websocket import accept_key, encode_frame
+
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen(1)
+    server.settimeout(5)
+    frame = encode_frame(
+        json.dumps({"eventName": "slow", "message": {"label": "dora"}})
+    )
+    release = threading.Event()
+    rest_sent = threading.Event()
+    finished = threading.Event()
+
+    def serve_partial_frame():
+        conn, _ = server.accept()
+        with conn:
+            request = conn.recv(65536).decode()
+            key = request.split("Sec-WebSocket-Key: ")[1].split("\r\n")[0]
+            conn.sendall(
+                (
+                    "HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\n"
+                    "Connection: Upgrade\r\nSec-WebSocket-Accept: %s\r\n\r\n"
+                    % accept_key(key)
+                ).encode()
+            )
+            conn.sendall(frame[:3])
+            release.wait(5)
+            conn.sendall(frame[3:])
+            rest_sent.set()
+            finished.wait(5)
+
+    slow = SimpleNamespace(
+        event_handler=SimpleNamespace(
+            url="ws://127.0.0.1:%d/pubsub" % server.getsockname()[1]
+        )
+    )
+    server_thread = threading.Thread(target=serve_partial_frame)
+    server_thread.start()
+    received = []
+    fan_in = EventFanIn(lambda key, name, data: received.append((key, data["label"])))
+    try:
+        with MistySimulator() as sim:
+            assert fan_in.subscribe("slow", slow, "FaceRecognition").parse_to_dict()[
+                "overall_success"
+            ]
+            fan_in.subscribe("lobby", sim.get_misty(), "FaceRecognition")
+            fan_in.start()
+            assert sim.wait_for_subscription("FaceRecognition")
+            time.sleep(0.2)
+            sim.emit("FaceRecognition", {"label": "bob"})
+            # the events of the other Misty are not held up by the partial frame
+            assert wait_until(lambda: ("lobby", "bob") in received, timeout=1)
+            release.set()
+            assert rest_sent.wait(5)
+            assert wait_until(lambda: ("slow", "dora") in received)
+            finished.set()
+            server_thread.join()
+            server.close()
+            fan_in.stop()
+    finally:
+        release.set()
+        finished.set()
+        server_thread.join()
+        server.close()
+
+
+def test_misty_event_hub_shares_and_restores_connection(monkeypatch):
+    import os
+
+    from pymitter import EventEmitter
+
+    monkeypatch.syspath_prepend(
+        os.path.join(
+            os.path.dirname(os.path.dirname(__file__)), "skills_without_misty2py"
+        )
+    )
+    import misty_event_hub
+
+    monkeypatch.setattr(misty_event_hub, "RECONNECT_DELAY", 0.05)
+    ee = EventEmitter()
+    received = []
+    ee.on("battery", lambda data: received.append("battery"))
+    ee.on("faces", lambda data: received.append(data["label"]))
+
+    with MistySimulator() as sim:
+        port = sim.port
+        battery = misty_event_hub.MistyEvent(
+            sim.address, "BatteryCharge", "battery", None, 250, 3, ee
+        )
+        faces = misty_event_hub.MistyEvent(
+            sim.address, "FaceRecognition", "faces", None, 250, 3, ee
+        )
+        assert battery.hub is faces.hub
+        assert sim.wait_for_subscription("FaceRecognition")
+        assert len(sim.connections) == 1
+        sim.emit("FaceRecognition", {"label": "bob"})
+        assert wait_until(lambda: "bob" in received and "battery" in received)
+        assert wait_until(lambda: len(battery.data) == 3)
+
+    with MistySimulator(port=port) as sim:
+        assert sim.wait_for_subscription("FaceRecognition")
+        sim.emit("FaceRecognition", {"label": "carol"})
+        assert wait_until(lambda: "carol" in received)
+        assert "Closed" in faces.log
+        battery.unsubscribe()
+        faces.unsubscribe()
+        assert faces.hub.stopped.is_set()
+        faces.hub.thread.join(5)
+        assert not faces.hub.thread.is_alive()
+
+        # a hub stopped right after it was created does not stay connected
+        for _ in range(20):
+            hub = misty_event_hub.MistyEventHub(sim.address)
+            hub.stop()
+            hub.thread.join(5)
+            assert not hub.thread.is_alive()
+
+
+def test_misty_client_drive_benchmark(monkeypatch, simulator):
+    import os
+
+    monkeypatch.syspath_prepend(
+        os.path.join(
+            os.path.dirname(os.path.dirname(__file__)), "skills_without_misty2py"
+        )
+    )
+    import misty_client
+
+    results = misty_client.benchmark_drive(simulator.address, n=20)
+    assert set(results) == {"requests", "session"}
+    assert len(simulator.requests_to("api/drive")) == 40
+    assert (
+        misty_client.session.get("http://%s/api/faces" % simulator.address)
+        .json()
+        .get("result")
+        == []
+    )
+
+
+def test_misty_client_retries_idempotent_requests_and_reports_timeouts(
+    monkeypatch, capsys
+):
+    import os
+    import socket
+    import threading
+
+    import requests
+
+    monkeypatch.syspath_prepend(
+        os.path.join(
+            os.path.dirname(os.path.dirname(__file__)), "skills_without_misty2py"
+        )
+    )
+    import misty_client
+
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen(5)
+    server.settimeout(0.1)
+    stopping = threading.Event()
+    methods = []
+
+    def serve():
+        while not stopping.is_set():
+            try:
+                conn, _ = server.accept()
+            except socket.timeout:
+                continue
+            with conn:
+                methods.append(conn.recv(65536).split(b" ")[0])
+                if len(methods) in (1, 2):
+                    # closes the connection without responding
+                    continue
+                if len(methods) == 4:
+                    # does not respond in time
+                    stopping.wait(1)
+                    continue
+                conn.sendall(
+                    b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n"
+                    b"Connection: close\r\n\r\n{}"
+                )
+
+    thread = threading.Thread(target=serve)
+    thread.start()
+    url = "http://127.0.0.1:%d/api/drive" % server.getsockname()[1]
+    session = misty_client.MistySession(timeout=(1, 0.2))
+    try:
+        # a request which may have reached Misty is only re-sent if it is idempotent
+        with pytest.raises(requests.ConnectionError):
+            session.post(url, json={})
+        assert session.get(url).status_code == 200
+        assert methods == [b"POST", b"GET", b"GET"]
+        response = session.post(url, json={})
+        assert response.status_code == 504
+        assert response.json().get("status") == "Failed"
+        assert "Misty did not respond in time" in capsys.readouterr().out
+    finally:
+        session.close()
+        stopping.set()
+        thread.join()
+        server.close()
+
+
+def test_async_misty_pools_concurrent_requests():
+    import asyncio
+
+    from misty2py_skills.aio.client import AsyncMisty
+
+    latency = 0.05
+
+    async def run(address):
+        # fewer connections than the listen backlog of the simulator
+        async with AsyncMisty(address, max_connections=4) as misty:
+            start = time.perf_counter()
+            responses = await asyncio.gather(
+                *(misty.perform_action("drive_stop") for _ in range(40))
+            )
+            elapsed = time.perf_counter() - start
+            unknown = await misty.perform_action("no_such_action")
+            return responses, elapsed, unknown, len(misty._idle)
+
+    with MistySimulator(latency=latency) as sim:
+        responses, elapsed, unknown, idle = asyncio.run(run(sim.address))
+        assert all(r.parse_to_dict().get("overall_success") for r in responses)
+        assert len(sim.drives) == 40
+    assert elapsed < latency * 40 / 2
+    assert not unknown.parse_to_dict().get("overall_success")
+    assert 0 < idle <= 4
+
+
+def test_async_misty_resends_only_idempotent_requests_on_lost_connection():
+    import asyncio
+    import socket
+    import threading
+
+    from misty2py_skills.aio.client import AsyncMisty
+
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen(5)
+    server.settimeout(0.1)
+    stopping = threading.Event()
+    methods = []
+
+    def serve():
+        # every connection answers its first request and is lost after the second one is sent
+        while not stopping.is_set():
+            try:
+                conn, _ = server.accept()
+            except OSError:
+                continue
+            with conn:
+                conn.settimeout(1)
+                for answer in (True, False):
+                    try:
+                        request = conn.recv(65536)
+                    except OSError:
+                        break
+                    if not request:
+                        break
+                    methods.append(request.split(b" ")[0])
+                    if answer:
+                        body = b'{"status": "Success"}'
+                        conn.sendall(
+                            b"HTTP/1.1 200 OK\r\nContent-Length: %d\r\n\r\n%s"
+                            % (len(body), body)
+                        )
+
+    async def run(address):
+        async with AsyncMisty(address, timeout=2) as misty:
+            first = await misty.get_info("battery_status")
+            # a request which may have reached Misty is only re-sent if it is idempotent
+            dropped = await misty.perform_action("drive_stop")
+            second = await misty.get_info("battery_status")
+            resent = await misty.get_info("battery_status")
+            return first, dropped, second, resent
+
+    thread = threading.Thread(target=serve)
+    thread.start()
+    try:
+        first, dropped, second, resent = asyncio.run(
+            run("127.0.0.1:%d" % server.getsockname()[1])
+        )
+    finally:
+        stopping.set()
+        thread.join()
+        server.close()
+    assert first.parse_to_dict().get("overall_success")
+    assert not dropped.parse_to_dict().get("overall_success")
+    assert second.parse_to_dict().get("overall_success")
+    assert resent.parse_to_dict().get("overall_success")
+    assert methods == [b"GET", b"POST", b"GET", b"GET", b"GET"]
+
+
+def test_async_skills_share_one_loop(monkeypatch, simulator):
+    import asyncio
+
+    from misty2py_skills.aio import hey_misty
+    from misty2py_skills.aio import question_answering as aio_question_answering
+    from misty2py_skills.aio.client import AsyncMisty
+    from misty2py_skills.essentials.speech_transcripter import SpeechTranscripter
+    from misty2py_skills.utils.simulator import SimulatedSpeechBackend
+
+    monkeypatch.setattr(
+        aio_question_answering,
+        "speech_transcripter",
+        SpeechTranscripter(backend=SimulatedSpeechBackend()),
+    )
+    monkeypatch.setattr(aio_question_answering, "ARCHIVE_SPEECH", False)
+    simulator.say("hello Misty", "this is a test", "goodbye")
+
+    async def run():
+        async with AsyncMisty(simulator.address) as misty:
+            stop = asyncio.Event()
+            greeting = asyncio.create_task(hey_misty.greet(misty, stop))
+            await asyncio.to_thread(
+                simulator.wait_for_subscription, "KeyPhraseRecognized"
+            )
+            simulator.emit("KeyPhraseRecognized", {"confidence": 80})
+            dialogue = await aio_question_answering.question_answering(misty)
+            stop.set()
+            return dialogue, await greeting, len(simulator.connections)
+
+    dialogue, greeting, connections = asyncio.run(run())
+    assert dialogue.get("overall_success")
+    assert simulator.utterances == ["Hello!", "I received your test.", "Goodbye!"]
+    assert greeting.get("overall_success")
+    assert len(greeting["reactions"]) == 1
+    assert len(simulator.requests_to("api/audio/keyphrase/stop")) == 1
+    # both skills received their events through a single WebSocket connection
+    assert connections == 1
+
+
+def test_async_misty_restores_lost_websocket_connection():
+    import asyncio
+
+    from misty2py_skills.aio.client import AsyncMisty
+
+    async def run(sim):
+        async with AsyncMisty(sim.address) as misty:
+            subscription = await misty.subscribe("FaceRecognition", debounce=0)
+            await asyncio.to_thread(sim.wait_for_subscription, "FaceRecognition")
+            sim.emit("FaceRecognition", {"label": "bob"})
+            first = await subscription.next(5)
+
+            await asyncio.to_thread(sim.stop)
+            restarted = MistySimulator(port=sim.port).start()
+            try:
+                await asyncio.to_thread(
+                    restarted.wait_for_subscription, "FaceRecognition"
+                )
+                restarted.emit("FaceRecognition", {"label": "carol"})
+                second = await subscription.next(5)
+                reconnections = misty.reconnections
+                await subscription.unsubscribe()
+            finally:
+                await asyncio.to_thread(restarted.stop)
+        return first, second, reconnections
+
+    first, second, reconnections = asyncio.run(run(MistySimulator().start()))
+    assert first == {"label": "bob"}
+    assert second == {"label": "carol"}
+    assert reconnections == 1
+
+
+def test_async_misty_ends_subscriptions_if_connection_is_not_restored():
+    import asyncio
+
+    from misty2py_skills.aio.client import AsyncMisty
+
+    async def run(sim):
+        async with AsyncMisty(sim.address, reconnect_attempts=1) as misty:
+            subscription = await misty.subscribe("FaceRecognition")
+            await asyncio.to_thread(sim.stop)
+            with pytest.raises(StopAsyncIteration):
+                await subscription.next(5)
+            return subscription.ended, misty.subscriptions
+
+    ended, subscriptions = asyncio.run(run(MistySimulator().start()))
+    assert ended and subscriptions == {}
+
+
+def test_async_face_recognition(simulator):
+    import asyncio
+
+    from misty2py_skills.aio import face_recognition
+    from misty2py_skills.aio.client import AsyncMisty
+
+    simulator.faces.update(["chris_test", "bob"])
+
+    async def run():
+        inputs = asyncio.Queue()
+
+        async def until(condition):
+            assert await asyncio.to_thread(wait_until, condition)
+
+        async def script():
+            await asyncio.to_thread(simulator.wait_for_subscription, "FaceRecognition")
+            simulator.emit("FaceRecognition", {"label": "bob"})
+            await until(lambda: "Hello, Bob!" in simulator.utterances)
+            await until(
+                lambda: state.status.get_("status")
+                == face_recognition.StatusLabels.MAIN
+            )
+            await asyncio.sleep(0.3)
+            simulator.emit("FaceRecognition", {"label": "unknown person"})
+            await until(
+                lambda: state.status.get_("status")
+                == face_recognition.StatusLabels.PROMPT
+            )
+            inputs.put_nowait("yes")
+            await until(
+                lambda: state.status.get_("status")
+                == face_recognition.StatusLabels.INIT
+            )
+            inputs.put_nowait("dana")
+            await until(lambda: "dana" in state.known_faces)
+            await until(
+                lambda: state.status.get_("status")
+                == face_recognition.StatusLabels.MAIN
+            )
+            inputs.put_nowait("stop")
+
+        async with AsyncMisty(simulator.address) as misty:
+            state = face_recognition.FaceRecognitionState(misty)
+            scripting = asyncio.create_task(script())
+            result = await face_recognition.face_recognition(misty, inputs, True, state)
+            await scripting
+            return result
+
+    result = asyncio.run(run())
+    assert result.get("overall_success")
+    assert result["recognition_rates"]["counts"]["acted_on"] == 2
+    assert simulator.faces == {"bob", "dana"}
+    assert "Thank you, the training is complete now." in simulator.utterances
+
+
+def test_async_face_training_is_cancelled_on_stop():
+    import asyncio
+
+    from misty2py_skills.aio import face_recognition
+    from misty2py_skills.aio.client import AsyncMisty
+
+    async def run(sim):
+        inputs = asyncio.Queue()
+
+        async def until(condition):
+            assert await asyncio.to_thread(wait_until, condition)
+
+        async def in_state(label):
+            await until(lambda: state.status.get_("status") == label)
+
+        async def start_training(name):
+            state.greeting_cooldowns.clear()
+            sim.emit("FaceRecognition", {"label": "unknown person"})
+            await in_state(face_recognition.StatusLabels.PROMPT)
+            inputs.put_nowait("yes")
+            await in_state(face_recognition.StatusLabels.INIT)
+            inputs.put_nowait(name)
+            await until(lambda: len(sim.requests_to("api/faces/training/start")) > 0)
+            await until(lambda: state.training is not None)
+
+        async def script():
+            try:
+                await asyncio.to_thread(sim.wait_for_subscription, "FaceRecognition")
+                await start_training("erin")
+                inputs.put_nowait("stop")
+                await in_state(face_recognition.StatusLabels.MAIN)
+                await asyncio.sleep(0.3)
+                # the end of the input ends the skill while the second training runs
+                await start_training("frank")
+            finally:
+                inputs.put_nowait(None)
+
+        async with AsyncMisty(sim.address) as misty:
+            state = face_recognition.FaceRecognitionState(misty)
+            scripting = asyncio.create_task(script())
+            result = await face_recognition.face_recognition(misty, inputs, state=state)
+            await scripting
+            return result, state.trainings
+
+    with MistySimulator(training_delay=1) as sim:
+        result, trainings = asyncio.run(run(sim))
+        assert result.get("overall_success")
+        assert len(sim.requests_to("api/faces/training/cancel")) == 2
+        assert sim.faces == set()
+        assert not trainings
+
+
+def test_async_hey_misty_ends_at_end_of_input(monkeypatch, simulator):
+    import asyncio
+    import io
+
+    from misty2py_skills.aio import hey_misty
+    from misty2py_skills.aio.client import AsyncMisty
+
+    monkeypatch.setattr("sys.stdin", io.StringIO(""))
+
+    async def run():
+        async with AsyncMisty(simulator.address) as misty:
+            return await asyncio.wait_for(hey_misty.greet(misty), 5)
+
+    result = asyncio.run(run())
+    assert result.get("overall_success")
+    assert len(simulator.requests_to("api/audio/keyphrase/stop")) == 1
+
+
+def test_drive_scheduler_coalesces_key_repeat():
+    from misty2py.utils.status import ActionLog
+
+    from misty2py_skills.utils.drive import DriveScheduler
+
+    latency = 0.02
+    interval = 0.1
+    forward = {"LinearVelocity": 20, "AngularVelocity": 0}
+    left = {"LinearVelocity": 10, "AngularVelocity": 50}
+    with MistySimulator(latency=latency) as sim:
+        actions = ActionLog()
+        scheduler = DriveScheduler(
+            sim.get_misty(), min_interval=interval, actions=actions
+        )
+        scheduler.start()
+        # one second of key-repeat at 50 presses per second, alternating between two keys every 10 presses
+        for i in range(50):
+            data = forward if (i // 10) % 2 == 0 else left
+            scheduler.submit("drive", "drive", dict(data))
+            time.sleep(0.02)
+        scheduler.submit("stop_driving", "drive_stop", urgent=True)
+        scheduler.stop()
+        report = scheduler.report()
+
+        assert len(sim.drives) == report["counts"]["sent"]
+        assert report["counts"]["sent"] <= 1 / interval + 3
+        assert sim.drives[-1]["_endpoint"] == "api/drive/stop"
+        assert sim.drives[0]["LinearVelocity"] == 20
+    assert report["counts"]["submitted"] == 51
+    assert report["latency_ms"]["max"] < (interval + latency) * 1000 * 2
+
+
+def test_held_drive_refreshes_while_held_and_stops_on_release(simulator):
+    from misty2py_skills.utils.drive import DriveScheduler, HeldDrive
+
+    scheduler = DriveScheduler(simulator.get_misty(), min_interval=0.05)
+    held = HeldDrive(scheduler, 20, 10, 50, ttl=300, refresh=0.1)
+    scheduler.start()
+    held.press("forward")
+    # key-repeat of the held key sends nothing
+    for _ in range(20):
+        held.press("forward")
+        time.sleep(0.02)
+    held.press("left")
+    time.sleep(0.05)
+    held.release("forward")
+    time.sleep(0.05)
+    held.release("left")
+    time.sleep(0.2)
+    scheduler.stop()
+
+    motions = [
+        (d["_endpoint"], d.get("LinearVelocity"), d.get("AngularVelocity"))
+        for d in simulator.drives
+    ]
+    assert motions[0] == ("api/drive/time", 20, 0)
+    assert all(d.get("TimeMs") == 300 for d in simulator.drives[:-1])
+    assert motions[-1][0] == "api/drive/stop"
+    distinct = [m for i, m in enumerate(motions) if i == 0 or m != motions[i - 1]]
+    assert distinct == [
+        ("api/drive/time", 20, 0),
+        ("api/drive/time", 20, 50),
+        ("api/drive/time", 10, 50),
+        ("api/drive/stop", None, None),
+    ]
+    # held for about 0.4 s with a refresh every 0.1 s instead of 20 repeated presses
+    assert 3 <= scheduler.report()["counts"]["refreshed"] <= 6
+    assert len(motions) <= 10